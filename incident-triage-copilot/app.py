@@ -15,15 +15,24 @@ os.chdir(APP_DIR)
 # Add the project root to Python path
 sys.path.insert(0, str(APP_DIR))
 
-from src.llm.ollama_client import OllamaClient
-from src.llm.groq_client import GroqClient
-from src.storage.runbook_store import RunbookStore
-from src.storage.incident_store import IncidentStore
-from src.orchestrator import TriageOrchestrator
-from src.evaluation.evaluator import TriageEvaluator
-from src.models import IncidentContext, IncidentAlert
-from src.utils.metrics import MetricsTracker
-from src.utils.logger import get_logger
+from src.utils.startup import startup_profiler
+
+# Heavy dependencies (sentence-transformers, ollama, groq) load lazily on first use
+with startup_profiler.phase("imports"):
+    from src.llm.ollama_client import OllamaClient
+    from src.llm.groq_client import GroqClient
+    from src.llm.response_cache import CachedLLMClient, LLMResponseCache
+    from src.llm.scheduler import LLMScheduler, ScheduledLLMClient
+    from src.llm.transport import LLMTransport
+    from src.storage.vector_store import VectorStore
+    from src.storage.runbook_store import RunbookStore
+    from src.storage.category_matcher import CategoryMatcher
+    from src.storage.incident_store import IncidentStore
+    from src.orchestrator import TriageOrchestrator
+    from src.evaluation.evaluator import TriageEvaluator
+    from src.models import IncidentContext, IncidentAlert
+    from src.utils.metrics import MetricsTracker
+    from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
@@ -50,6 +59,21 @@ def init_components():
     
     # LLM Client - support both Ollama and Groq
     provider = config["llm"]["provider"].lower()
+    llm_start = time.perf_counter()
+    
+    # Keep-alive pool, retries, timeouts and optional hedging under both clients
+    transport_config = config["llm"].get("transport", {})
+    transport = LLMTransport(
+        timeout=transport_config.get("timeout_seconds", 300),
+        max_retries=transport_config.get("max_retries", 2),
+        backoff_base=transport_config.get("backoff_base_seconds", 0.5),
+        backoff_max=transport_config.get("backoff_max_seconds", 8),
+        hedge=transport_config.get("hedge", False),
+        hedge_quantile=transport_config.get("hedge_quantile", 0.95),
+        hedge_min_samples=transport_config.get("hedge_min_samples", 20),
+        keepalive_seconds=transport_config.get("keepalive_seconds", 120),
+        max_connections=transport_config.get("max_connections", 100)
+    )
     
     if provider == "groq":
         # Use Groq cloud API
@@ -62,7 +86,8 @@ def init_components():
             model=config["llm"]["model"],
             api_key=api_key,
             temperature=config["llm"]["temperature"],
-            max_tokens=config["llm"]["max_tokens"]
+            max_tokens=config["llm"]["max_tokens"],
+            transport=transport
         )
         st.sidebar.success(f"✅ Using Groq: {config['llm']['model']}")
         
@@ -72,7 +97,8 @@ def init_components():
             model=config["llm"]["model"],
             base_url=config["llm"]["base_url"],
             temperature=config["llm"]["temperature"],
-            max_tokens=config["llm"]["max_tokens"]
+            max_tokens=config["llm"]["max_tokens"],
+            transport=transport
         )
         
         # Check if Ollama is available
@@ -85,13 +111,84 @@ def init_components():
         st.error(f"❌ Unknown LLM provider: {provider}. Use 'ollama' or 'groq'")
         st.stop()
     
+    # Priority queue with concurrency and provider rate limits for every LLM request
+    scheduler_config = config["llm"].get("scheduler", {})
+    if scheduler_config.get("enabled", False):
+        limits = (scheduler_config.get("limits") or {}).get(provider) or {}
+        llm = ScheduledLLMClient(
+            llm,
+            LLMScheduler(
+                max_concurrency=scheduler_config.get("max_concurrency", 4),
+                requests_per_minute=limits.get("requests_per_minute"),
+                tokens_per_minute=limits.get("tokens_per_minute"),
+                chars_per_token=scheduler_config.get("chars_per_token", 4.0)
+            )
+        )
+    
+    # Serve repeated prompts from the persistent response cache
+    cache_config = config["llm"].get("cache", {})
+    if cache_config.get("enabled", False):
+        llm = CachedLLMClient(
+            llm,
+            LLMResponseCache(
+                db_path=cache_config.get("path", "data/llm_cache.db"),
+                ttl_seconds=cache_config.get("ttl_hours", 168) * 3600,
+                max_entries=cache_config.get("max_entries", 5000)
+            ),
+            provider=provider
+        )
+    startup_profiler.record("llm_client", time.perf_counter() - llm_start)
+    
+    # Vector Store
+    with startup_profiler.phase("vector_store"):
+        vector_store = VectorStore(
+            db_path=config["vector_store"]["path"],
+            embedding_model=config["embeddings"]["model"],
+            dimension=config["embeddings"]["dimension"],
+            batch_size=config["embeddings"].get("batch_size", 32),
+            index_type=config["vector_store"].get("index", "exact"),
+            ivf_nlist=config["vector_store"].get("ivf_nlist"),
+            ivf_nprobe=config["vector_store"].get("ivf_nprobe", 8),
+            query_cache_size=config["embeddings"].get("query_cache_size", 1024),
+            search_mode=config["vector_store"].get("search_mode", "vector"),
+            lexical_prefilter_min_rows=config["vector_store"].get("lexical_prefilter_min_rows", 10000),
+            quantization=config["embeddings"].get("quantization", "none"),
+            rescore_factor=config["embeddings"].get("rescore_factor", 4),
+            embedding_backend=config["embeddings"].get("backend", "torch"),
+            onnx_model_file=config["embeddings"].get("onnx_model_file", "onnx/model.onnx"),
+            query_batch_size=config["embeddings"].get("query_batch_size", 32),
+            query_batch_wait_ms=config["embeddings"].get("query_batch_wait_ms", 2),
+            mmap_index=config["vector_store"].get("mmap_index", False)
+        )
+    
     # Runbook Store
     runbook_store = RunbookStore(
-        runbooks_dir=config["storage"]["runbooks_dir"]
+        runbooks_dir=config["storage"]["runbooks_dir"],
+        vector_store=vector_store,
+        cache_max_bytes=config["storage"].get("runbook_cache_mb", 32) * 1024 * 1024,
+        category_matcher=CategoryMatcher(
+            keywords=config.get("runbook_categories", {}).get("keywords"),
+            filename_weight=config.get("runbook_categories", {}).get("filename_weight", 3)
+        )
     )
     
     # Index runbooks
-    runbook_store.index_runbooks()
+    with startup_profiler.phase("index_runbooks"):
+        runbook_store.index_runbooks()
+    
+    # Pick up runbook edits without a restart
+    if config["storage"].get("watch_runbooks", False):
+        runbook_store.start_watching(
+            debounce_seconds=config["storage"].get("watch_debounce_seconds", 2)
+        )
+    
+    # Preload the embedding model, in-memory index and LLM while the UI renders
+    if config.get("startup", {}).get("background_warmup", True):
+        startup_profiler.warm_up({
+            "embedding_index": lambda: vector_store.index,
+            "embedding_model": lambda: vector_store.embed_texts(["warm up"]),
+            "llm": llm.warm_up
+        })
     
     # Incident Store
     incident_store = IncidentStore(
@@ -107,7 +204,8 @@ def init_components():
     orchestrator = TriageOrchestrator(
         llm_client=llm,
         runbook_store=runbook_store,
-        metrics_tracker=metrics
+        metrics_tracker=metrics,
+        stage_mode=config["triage"].get("stage_mode", "sequential")
     )
     
     # Evaluator
@@ -119,7 +217,8 @@ def init_components():
     return orchestrator, runbook_store, incident_store, metrics, evaluator
 
 try:
-    orchestrator, runbook_store, incident_store, metrics, evaluator = init_components()
+    with startup_profiler.phase("init_components"):
+        orchestrator, runbook_store, incident_store, metrics, evaluator = init_components()
 except Exception as e:
     st.error(f"Failed to initialize components: {e}")
     st.info("Make sure Ollama is running: `brew install ollama && ollama serve`")
@@ -137,7 +236,9 @@ page = st.sidebar.radio(
 st.sidebar.markdown("---")
 st.sidebar.markdown("### ⚙️ System Status")
 st.sidebar.success(f"✅ LLM: {config['llm']['model']}")
-st.sidebar.info(f"📖 Runbooks: {len(runbook_store.list_all_runbooks())} indexed")
+st.sidebar.info(f"📖 Runbooks: {runbook_store.count_runbooks()} indexed")
+if runbook_store.watcher is not None and runbook_store.watcher.is_running():
+    st.sidebar.caption(f"👀 Watching runbooks ({runbook_store.watcher.mode})")
 
 # Main content
 if page == "🆕 New Incident":
@@ -242,33 +343,53 @@ if page == "🆕 New Incident":
                 additional_context=additional_context if additional_context else None
             )
             
-            # Show progress
-            with st.spinner("🔍 Analyzing incident..."):
-                progress_bar = st.progress(0)
-                status_text = st.empty()
-                
-                status_text.text("Step 1/3: Classifying incident...")
-                progress_bar.progress(33)
-                
-                # Perform triage
-                result = orchestrator.triage_incident(incident)
-                
-                status_text.text("Step 2/3: Analyzing root causes...")
-                progress_bar.progress(66)
-                time.sleep(0.5)
-                
-                status_text.text("Step 3/3: Generating mitigation plan...")
-                progress_bar.progress(100)
-                time.sleep(0.5)
-                
-                progress_bar.empty()
-                status_text.empty()
+            # Show real stage progress and stream LLM output as it arrives
+            stages = orchestrator.stages()
+            progress_bar = st.progress(0)
+            status_text = st.empty()
+            preview = st.empty()
+            stage_output = st.empty()
+            stream = {"text": "", "rendered_at": 0.0, "first_token": None}
+            triage_start = time.perf_counter()
+            
+            def on_progress(stage, event, data):
+                step = stages.index(stage) + 1
+                if event == "started":
+                    status_text.text(f"Step {step}/{len(stages)}: {TriageOrchestrator.STAGES[stage]}...")
+                    stream["text"] = ""
+                elif event == "token":
+                    if stream["first_token"] is None:
+                        stream["first_token"] = time.perf_counter() - triage_start
+                    stream["text"] += data
+                    # Redraw at most every 50ms; one websocket message per token is too chatty
+                    now = time.perf_counter()
+                    if now - stream["rendered_at"] >= 0.05:
+                        stage_output.code(stream["text"], language="json")
+                        stream["rendered_at"] = now
+                elif event == "completed":
+                    progress_bar.progress(int(100 * step / len(stages)))
+                    if stage == "classify":
+                        preview.info(
+                            f"🏷️ {data['severity']} · {data['category']} "
+                            f"({data.get('confidence', 0):.0%} confidence), analyzing root causes..."
+                        )
+                    elif stage == "root_cause" and data.get("primary_cause"):
+                        preview.info(f"🔍 Likely cause: {data['primary_cause']}, planning mitigation...")
+            
+            result = orchestrator.triage_incident(incident, progress=on_progress, priority="interactive")
+            startup_profiler.mark("first_triage")
+            
+            for placeholder in (progress_bar, status_text, preview, stage_output):
+                placeholder.empty()
             
             # Save incident to database
             incident_store.save_incident(result, incident.alert.alert_name)
             
             # Display results
-            st.success(f"✅ Triage completed in {result.processing_time:.2f}s")
+            first_output = f" (first output after {stream['first_token']:.2f}s)" if stream["first_token"] else ""
+            st.success(f"✅ Triage completed in {result.processing_time:.2f}s{first_output}")
+            if result.stage_time_saved:
+                st.caption(f"⚡ {result.stage_time_saved:.2f}s saved by overlapping triage stages")
             
             # Classification
             st.markdown("---")
@@ -401,9 +522,19 @@ elif page == "�📊 Evaluate":
     st.title("📊 Evaluation Dashboard")
     st.markdown("Evaluate the copilot's performance on golden test cases.")
     
+    compare_fused = st.checkbox(
+        "Compare three-call and single-call (fused) triage",
+        help="Runs the golden cases once per mode; the three-call run is the baseline"
+    )
+    
     if st.button("🚀 Run Evaluation", type="primary"):
         with st.spinner("Running evaluation on golden cases..."):
-            summary = evaluator.evaluate_all()
+            if compare_fused:
+                comparison = evaluator.compare_modes(("sequential", "fused"))
+                summary = comparison.get("modes", {}).get("sequential", comparison)
+            else:
+                comparison = None
+                summary = evaluator.evaluate_all()
         
         if "error" in summary:
             st.error(summary["error"])
@@ -419,6 +550,28 @@ elif page == "�📊 Evaluate":
             with col4:
                 st.metric("Root Cause Precision", f"{summary['avg_root_cause_precision']:.1%}")
             
+            if comparison:
+                fused = comparison["modes"]["fused"]
+                delta = comparison["comparisons"]["fused"]
+                st.markdown("### ⚖️ Single-Call (Fused) Triage vs Three Calls")
+                col1, col2, col3, col4 = st.columns(4)
+                with col1:
+                    st.metric("Severity Accuracy", f"{fused['severity_accuracy']:.1%}",
+                              f"{delta['severity_accuracy_delta']:+.1%}")
+                with col2:
+                    st.metric("Category Accuracy", f"{fused['category_accuracy']:.1%}",
+                              f"{delta['category_accuracy_delta']:+.1%}")
+                with col3:
+                    st.metric("Avg Processing Time", f"{fused['avg_processing_time']:.2f}s",
+                              f"{delta['speedup']:.1f}x faster")
+                with col4:
+                    st.metric("Root Cause Precision", f"{fused['avg_root_cause_precision']:.1%}",
+                              f"{delta['root_cause_precision_delta']:+.1%}")
+                st.caption(
+                    f"Same prediction as the three-call run: severity {delta['severity_agreement']:.0%}, "
+                    f"category {delta['category_agreement']:.0%} of cases"
+                )
+            
             # Individual results
             st.markdown("### 📋 Individual Results")
             for result in summary["individual_results"]:
@@ -471,6 +624,120 @@ elif page == "📈 Metrics":
         st.metric("Avg Processing Time", summary.get("avg_processing_time", "N/A"))
     with col3:
         st.metric("Session Start", summary.get("session_start", "N/A")[:19])
+    
+    st.markdown("### 🧠 Query Embedding Cache")
+    cache_stats = runbook_store.vector_store.query_cache_stats()
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Hit Rate", f"{cache_stats['hit_rate']:.0%}")
+    with col2:
+        st.metric("Hits / Misses", f"{cache_stats['hits']} / {cache_stats['misses']}")
+    with col3:
+        st.metric("Cached Queries", f"{cache_stats['size']} / {cache_stats['maxsize']}")
+    
+    stage_stats = orchestrator.stage_stats()
+    if stage_stats["mode"] in ("concurrent", "speculative"):
+        st.markdown("### ⚡ Overlapped Triage Stages")
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Avg Time Saved / Triage", f"{stage_stats['avg_time_saved']:.2f}s")
+        with col2:
+            st.metric("Runbook Prefetch Reused", stage_stats["prefetch_reused"])
+        with col3:
+            st.metric(
+                "Speculation Accepted",
+                f"{stage_stats['speculation_accepted']} / {stage_stats['speculated']}"
+            )
+    
+    llm_client = orchestrator.llm
+    if isinstance(llm_client, CachedLLMClient):
+        st.markdown("### 💬 LLM Response Cache")
+        llm_cache_stats = llm_client.cache.stats()
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Hit Rate", f"{llm_cache_stats['hit_rate']:.0%}")
+        with col2:
+            st.metric("Cached Responses", f"{llm_cache_stats['entries']} / {llm_cache_stats['max_entries']}")
+        with col3:
+            st.metric("LLM Time Saved", f"{llm_cache_stats['saved_seconds']:.1f}s")
+    
+    transport_stats = llm_client.transport.stats()
+    st.markdown("### 🔁 LLM Transport")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Retries / Calls", f"{transport_stats['retries']} / {transport_stats['calls']}")
+    with col2:
+        st.metric("Failed Calls", transport_stats["failures"])
+    with col3:
+        st.metric(
+            "Hedged (Won)",
+            f"{transport_stats['hedged']} ({transport_stats['hedge_wins']})",
+            help="Duplicate requests sent after the p95 latency, and how often the duplicate answered first"
+        )
+    
+    scheduler = getattr(llm_client, "scheduler", None)
+    if scheduler is not None:
+        st.markdown("### 🚦 LLM Request Scheduler")
+        scheduler_stats = scheduler.stats()
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Queued / In Flight", f"{scheduler_stats['queued']} / {scheduler_stats['in_flight']}")
+        with col2:
+            st.metric("Rate Limited", scheduler_stats["rate_limited"], help="Requests held back by the request or token budget")
+        with col3:
+            st.metric("Max Concurrency", scheduler_stats["max_concurrency"])
+        st.dataframe(
+            [
+                {
+                    "Priority": priority,
+                    "Requests": waits["requests"],
+                    "Avg Wait (s)": round(waits["avg_wait"], 3),
+                    "p95 Wait (s)": round(waits["p95_wait"], 3),
+                    "Max Wait (s)": round(waits["max_wait"], 3)
+                }
+                for priority, waits in scheduler_stats["priorities"].items()
+            ],
+            use_container_width=True
+        )
+    
+    st.markdown("### 📖 Parsed Runbook Cache")
+    runbook_cache_stats = runbook_store.runbook_cache_stats()
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Hit Rate", f"{runbook_cache_stats['hit_rate']:.0%}")
+    with col2:
+        st.metric("Cached Runbooks", runbook_cache_stats["runbooks"])
+    with col3:
+        st.metric(
+            "Cache Size",
+            f"{runbook_cache_stats['bytes'] / 1024:.0f} KB / {runbook_cache_stats['max_bytes'] / 1024 / 1024:.0f} MB"
+        )
+    
+    batch_stats = runbook_store.vector_store.query_batch_stats()
+    if batch_stats:
+        st.markdown("### 📦 Query Embedding Batching")
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Avg / Largest Batch", f"{batch_stats['avg_batch_size']:.1f} / {batch_stats['largest_batch']}")
+        with col2:
+            st.metric("Queue Depth (max)", f"{batch_stats['queue_depth']} ({batch_stats['max_queue_depth']})")
+        with col3:
+            st.metric("Avg Queue Wait", f"{batch_stats['avg_queue_wait_ms']:.1f}ms")
+    
+    st.markdown("### ⏱️ Startup")
+    startup = startup_profiler.breakdown()
+    milestones = startup["milestones"]
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Time to First Page", f"{milestones['first_page']:.1f}s" if "first_page" in milestones else "N/A")
+    with col2:
+        st.metric("Warm-up Finished", f"{milestones['warm']:.1f}s" if "warm" in milestones else "Running...")
+    with col3:
+        st.metric("Time to First Triage", f"{milestones['first_triage']:.1f}s" if "first_triage" in milestones else "N/A")
+    st.dataframe(
+        [{"Phase": name, "Seconds": round(seconds, 3)} for name, seconds in startup["phases"].items()],
+        use_container_width=True
+    )
 
 # Footer
 st.sidebar.markdown("---")
@@ -480,3 +747,5 @@ Built with ❤️ by Khizar Khan<br>
 Powered by Groq, SQLite & Streamlit
 </div>
 """, unsafe_allow_html=True)
+
+startup_profiler.mark("first_page")
@@ -0,0 +1,261 @@
+"""Mock Ollama-compatible LLM server for load-testing the triage pipeline.
+
+Answers ``POST /api/chat`` and ``POST /api/generate`` after a fixed
+``latency`` with canned JSON for the classifier, root cause,
+mitigation and single-call (fused) triage prompts. Streaming chats (``"stream": true``) send the first
+chunk after a fifth of the latency and spread the rest over the remainder. Requests are handled concurrently on one event loop,
+like a real inference server with spare capacity, so throughput measured
+against it reflects the client side.
+
+To exercise client retries and hedging, a ``failure_rate`` fraction of
+requests gets a 503 and a ``slow_rate`` fraction takes ``slow_latency``
+instead of ``latency``.
+
+    python mock_llm_server.py --port 11435 --latency 0.5 --failure-rate 0.05 --slow-rate 0.05
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import threading
+from typing import Optional
+
+CLASSIFICATION = {
+    "severity": "SEV2",
+    "category": "Database",
+    "confidence": 0.85,
+    "reasoning": "Connection pool exhausted with timeouts on customer-facing APIs"
+}
+
+ROOT_CAUSES = {
+    "root_causes": [
+        {
+            "cause": "Connection leak after recent deploy",
+            "likelihood": 0.7,
+            "evidence": "Active connections grow without matching traffic"
+        },
+        {
+            "cause": "Slow queries holding connections",
+            "likelihood": 0.4,
+            "evidence": "Query latency p99 increased"
+        }
+    ],
+    "primary_cause": "Connection leak after recent deploy",
+    "reasoning": "Pool saturation started right after the deploy"
+}
+
+MITIGATION = {
+    "immediate_actions": [
+        {
+            "step": "Restart the leaking service pods",
+            "command": "kubectl rollout restart deployment/api",
+            "expected_outcome": "Pool usage drops below 50%",
+            "citation": "Database Connection Pool Exhaustion"
+        }
+    ],
+    "investigation_steps": [
+        {"step": "Check pg_stat_activity for idle connections", "citation": "Database Connection Pool Exhaustion"}
+    ],
+    "escalation": {"when": "Pool still saturated after 15 minutes", "who": "DBA on-call", "channel": "#incidents"},
+    "summary": "Restart leaking pods, then find the leak"
+}
+
+
+def canned_response(system_prompt: str) -> str:
+    """Pick the canned answer matching an agent's system prompt."""
+    system_prompt = system_prompt.lower()
+    if "in one pass" in system_prompt:
+        return json.dumps({
+            "classification": CLASSIFICATION,
+            "root_cause_analysis": ROOT_CAUSES,
+            "mitigation_plan": MITIGATION
+        })
+    if "classifier" in system_prompt:
+        return json.dumps(CLASSIFICATION)
+    if "root cause" in system_prompt:
+        return json.dumps(ROOT_CAUSES)
+    return json.dumps(MITIGATION)
+
+
+class MockLLMServer:
+    """Minimal HTTP/1.1 server (keep-alive) speaking the Ollama chat API."""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.5,
+        failure_rate: float = 0.0,
+        slow_rate: float = 0.0,
+        slow_latency: Optional[float] = None,
+        seed: Optional[int] = None
+    ):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency if slow_latency is not None else latency * 10
+        self.requests = 0
+        self.failures = 0
+        self.prompt_chars = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._random = random.Random(seed)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                _, path, _ = request_line.decode().split(" ", 2)
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode().partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                request = json.loads(body or b"{}")
+                self.prompt_chars += sum(len(m["content"]) for m in request.get("messages", []))
+                self.prompt_chars += len(request.get("prompt", ""))
+
+                if path in ("/api/chat", "/api/generate") and self._random.random() < self.failure_rate:
+                    self.failures += 1
+                    status, payload = "503 Service Unavailable", {"error": "injected failure"}
+                elif path == "/api/chat" and request.get("stream", True):
+                    await self._stream_chat(request, writer, self._latency())
+                    continue
+                else:
+                    status, payload = await self._respond(path, request, self._latency())
+
+                data = json.dumps(payload).encode()
+                writer.write(
+                    f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n\r\n".encode() + data
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    def _latency(self) -> float:
+        return self.slow_latency if self._random.random() < self.slow_rate else self.latency
+
+    async def _stream_chat(self, request: dict, writer: asyncio.StreamWriter, latency: float):
+        """Send the canned answer as NDJSON chunks (chunked transfer encoding)."""
+        self.requests += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\n"
+                b"Transfer-Encoding: chunked\r\n\r\n"
+            )
+            content = canned_response(_system_prompt(request))
+            pieces = [content[i:i + 8] for i in range(0, len(content), 8)]
+            await asyncio.sleep(latency * 0.2)
+            for i, piece in enumerate(pieces):
+                if i:
+                    await asyncio.sleep(latency * 0.8 / len(pieces))
+                _write_chunk(writer, {"message": {"role": "assistant", "content": piece}, "done": False})
+                await writer.drain()
+            _write_chunk(writer, {"message": {"role": "assistant", "content": ""}, "done": True})
+            writer.write(b"0\r\n\r\n")
+            await writer.drain()
+        finally:
+            self.in_flight -= 1
+
+    async def _respond(self, path: str, request: dict, latency: float):
+        self.requests += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if path == "/api/chat":
+                await asyncio.sleep(latency)
+                message = {"role": "assistant", "content": canned_response(_system_prompt(request))}
+                return "200 OK", {"model": request.get("model"), "message": message, "done": True}
+            if path == "/api/generate":
+                if request.get("prompt"):
+                    await asyncio.sleep(latency)
+                return "200 OK", {"model": request.get("model"), "response": "", "done": True}
+            return "404 Not Found", {"error": f"unknown path {path}"}
+        finally:
+            self.in_flight -= 1
+
+    async def serve(self):
+        """Serve on the current event loop until cancelled."""
+        self._server = await asyncio.start_server(self._handle, self.host, self.port, backlog=1024)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        async with self._server:
+            await self._server.serve_forever()
+
+    def start(self) -> "MockLLMServer":
+        """Serve from a background thread with its own event loop."""
+        def run():
+            self._loop = asyncio.new_event_loop()
+            try:
+                self._loop.run_until_complete(self.serve())
+            except asyncio.CancelledError:
+                pass
+            finally:
+                self._loop.close()
+
+        self._thread = threading.Thread(target=run, name="mock-llm-server", daemon=True)
+        self._thread.start()
+        self._ready.wait(5)
+        return self
+
+    def stop(self, timeout: Optional[float] = 5.0):
+        """Stop a server started with ``start``."""
+        if self._loop is not None and self._server is not None:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop)
+            self._thread.join(timeout)
+
+    async def _shutdown(self):
+        # Closing the server ends serve(); also drop idle keep-alive connections
+        self._server.close()
+        for task in asyncio.all_tasks():
+            if task is not asyncio.current_task():
+                task.cancel()
+
+
+def _system_prompt(request: dict) -> str:
+    return next((m["content"] for m in request.get("messages", []) if m["role"] == "system"), "")
+
+
+def _write_chunk(writer: asyncio.StreamWriter, payload: dict):
+    data = json.dumps(payload).encode() + b"\n"
+    writer.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds per completion")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="Fraction of requests taking --slow-latency")
+    parser.add_argument("--slow-latency", type=float, default=None, help="Seconds for slow requests (default 10x latency)")
+    args = parser.parse_args()
+
+    server = MockLLMServer(
+        args.host, args.port, args.latency,
+        failure_rate=args.failure_rate, slow_rate=args.slow_rate, slow_latency=args.slow_latency
+    )
+    print(f"Mock LLM server on http://{args.host}:{args.port} ({args.latency}s per completion)")
+    asyncio.run(server.serve())
@@ -3,5 +3,6 @@
 from .classifier import IncidentClassifier
 from .root_cause import RootCauseAnalyzer
 from .mitigation import MitigationPlanner
+from .fused import FusedTriageAgent
 
-__all__ = ["IncidentClassifier", "RootCauseAnalyzer", "MitigationPlanner"]
+__all__ = ["IncidentClassifier", "RootCauseAnalyzer", "MitigationPlanner", "FusedTriageAgent"]
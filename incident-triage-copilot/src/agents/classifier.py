@@ -1,7 +1,9 @@
 """Incident classifier agent."""
 
-from typing import List, Dict
+from typing import Callable, List, Dict, Optional, Tuple
+from src.llm.async_support import generate_async
 from src.llm.ollama_client import OllamaClient
+from src.llm.streaming import generate_with_tokens
 from src.models import IncidentContext
 from src.utils.logger import get_logger
 import json
@@ -24,16 +26,8 @@ class IncidentClassifier:
         "Frontend"
     ]
     
-    def __init__(self, llm_client: OllamaClient):
-        self.llm = llm_client
-        logger.info("Initialized IncidentClassifier")
-    
-    def classify(self, incident: IncidentContext) -> Dict[str, any]:
-        """Classify incident severity and category."""
-        
-        system_prompt = """You are an expert SRE incident classifier. Focus on BUSINESS IMPACT, not just metrics.
-
-Severity Classification (check ALL signals, not just one metric):
+    # Shared with the single-call (fused) triage prompt
+    CLASSIFICATION_RULES = """Severity Classification (check ALL signals, not just one metric):
 
 SEV1 (Critical) - Customer-impacting outage:
 INDICATORS:
@@ -83,7 +77,54 @@ Categories:
 - API/Service: REST APIs, microservices, auth, gateway
 - Data Pipeline: Kafka, queues, ETL, stream processing
 - Infrastructure: CPU, memory, disk, network
-- Performance: Latency, throughput (non-specific)
+- Performance: Latency, throughput (non-specific)"""
+    
+    def __init__(self, llm_client: OllamaClient, async_llm_client=None):
+        self.llm = llm_client
+        self.async_llm = async_llm_client
+        logger.info("Initialized IncidentClassifier")
+    
+    def classify(
+        self,
+        incident: IncidentContext,
+        on_token: Optional[Callable[[str], None]] = None
+    ) -> Dict[str, any]:
+        """Classify incident severity and category, streaming tokens to ``on_token``."""
+        system_prompt, prompt = self._build_prompt(incident)
+        try:
+            response = generate_with_tokens(
+                self.llm,
+                on_token,
+                prompt=prompt,
+                system_prompt=system_prompt,
+                temperature=0.1
+            )
+        except Exception as e:
+            logger.error(f"Error during classification: {e}")
+            raise
+        return self._parse_response(response)
+    
+    async def classify_async(self, incident: IncidentContext) -> Dict[str, any]:
+        """Classify incident severity and category without blocking the event loop."""
+        system_prompt, prompt = self._build_prompt(incident)
+        try:
+            response = await generate_async(
+                self.llm,
+                self.async_llm,
+                prompt=prompt,
+                system_prompt=system_prompt,
+                temperature=0.1
+            )
+        except Exception as e:
+            logger.error(f"Error during classification: {e}")
+            raise
+        return self._parse_response(response)
+    
+    def _build_prompt(self, incident: IncidentContext) -> Tuple[str, str]:
+        """System prompt and user prompt for an incident."""
+        system_prompt = """You are an expert SRE incident classifier. Focus on BUSINESS IMPACT, not just metrics.
+
+""" + self.CLASSIFICATION_RULES + """
 
 Respond with JSON only:
 {
@@ -93,7 +134,12 @@ Respond with JSON only:
   "reasoning": "<cite specific metrics and business impact>"
 }"""
 
-        # Build incident summary
+        prompt = f"{self.incident_summary(incident)}\n\nClassify this incident:"
+        return system_prompt, prompt
+    
+    @staticmethod
+    def incident_summary(incident: IncidentContext, max_log_chars: int = 1000) -> str:
+        """Alert, metrics, logs and additional context as prompt text."""
         alert = incident.alert
         incident_summary = f"""
 Incident Alert:
@@ -109,20 +155,16 @@ Metrics:
 """
         
         if incident.logs:
-            incident_summary += f"\n\nRecent Logs:\n{incident.logs[:1000]}"  # Limit log size
+            incident_summary += f"\n\nRecent Logs:\n{incident.logs[:max_log_chars]}"  # Limit log size
         
         if incident.additional_context:
             incident_summary += f"\n\nAdditional Context:\n{incident.additional_context}"
         
-        prompt = f"{incident_summary}\n\nClassify this incident:"
-        
+        return incident_summary
+    
+    def _parse_response(self, response: str) -> Dict[str, any]:
+        """Parse and validate the classification JSON."""
         try:
-            response = self.llm.generate(
-                prompt=prompt,
-                system_prompt=system_prompt,
-                temperature=0.1
-            )
-            
             # Parse JSON response
             # Clean up response if it contains markdown code blocks
             response_clean = response.strip()
@@ -154,6 +196,3 @@ Metrics:
                 "confidence": 0.3,
                 "reasoning": "Classification failed, using default values"
             }
-        except Exception as e:
-            logger.error(f"Error during classification: {e}")
-            raise
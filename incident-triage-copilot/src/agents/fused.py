@@ -0,0 +1,180 @@
+"""Single-call triage agent."""
+
+import asyncio
+from typing import Callable, List, Dict, Optional, Tuple
+from src.agents.classifier import IncidentClassifier
+from src.agents.mitigation import MitigationPlanner
+from src.agents.root_cause import RootCauseAnalyzer
+from src.llm.async_support import generate_async
+from src.llm.streaming import generate_with_tokens
+from src.models import IncidentContext
+from src.utils.logger import get_logger
+import json
+
+logger = get_logger(__name__)
+
+
+class FusedTriageAgent:
+    """Classifies, analyzes root causes and plans mitigation in one LLM call.
+    
+    Runbooks are retrieved first (across all categories, since the category
+    is not known yet), then a single structured request returns all three
+    sections. Each section is validated by the parser of the agent that
+    normally produces it, so results match the three-call pipeline's shape.
+    """
+    
+    def __init__(
+        self,
+        classifier: IncidentClassifier,
+        root_cause_analyzer: RootCauseAnalyzer,
+        mitigation_planner: MitigationPlanner
+    ):
+        self.classifier = classifier
+        self.root_cause_analyzer = root_cause_analyzer
+        self.mitigation_planner = mitigation_planner
+        logger.info("Initialized FusedTriageAgent")
+    
+    def triage(
+        self,
+        incident: IncidentContext,
+        on_token: Optional[Callable[[str], None]] = None
+    ) -> Tuple[Dict, Dict, Dict]:
+        """Classification, root cause analysis and mitigation plan, streaming tokens to ``on_token``."""
+        relevant_runbooks = self.root_cause_analyzer.find_runbooks(incident, None)
+        system_prompt, prompt = self._build_prompt(incident, relevant_runbooks)
+        try:
+            response = generate_with_tokens(
+                self.classifier.llm,
+                on_token,
+                prompt=prompt,
+                system_prompt=system_prompt,
+                temperature=0.1,
+                max_tokens=3000
+            )
+        except Exception as e:
+            logger.error(f"Error during fused triage: {e}")
+            raise
+        return self._parse_response(response, relevant_runbooks)
+    
+    async def triage_async(self, incident: IncidentContext) -> Tuple[Dict, Dict, Dict]:
+        """Single-call triage without blocking the event loop."""
+        # Runbook search and section reads touch SQLite and disk; keep them off the loop
+        relevant_runbooks = await asyncio.to_thread(self.root_cause_analyzer.find_runbooks, incident, None)
+        system_prompt, prompt = await asyncio.to_thread(self._build_prompt, incident, relevant_runbooks)
+        try:
+            response = await generate_async(
+                self.classifier.llm,
+                self.classifier.async_llm,
+                prompt=prompt,
+                system_prompt=system_prompt,
+                temperature=0.1,
+                max_tokens=3000
+            )
+        except Exception as e:
+            logger.error(f"Error during fused triage: {e}")
+            raise
+        return self._parse_response(response, relevant_runbooks)
+    
+    def _build_prompt(self, incident: IncidentContext, relevant_runbooks: List[Dict]) -> Tuple[str, str]:
+        """System prompt and user prompt covering all three triage steps."""
+        system_prompt = """You are an expert SRE triaging an incident in one pass: classify it, identify the most likely root causes, then write a mitigation plan that addresses them.
+
+CLASSIFICATION (focus on BUSINESS IMPACT, not just metrics)
+
+""" + self.classifier.CLASSIFICATION_RULES + """
+
+ROOT CAUSE ANALYSIS
+Base it on the alert metrics and description, error patterns in logs and known issues from runbooks.
+Be specific and evidence-based. Cite concrete indicators from the data.
+
+MITIGATION PLAN
+1. ACTIONABLE: Specific commands/steps, not vague suggestions
+2. PRIORITIZED: Most critical steps first
+3. CITED: Reference runbooks for each step
+4. SAFE: Include rollback/validation steps
+
+Respond with JSON only:
+{
+  "classification": {
+    "severity": "SEV1|SEV2|SEV3|SEV4",
+    "category": "<category>",
+    "confidence": 0.0-1.0,
+    "reasoning": "<cite specific metrics and business impact>"
+  },
+  "root_cause_analysis": {
+    "root_causes": [
+      {
+        "cause": "<specific root cause>",
+        "likelihood": 0.0-1.0,
+        "evidence": "<what in the data suggests this>"
+      }
+    ],
+    "primary_cause": "<most likely root cause>",
+    "reasoning": "<overall analysis>"
+  },
+  "mitigation_plan": {
+    "immediate_actions": [
+      {
+        "step": "<specific action>",
+        "command": "<actual command if applicable>",
+        "expected_outcome": "<what should happen>",
+        "citation": "<runbook reference>"
+      }
+    ],
+    "investigation_steps": [
+      {
+        "step": "<investigation action>",
+        "citation": "<runbook reference>"
+      }
+    ],
+    "escalation": {
+      "when": "<conditions for escalation>",
+      "who": "<team/person to escalate to>",
+      "channel": "<communication channel>"
+    },
+    "summary": "<concise action plan summary>"
+  }
+}"""
+
+        # The incident is sent once instead of once per step
+        prompt = (
+            self.classifier.incident_summary(incident, max_log_chars=1500)
+            + self.root_cause_analyzer.runbook_context(relevant_runbooks)
+            + self.mitigation_planner.runbook_mitigation_steps(relevant_runbooks)
+            + "\n\nTriage this incident:"
+        )
+        return system_prompt, prompt
+    
+    def _parse_response(self, response: str, relevant_runbooks: List[Dict]) -> Tuple[Dict, Dict, Dict]:
+        """Split the combined JSON and validate each section with its agent's parser."""
+        try:
+            response_clean = response.strip()
+            if response_clean.startswith("```"):
+                lines = response_clean.split('\n')
+                response_clean = '\n'.join([l for l in lines if not l.strip().startswith('```')])
+            
+            result = json.loads(response_clean)
+            if not isinstance(result, dict):
+                raise ValueError(f"expected a JSON object, got {type(result).__name__}")
+        except (json.JSONDecodeError, ValueError) as e:
+            logger.error(f"Failed to parse fused triage response: {e}")
+            logger.error(f"Response was: {response}")
+            result = {}
+        
+        # A missing or malformed section falls back to that agent's default result
+        def section(name: str) -> str:
+            if name not in result:
+                return ""
+            if not isinstance(result[name], dict):
+                logger.warning(
+                    f"Fused triage section {name} is a {type(result[name]).__name__}, not an object; ignoring it"
+                )
+                return ""
+            return json.dumps(result[name])
+        
+        classification = self.classifier._parse_response(section("classification"))
+        root_cause_analysis = self.root_cause_analyzer._parse_response(
+            section("root_cause_analysis"), relevant_runbooks
+        )
+        mitigation = self.mitigation_planner._parse_response(section("mitigation_plan"), relevant_runbooks)
+        return classification, root_cause_analysis, mitigation
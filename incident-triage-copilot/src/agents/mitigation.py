@@ -1,7 +1,10 @@
 """Mitigation plan generator agent."""
 
-from typing import List, Dict
+import asyncio
+from typing import Callable, List, Dict, Optional, Tuple
+from src.llm.async_support import generate_async
 from src.llm.ollama_client import OllamaClient
+from src.llm.streaming import generate_with_tokens
 from src.models import IncidentContext
 from src.storage.runbook_store import RunbookStore
 from src.utils.logger import get_logger
@@ -16,13 +19,42 @@ class MitigationPlanner:
     def __init__(
         self,
         llm_client: OllamaClient,
-        runbook_store: RunbookStore
+        runbook_store: RunbookStore,
+        async_llm_client=None
     ):
         self.llm = llm_client
         self.runbook_store = runbook_store
+        self.async_llm = async_llm_client
         logger.info("Initialized MitigationPlanner")
     
     def generate_plan(
+        self,
+        incident: IncidentContext,
+        severity: str,
+        category: str,
+        root_causes: List[Dict],
+        relevant_runbooks: List[Dict],
+        on_token: Optional[Callable[[str], None]] = None
+    ) -> Dict[str, any]:
+        """Generate actionable mitigation plan with citations, streaming tokens to ``on_token``."""
+        system_prompt, prompt = self._build_prompt(
+            incident, severity, category, root_causes, relevant_runbooks
+        )
+        try:
+            response = generate_with_tokens(
+                self.llm,
+                on_token,
+                prompt=prompt,
+                system_prompt=system_prompt,
+                temperature=0.2,
+                max_tokens=2000
+            )
+        except Exception as e:
+            logger.error(f"Error generating mitigation plan: {e}")
+            raise
+        return self._parse_response(response, relevant_runbooks)
+    
+    async def generate_plan_async(
         self,
         incident: IncidentContext,
         severity: str,
@@ -30,23 +62,35 @@ class MitigationPlanner:
         root_causes: List[Dict],
         relevant_runbooks: List[Dict]
     ) -> Dict[str, any]:
-        """Generate actionable mitigation plan with citations."""
-        
-        # Filter runbooks by similarity threshold (0.3 = 30% minimum)
-        SIMILARITY_THRESHOLD = 0.3
-        high_quality_runbooks = [rb for rb in relevant_runbooks if rb.get('similarity', 0) >= SIMILARITY_THRESHOLD]
-        
-        # Get full runbook content for top matches
-        runbook_mitigation_steps = ""
-        if high_quality_runbooks:
-            runbook_mitigation_steps = "\n\n--- MITIGATION STEPS FROM RUNBOOKS ---\n"
-            for rb in high_quality_runbooks[:2]:  # Top 2 runbooks
-                content = self.runbook_store.get_runbook_by_path(rb["file_path"])
-                if content and "## Immediate Mitigation" in content:
-                    mitigation_section = content.split("## Immediate Mitigation")[1].split("##")[0]
-                    runbook_mitigation_steps += f"\nFrom: {rb['title']} (Similarity: {rb['similarity']:.2f})\n{mitigation_section}\n"
-        else:
-            runbook_mitigation_steps = "\n\n--- No high-quality runbook matches. Generating plan from general SRE best practices. ---\n"
+        """Generate a mitigation plan without blocking the event loop."""
+        # Runbook sections may be read from disk or SQLite; keep that off the loop
+        system_prompt, prompt = await asyncio.to_thread(
+            self._build_prompt, incident, severity, category, root_causes, relevant_runbooks
+        )
+        try:
+            response = await generate_async(
+                self.llm,
+                self.async_llm,
+                prompt=prompt,
+                system_prompt=system_prompt,
+                temperature=0.2,
+                max_tokens=2000
+            )
+        except Exception as e:
+            logger.error(f"Error generating mitigation plan: {e}")
+            raise
+        return self._parse_response(response, relevant_runbooks)
+    
+    def _build_prompt(
+        self,
+        incident: IncidentContext,
+        severity: str,
+        category: str,
+        root_causes: List[Dict],
+        relevant_runbooks: List[Dict]
+    ) -> Tuple[str, str]:
+        """System prompt and user prompt, with mitigation steps from matching runbooks."""
+        runbook_mitigation_steps = self.runbook_mitigation_steps(relevant_runbooks)
         
         system_prompt = """You are an expert SRE creating an incident mitigation plan. Your plan should be:
 1. ACTIONABLE: Specific commands/steps, not vague suggestions
@@ -100,15 +144,32 @@ Metrics:
 {runbook_mitigation_steps}
 
 Generate a detailed mitigation plan:"""
-
+        return system_prompt, prompt
+    
+    def runbook_mitigation_steps(self, relevant_runbooks: List[Dict]) -> str:
+        """Prompt text with the "Immediate Mitigation" sections of the top matching runbooks."""
+        # Filter runbooks by similarity threshold (0.3 = 30% minimum)
+        SIMILARITY_THRESHOLD = 0.3
+        high_quality_runbooks = [rb for rb in relevant_runbooks if rb.get('similarity', 0) >= SIMILARITY_THRESHOLD]
+        
+        # Get the mitigation section for top matches
+        runbook_mitigation_steps = ""
+        if high_quality_runbooks:
+            runbook_mitigation_steps = "\n\n--- MITIGATION STEPS FROM RUNBOOKS ---\n"
+            for rb in high_quality_runbooks[:2]:  # Top 2 runbooks
+                mitigation_section = self.runbook_store.get_runbook_section(
+                    rb["file_path"],
+                    "Immediate Mitigation"
+                )
+                if mitigation_section:
+                    runbook_mitigation_steps += f"\nFrom: {rb['title']} (Similarity: {rb['similarity']:.2f})\n{mitigation_section}\n"
+        else:
+            runbook_mitigation_steps = "\n\n--- No high-quality runbook matches. Generating plan from general SRE best practices. ---\n"
+        return runbook_mitigation_steps
+    
+    def _parse_response(self, response: str, relevant_runbooks: List[Dict]) -> Dict[str, any]:
+        """Parse the plan JSON and collect its citations."""
         try:
-            response = self.llm.generate(
-                prompt=prompt,
-                system_prompt=system_prompt,
-                temperature=0.2,
-                max_tokens=2000
-            )
-            
             # Parse JSON response
             response_clean = response.strip()
             if response_clean.startswith("```"):
@@ -154,6 +215,3 @@ Generate a detailed mitigation plan:"""
                 "summary": "Mitigation plan generation failed - manual intervention required",
                 "citations": []
             }
-        except Exception as e:
-            logger.error(f"Error generating mitigation plan: {e}")
-            raise
@@ -1,7 +1,10 @@
 """Root cause analysis agent."""
 
-from typing import List, Dict
+import asyncio
+from typing import Callable, List, Dict, Optional, Tuple
+from src.llm.async_support import generate_async
 from src.llm.ollama_client import OllamaClient
+from src.llm.streaming import generate_with_tokens
 from src.models import IncidentContext
 from src.storage.runbook_store import RunbookStore
 from src.utils.logger import get_logger
@@ -16,45 +19,97 @@ class RootCauseAnalyzer:
     def __init__(
         self,
         llm_client: OllamaClient,
-        runbook_store: RunbookStore
+        runbook_store: RunbookStore,
+        async_llm_client=None
     ):
         self.llm = llm_client
         self.runbook_store = runbook_store
+        self.async_llm = async_llm_client
         logger.info("Initialized RootCauseAnalyzer")
     
     def analyze(
+        self,
+        incident: IncidentContext,
+        severity: Optional[str],
+        category: str,
+        on_token: Optional[Callable[[str], None]] = None,
+        relevant_runbooks: Optional[List[Dict]] = None
+    ) -> Dict[str, any]:
+        """Analyze incident to determine likely root causes, streaming tokens to ``on_token``.
+        
+        ``relevant_runbooks`` skips the runbook search when it was already
+        done (e.g. while the classifier ran). ``severity`` may be ``None``
+        when analysis starts before classification finishes.
+        """
+        if relevant_runbooks is None:
+            relevant_runbooks = self.find_runbooks(incident, category)
+        system_prompt, prompt = self._build_prompt(incident, severity, category, relevant_runbooks)
+        try:
+            response = generate_with_tokens(
+                self.llm,
+                on_token,
+                prompt=prompt,
+                system_prompt=system_prompt,
+                temperature=0.2,
+                max_tokens=1500
+            )
+        except Exception as e:
+            logger.error(f"Error during root cause analysis: {e}")
+            raise
+        return self._parse_response(response, relevant_runbooks)
+    
+    async def analyze_async(
         self,
         incident: IncidentContext,
         severity: str,
         category: str
     ) -> Dict[str, any]:
-        """Analyze incident to determine likely root causes."""
-        
-        # Search for relevant runbooks
-        search_query = f"{incident.alert.alert_name} {incident.alert.description}"
+        """Analyze incident root causes without blocking the event loop."""
+        # Runbook search embeds the query and reads SQLite; keep it off the loop
+        relevant_runbooks = await asyncio.to_thread(self.find_runbooks, incident, category)
+        system_prompt, prompt = self._build_prompt(incident, severity, category, relevant_runbooks)
+        try:
+            response = await generate_async(
+                self.llm,
+                self.async_llm,
+                prompt=prompt,
+                system_prompt=system_prompt,
+                temperature=0.2,
+                max_tokens=1500
+            )
+        except Exception as e:
+            logger.error(f"Error during root cause analysis: {e}")
+            raise
+        return self._parse_response(response, relevant_runbooks)
+    
+    @staticmethod
+    def search_query(incident: IncidentContext) -> str:
+        """Text used to search runbooks for an incident."""
+        return f"{incident.alert.alert_name} {incident.alert.description}"
+    
+    def find_runbooks(self, incident: IncidentContext, category: Optional[str]) -> List[Dict]:
+        """Runbooks whose "Root Causes" sections match the incident."""
+        # Search the "Root Causes" sections of relevant runbooks
         all_runbooks = self.runbook_store.search_runbooks(
-            query=search_query,
+            query=self.search_query(incident),
             top_k=3,
-            category=category
+            category=category,
+            section="Root Causes"
         )
         
         # Filter by similarity threshold (0.3 = 30% minimum)
         SIMILARITY_THRESHOLD = 0.3
-        relevant_runbooks = [rb for rb in all_runbooks if rb['similarity'] >= SIMILARITY_THRESHOLD]
-        
-        # Build context from runbooks
-        runbook_context = ""
-        if relevant_runbooks:
-            runbook_context = "\n\n--- RELEVANT RUNBOOKS ---\n"
-            for i, rb in enumerate(relevant_runbooks, 1):
-                runbook_context += f"\n{i}. {rb['title']} (Similarity: {rb['similarity']:.2f})\n"
-                # Extract root causes section
-                content = rb['content']
-                if "## Root Causes" in content:
-                    root_section = content.split("## Root Causes")[1].split("##")[0]
-                    runbook_context += f"{root_section[:500]}...\n"
-        else:
-            runbook_context = "\n\n--- No matching runbooks found (similarity < 30%). Using general SRE knowledge. ---\n"
+        return [rb for rb in all_runbooks if rb['similarity'] >= SIMILARITY_THRESHOLD]
+    
+    def _build_prompt(
+        self,
+        incident: IncidentContext,
+        severity: Optional[str],
+        category: str,
+        relevant_runbooks: List[Dict]
+    ) -> Tuple[str, str]:
+        """System prompt and user prompt for root cause analysis."""
+        runbook_context = self.runbook_context(relevant_runbooks)
         
         system_prompt = """You are an expert SRE performing root cause analysis. Analyze the incident and identify the most likely root causes based on:
 1. The alert metrics and description
@@ -81,7 +136,7 @@ Respond with JSON only:
 Incident Details:
 - Alert: {alert.alert_name}
 - Description: {alert.description}
-- Severity: {severity}
+- Severity: {severity or 'Pending classification'}
 - Category: {category}
 - Affected Services: {', '.join(alert.affected_services)}
 
@@ -94,15 +149,25 @@ Logs:
 {runbook_context}
 
 Analyze and identify root causes:"""
-
+        return system_prompt, prompt
+    
+    @staticmethod
+    def runbook_context(relevant_runbooks: List[Dict]) -> str:
+        """Root cause excerpts from matching runbooks as prompt text."""
+        # Build context from runbooks
+        runbook_context = ""
+        if relevant_runbooks:
+            runbook_context = "\n\n--- RELEVANT RUNBOOKS ---\n"
+            for i, rb in enumerate(relevant_runbooks, 1):
+                runbook_context += f"\n{i}. {rb['title']} (Similarity: {rb['similarity']:.2f})\n"
+                runbook_context += f"{rb['content'][:500]}...\n"
+        else:
+            runbook_context = "\n\n--- No matching runbooks found (similarity < 30%). Using general SRE knowledge. ---\n"
+        return runbook_context
+    
+    def _parse_response(self, response: str, relevant_runbooks: List[Dict]) -> Dict[str, any]:
+        """Parse the analysis JSON and attach runbook references."""
         try:
-            response = self.llm.generate(
-                prompt=prompt,
-                system_prompt=system_prompt,
-                temperature=0.2,
-                max_tokens=1500
-            )
-            
             # Parse JSON response
             response_clean = response.strip()
             if response_clean.startswith("```"):
@@ -139,6 +204,3 @@ Analyze and identify root causes:"""
                 "reasoning": "Root cause analysis failed",
                 "relevant_runbooks": []
             }
-        except Exception as e:
-            logger.error(f"Error during root cause analysis: {e}")
-            raise
@@ -2,11 +2,10 @@
 
 import json
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Optional, Sequence
 from src.models import IncidentContext, IncidentAlert, TriageResult
 from src.orchestrator import TriageOrchestrator
 from src.utils.logger import get_logger
-from sklearn.metrics import accuracy_score, precision_score
 
 logger = get_logger(__name__)
 
@@ -42,13 +41,19 @@ class TriageEvaluator:
         logger.info(f"Loaded {len(cases)} golden cases")
         return cases
     
-    def evaluate_all(self) -> Dict:
-        """Evaluate triage on all golden cases."""
+    def evaluate_all(self, stage_mode: Optional[str] = None) -> Dict:
+        """Evaluate triage on all golden cases.
+        
+        ``stage_mode`` overrides the orchestrator's mode (see
+        ``TriageOrchestrator.STAGE_MODES``) for this run.
+        """
         golden_cases = self.load_golden_cases()
         
         if not golden_cases:
             return {"error": "No golden cases found"}
         
+        stage_mode = stage_mode or self.orchestrator.stage_mode
+        
         results = []
         severity_actual = []
         severity_predicted = []
@@ -70,8 +75,8 @@ class TriageEvaluator:
                 logs=case.get("logs", "")
             )
             
-            # Perform triage
-            triage_result = self.orchestrator.triage_incident(incident)
+            # Perform triage (queued behind live incidents by the LLM scheduler)
+            triage_result = self.orchestrator.triage_incident(incident, stage_mode=stage_mode, priority="batch")
             
             # Compare with ground truth
             ground_truth = case["ground_truth"]
@@ -104,6 +109,7 @@ class TriageEvaluator:
         avg_root_cause_overlap = sum(r["root_cause_overlap"] for r in results) / len(results)
         
         summary = {
+            "stage_mode": stage_mode,
             "total_cases": len(results),
             "severity_accuracy": severity_accuracy,
             "category_accuracy": category_accuracy,
@@ -112,9 +118,61 @@ class TriageEvaluator:
             "individual_results": results
         }
         
-        logger.info(f"Evaluation complete: {severity_accuracy:.1%} severity accuracy, {category_accuracy:.1%} category accuracy")
+        logger.info(f"Evaluation complete ({stage_mode}): {severity_accuracy:.1%} severity accuracy, {category_accuracy:.1%} category accuracy")
         return summary
     
+    def compare_modes(self, modes: Sequence[str] = ("sequential", "fused")) -> Dict:
+        """Evaluate the golden cases once per stage mode and compare the runs.
+        
+        The first mode is the baseline: each other mode reports its accuracy
+        and latency deltas against it, plus how often it predicted the same
+        severity and category on a case.
+        """
+        summaries = {mode: self.evaluate_all(stage_mode=mode) for mode in modes}
+        for summary in summaries.values():
+            if "error" in summary:
+                return summary
+        
+        baseline_mode = modes[0]
+        baseline = summaries[baseline_mode]
+        baseline_cases = {r["incident_id"]: r for r in baseline["individual_results"]}
+        
+        comparisons = {}
+        for mode in modes[1:]:
+            summary = summaries[mode]
+            cases = summary["individual_results"]
+            comparisons[mode] = {
+                "severity_accuracy_delta": summary["severity_accuracy"] - baseline["severity_accuracy"],
+                "category_accuracy_delta": summary["category_accuracy"] - baseline["category_accuracy"],
+                "root_cause_precision_delta": (
+                    summary["avg_root_cause_precision"] - baseline["avg_root_cause_precision"]
+                ),
+                "speedup": (
+                    baseline["avg_processing_time"] / summary["avg_processing_time"]
+                    if summary["avg_processing_time"] else 0.0
+                ),
+                "severity_agreement": sum(
+                    1 for r in cases
+                    if r["predicted_severity"] == baseline_cases[r["incident_id"]]["predicted_severity"]
+                ) / len(cases),
+                "category_agreement": sum(
+                    1 for r in cases
+                    if r["predicted_category"] == baseline_cases[r["incident_id"]]["predicted_category"]
+                ) / len(cases)
+            }
+            logger.info(
+                f"{mode} vs {baseline_mode}: "
+                f"{comparisons[mode]['severity_accuracy_delta']:+.1%} severity accuracy, "
+                f"{comparisons[mode]['category_accuracy_delta']:+.1%} category accuracy, "
+                f"{comparisons[mode]['speedup']:.2f}x speed"
+            )
+        
+        return {
+            "baseline": baseline_mode,
+            "modes": summaries,
+            "comparisons": comparisons
+        }
+    
     def _calculate_overlap(self, predicted: List[str], actual: List[str]) -> float:
         """Calculate overlap/precision between predicted and actual root causes."""
         if not predicted or not actual:
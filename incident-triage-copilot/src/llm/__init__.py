@@ -1,5 +1,5 @@
 """LLM package."""
 
-from .ollama_client import OllamaClient
+from .ollama_client import OllamaClient, AsyncOllamaClient
 
-__all__ = ["OllamaClient"]
+__all__ = ["OllamaClient", "AsyncOllamaClient"]
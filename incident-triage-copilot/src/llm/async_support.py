@@ -0,0 +1,15 @@
+"""Helpers for calling LLM clients from asyncio code."""
+
+import asyncio
+from typing import Optional
+
+
+async def generate_async(llm_client, async_llm_client: Optional[object] = None, **kwargs) -> str:
+    """Await ``generate`` on the async client, or run the blocking one in a thread.
+    
+    Agents built with only a synchronous client still work from an event
+    loop; they just hold a worker thread per in-flight request.
+    """
+    if async_llm_client is not None:
+        return await async_llm_client.generate(**kwargs)
+    return await asyncio.to_thread(llm_client.generate, **kwargs)
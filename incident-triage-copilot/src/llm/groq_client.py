@@ -1,8 +1,21 @@
 """Groq LLM client for cloud-based inference."""
 
 import os
-from typing import Optional
-from groq import Groq
+import threading
+from typing import Iterator, Optional
+from src.llm.ollama_client import _build_messages
+from src.llm.transport import LLMTransport
+
+
+def _resolve_api_key(api_key: Optional[str]) -> str:
+    """Get API key from parameter or environment."""
+    api_key = api_key or os.getenv("GROQ_API_KEY")
+    if not api_key:
+        raise ValueError(
+            "Groq API key required. Set GROQ_API_KEY environment variable "
+            "or pass api_key parameter."
+        )
+    return api_key
 
 
 class GroqClient:
@@ -13,7 +26,8 @@ class GroqClient:
         model: str = "llama-3.1-8b-instant",
         api_key: Optional[str] = None,
         temperature: float = 0.1,
-        max_tokens: int = 2048
+        max_tokens: int = 2048,
+        transport: Optional[LLMTransport] = None
     ):
         """Initialize Groq client.
         
@@ -22,20 +36,37 @@ class GroqClient:
             api_key: Groq API key (or set GROQ_API_KEY env var)
             temperature: Sampling temperature
             max_tokens: Maximum tokens to generate
+            transport: Retry, timeout and hedging policy (the SDK's own
+                retries are disabled in its favour)
         """
         self.model = model
         self.temperature = temperature
         self.max_tokens = max_tokens
+        self.transport = transport or LLMTransport()
         
-        # Get API key from parameter or environment
-        api_key = api_key or os.getenv("GROQ_API_KEY")
-        if not api_key:
-            raise ValueError(
-                "Groq API key required. Set GROQ_API_KEY environment variable "
-                "or pass api_key parameter."
-            )
-        
-        self.client = Groq(api_key=api_key)
+        self.api_key = _resolve_api_key(api_key)
+        self._client = None  # Lazy load
+        self._client_lock = threading.Lock()
+    
+    @property
+    def client(self):
+        """Lazy load the groq package and HTTP client to speed up startup."""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    import httpx
+                    from groq import Groq
+                    
+                    self._client = Groq(
+                        api_key=self.api_key,
+                        max_retries=0,
+                        http_client=httpx.Client(**self.transport.httpx_options())
+                    )
+        return self._client
+    
+    def warm_up(self):
+        """Open the pooled HTTPS connection to Groq before the first request."""
+        self.client.models.list()
     
     def generate(
         self,
@@ -55,24 +86,104 @@ class GroqClient:
         Returns:
             Generated text
         """
-        messages = []
-        
-        if system_prompt:
-            messages.append({
-                "role": "system",
-                "content": system_prompt
-            })
+        response = self.transport.call(
+            lambda: self.client.chat.completions.create(
+                model=self.model,
+                messages=_build_messages(prompt, system_prompt),
+                temperature=temperature or self.temperature,
+                max_tokens=max_tokens or self.max_tokens
+            ),
+            key=system_prompt
+        )
         
-        messages.append({
-            "role": "user",
-            "content": prompt
-        })
+        return response.choices[0].message.content
+    
+    def generate_stream(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None
+    ) -> Iterator[str]:
+        """Generate text completion, yielding chunks as Groq sends them."""
+        stream = self.transport.stream(
+            lambda: self.client.chat.completions.create(
+                model=self.model,
+                messages=_build_messages(prompt, system_prompt),
+                temperature=temperature or self.temperature,
+                max_tokens=max_tokens or self.max_tokens,
+                stream=True
+            ),
+            key=system_prompt
+        )
         
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=messages,
-            temperature=temperature or self.temperature,
-            max_tokens=max_tokens or self.max_tokens
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+
+class AsyncGroqClient:
+    """Asyncio counterpart of ``GroqClient`` built on ``groq.AsyncGroq``.
+    
+    Create one instance per event loop; its connection pool is bound to
+    the loop it is first used on.
+    """
+    
+    def __init__(
+        self,
+        model: str = "llama-3.1-8b-instant",
+        api_key: Optional[str] = None,
+        temperature: float = 0.1,
+        max_tokens: int = 2048,
+        transport: Optional[LLMTransport] = None
+    ):
+        self.model = model
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.transport = transport or LLMTransport()
+        self.api_key = _resolve_api_key(api_key)
+        self._client = None  # Lazy load
+    
+    @property
+    def client(self):
+        """Lazy load the groq package and async HTTP client."""
+        if self._client is None:
+            import httpx
+            from groq import AsyncGroq
+            
+            self._client = AsyncGroq(
+                api_key=self.api_key,
+                max_retries=0,
+                http_client=httpx.AsyncClient(**self.transport.httpx_options())
+            )
+        return self._client
+    
+    async def warm_up(self):
+        """Open the pooled HTTPS connection to Groq before the first request."""
+        await self.client.models.list()
+    
+    async def generate(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None
+    ) -> str:
+        """Generate text completion (see ``GroqClient.generate``)."""
+        response = await self.transport.call_async(
+            lambda: self.client.chat.completions.create(
+                model=self.model,
+                messages=_build_messages(prompt, system_prompt),
+                temperature=temperature or self.temperature,
+                max_tokens=max_tokens or self.max_tokens
+            ),
+            key=system_prompt
         )
         
         return response.choices[0].message.content
+    
+    async def close(self):
+        """Close pooled connections."""
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
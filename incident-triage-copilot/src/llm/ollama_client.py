@@ -1,29 +1,69 @@
 """Ollama LLM client for local inference."""
 
-import ollama
-from typing import List, Dict, Optional
+import threading
+from typing import Dict, Iterator, List, Optional
+from src.llm.transport import LLMTransport
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
 
+def _build_messages(prompt: str, system_prompt: Optional[str] = None) -> List[Dict[str, str]]:
+    """Chat messages for a single-turn completion."""
+    messages = []
+    if system_prompt:
+        messages.append({"role": "system", "content": system_prompt})
+    messages.append({"role": "user", "content": prompt})
+    return messages
+
+
+def _system_prompt(messages: List[Dict[str, str]]) -> Optional[str]:
+    """System prompt of a conversation; keys transport latency stats per agent."""
+    return next((m["content"] for m in messages if m["role"] == "system"), None)
+
+
 class OllamaClient:
-    """Client for interacting with Ollama LLM."""
+    """Client for interacting with Ollama LLM.
+    
+    Completions go through ``transport`` (retries, timeouts, optional
+    hedging); the default retries transient failures twice.
+    """
     
     def __init__(
         self,
         model: str = "llama3.2",
         base_url: str = "http://localhost:11434",
         temperature: float = 0.1,
-        max_tokens: int = 2048
+        max_tokens: int = 2048,
+        transport: Optional[LLMTransport] = None
     ):
         self.model = model
         self.base_url = base_url
         self.temperature = temperature
         self.max_tokens = max_tokens
-        self.client = ollama.Client(host=base_url)
+        self.transport = transport or LLMTransport()
+        self._client = None  # Lazy load
+        self._client_lock = threading.Lock()
         logger.info(f"Initialized Ollama client with model: {model}")
     
+    @property
+    def client(self):
+        """Lazy load the ollama package and HTTP client to speed up startup."""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    import ollama
+                    
+                    self._client = ollama.Client(host=self.base_url, **self.transport.httpx_options())
+        return self._client
+    
+    def warm_up(self):
+        """Load the model into Ollama's memory so the first triage skips it.
+        
+        An empty prompt makes Ollama load the model without generating.
+        """
+        self.client.generate(model=self.model, prompt="")
+    
     def generate(
         self,
         prompt: str,
@@ -33,26 +73,16 @@ class OllamaClient:
     ) -> str:
         """Generate text completion from prompt."""
         try:
-            messages = []
-            
-            if system_prompt:
-                messages.append({
-                    "role": "system",
-                    "content": system_prompt
-                })
-            
-            messages.append({
-                "role": "user",
-                "content": prompt
-            })
-            
-            response = self.client.chat(
-                model=self.model,
-                messages=messages,
-                options={
-                    "temperature": temperature or self.temperature,
-                    "num_predict": max_tokens or self.max_tokens
-                }
+            response = self.transport.call(
+                lambda: self.client.chat(
+                    model=self.model,
+                    messages=_build_messages(prompt, system_prompt),
+                    options={
+                        "temperature": temperature or self.temperature,
+                        "num_predict": max_tokens or self.max_tokens
+                    }
+                ),
+                key=system_prompt
             )
             
             return response['message']['content']
@@ -61,6 +91,37 @@ class OllamaClient:
             logger.error(f"Error generating response: {e}")
             raise
     
+    def generate_stream(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None
+    ) -> Iterator[str]:
+        """Generate text completion, yielding chunks as Ollama produces them."""
+        try:
+            stream = self.transport.stream(
+                lambda: self.client.chat(
+                    model=self.model,
+                    messages=_build_messages(prompt, system_prompt),
+                    options={
+                        "temperature": temperature or self.temperature,
+                        "num_predict": max_tokens or self.max_tokens
+                    },
+                    stream=True
+                ),
+                key=system_prompt
+            )
+            
+            for chunk in stream:
+                content = chunk.get('message', {}).get('content')
+                if content:
+                    yield content
+        
+        except Exception as e:
+            logger.error(f"Error streaming response: {e}")
+            raise
+    
     def chat(
         self,
         messages: List[Dict[str, str]],
@@ -69,13 +130,16 @@ class OllamaClient:
     ) -> str:
         """Multi-turn chat conversation."""
         try:
-            response = self.client.chat(
-                model=self.model,
-                messages=messages,
-                options={
-                    "temperature": temperature or self.temperature,
-                    "num_predict": max_tokens or self.max_tokens
-                }
+            response = self.transport.call(
+                lambda: self.client.chat(
+                    model=self.model,
+                    messages=messages,
+                    options={
+                        "temperature": temperature or self.temperature,
+                        "num_predict": max_tokens or self.max_tokens
+                    }
+                ),
+                key=_system_prompt(messages)
             )
             
             return response['message']['content']
@@ -115,3 +179,97 @@ class OllamaClient:
         except Exception as e:
             logger.error(f"Error pulling model: {e}")
             raise
+
+
+class AsyncOllamaClient:
+    """Asyncio counterpart of ``OllamaClient`` built on ``ollama.AsyncClient``.
+    
+    Requests are awaited instead of blocking a thread, so one event loop
+    can keep many generations in flight over a pooled HTTP client. The
+    underlying client binds to the loop it is first used on: create one
+    instance per event loop. ``transport`` can be shared with the sync
+    client so both feed the same latency stats.
+    """
+    
+    def __init__(
+        self,
+        model: str = "llama3.2",
+        base_url: str = "http://localhost:11434",
+        temperature: float = 0.1,
+        max_tokens: int = 2048,
+        transport: Optional[LLMTransport] = None
+    ):
+        self.model = model
+        self.base_url = base_url
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.transport = transport or LLMTransport()
+        self._client = None  # Lazy load
+        logger.info(f"Initialized async Ollama client with model: {model}")
+    
+    @property
+    def client(self):
+        """Lazy load the ollama package and async HTTP client."""
+        if self._client is None:
+            import ollama
+            
+            self._client = ollama.AsyncClient(host=self.base_url, **self.transport.httpx_options())
+        return self._client
+    
+    async def warm_up(self):
+        """Load the model into Ollama's memory so the first triage skips it."""
+        await self.client.generate(model=self.model, prompt="")
+    
+    async def generate(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None
+    ) -> str:
+        """Generate text completion from prompt."""
+        return await self.chat(
+            _build_messages(prompt, system_prompt),
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+    
+    async def chat(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None
+    ) -> str:
+        """Multi-turn chat conversation."""
+        try:
+            response = await self.transport.call_async(
+                lambda: self.client.chat(
+                    model=self.model,
+                    messages=messages,
+                    options={
+                        "temperature": temperature or self.temperature,
+                        "num_predict": max_tokens or self.max_tokens
+                    }
+                ),
+                key=_system_prompt(messages)
+            )
+            
+            return response['message']['content']
+        
+        except Exception as e:
+            logger.error(f"Error generating response: {e}")
+            raise
+    
+    async def close(self):
+        """Close pooled connections."""
+        if self._client is not None:
+            # ollama.AsyncClient creates its own httpx client and older releases
+            # have no close(); fall back to that client without assuming it exists
+            close = getattr(self._client, "close", None)
+            if close is None:
+                close = getattr(getattr(self._client, "_client", None), "aclose", None)
+            if close is not None:
+                await close()
+            else:
+                logger.warning("Cannot close the async Ollama client's connections; leaving them to the GC")
+            self._client = None
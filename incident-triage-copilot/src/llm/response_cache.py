@@ -0,0 +1,225 @@
+"""Persistent cache of LLM completions."""
+
+import hashlib
+import json
+import threading
+import time
+from typing import Dict, Iterator, Optional
+from src.storage.connection import get_connection_manager
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class LLMResponseCache:
+    """SQLite-backed completion cache with TTL and LRU eviction.
+
+    Entries older than ``ttl_seconds`` are ignored and purged; once the
+    table holds more than ``max_entries`` rows the least recently used ones
+    are deleted. Hit/miss counters and the LLM time saved by hits are
+    kept per process.
+    """
+
+    def __init__(
+        self,
+        db_path: str = "data/llm_cache.db",
+        ttl_seconds: float = 7 * 24 * 3600,
+        max_entries: int = 5000
+    ):
+        self.db_path = db_path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        self._db = get_connection_manager(db_path)
+        self._lock = threading.Lock()
+        self._init_db()
+        logger.info(f"Initialized LLM response cache at: {db_path}")
+
+    def _init_db(self):
+        """Initialize the cache table."""
+        with self._db.transaction() as cursor:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    provider TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    latency REAL NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            """)
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used ON llm_cache(last_used)
+            """)
+
+    @staticmethod
+    def make_key(
+        provider: str,
+        model: str,
+        system_prompt: Optional[str],
+        prompt: str,
+        temperature: float,
+        max_tokens: int
+    ) -> str:
+        """Hash of everything that determines a completion."""
+        payload = json.dumps(
+            [provider, model, system_prompt or "", prompt, round(float(temperature), 4), int(max_tokens)],
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Cached response for ``key`` if present and not expired."""
+        now = time.time()
+        cursor = self._db.cursor()
+        cursor.execute("""
+            SELECT response, latency FROM llm_cache
+            WHERE key = ? AND created_at > ?
+        """, (key, now - self.ttl_seconds))
+        row = cursor.fetchone()
+        if row is not None:
+            with self._db.transaction() as cursor:
+                cursor.execute("""
+                    UPDATE llm_cache SET last_used = ? WHERE key = ?
+                """, (now, key))
+
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.saved_seconds += row[1]
+        return row[0]
+
+    def put(self, key: str, provider: str, model: str, response: str, latency: float):
+        """Store a response, then evict expired and least recently used rows."""
+        now = time.time()
+        with self._db.transaction() as cursor:
+            cursor.execute("""
+                INSERT OR REPLACE INTO llm_cache
+                    (key, provider, model, response, latency, created_at, last_used)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (key, provider, model, response, latency, now, now))
+            cursor.execute("""
+                DELETE FROM llm_cache WHERE created_at <= ?
+            """, (now - self.ttl_seconds,))
+            cursor.execute("""
+                DELETE FROM llm_cache WHERE key IN (
+                    SELECT key FROM llm_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entries,))
+
+    def clear(self):
+        """Delete every cached response (counters are kept)."""
+        with self._db.transaction() as cursor:
+            cursor.execute("""
+                DELETE FROM llm_cache
+            """)
+
+    def count(self) -> int:
+        """Number of stored responses (including expired ones not yet purged)."""
+        cursor = self._db.cursor()
+        cursor.execute("""
+            SELECT COUNT(*) FROM llm_cache
+        """)
+        return cursor.fetchone()[0]
+
+    def stats(self) -> Dict:
+        """Get hit/miss counters, size and LLM time saved."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": self.count(),
+            "max_entries": self.max_entries,
+            "saved_seconds": self.saved_seconds
+        }
+
+    def close(self):
+        """Close database connections."""
+        self._db.close()
+
+
+class CachedLLMClient:
+    """Wrap an ``OllamaClient`` or ``GroqClient`` so repeated prompts skip the LLM.
+
+    ``generate`` is served from ``cache`` when the provider, model, prompts,
+    temperature and max_tokens all match. Calls with a temperature above
+    ``max_temperature`` are sampled for variety and always go to the
+    model. Every other attribute is delegated to the wrapped client.
+    """
+
+    def __init__(
+        self,
+        llm_client,
+        cache: LLMResponseCache,
+        provider: Optional[str] = None,
+        max_temperature: float = 0.5
+    ):
+        self.llm = llm_client
+        self.cache = cache
+        self.provider = provider or type(llm_client).__name__
+        self.max_temperature = max_temperature
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
+
+    def generate(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None
+    ) -> str:
+        """Generate text completion, reusing a cached response if one matches."""
+        # Resolve defaults the same way the clients do, so keys are stable
+        temperature = temperature or self.llm.temperature
+        max_tokens = max_tokens or self.llm.max_tokens
+        if temperature > self.max_temperature:
+            return self.llm.generate(prompt, system_prompt, temperature, max_tokens)
+
+        key = self.cache.make_key(
+            self.provider, self.llm.model, system_prompt, prompt, temperature, max_tokens
+        )
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        start_time = time.perf_counter()
+        response = self.llm.generate(prompt, system_prompt, temperature, max_tokens)
+        self.cache.put(key, self.provider, self.llm.model, response, time.perf_counter() - start_time)
+        return response
+
+    def generate_stream(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None
+    ) -> Iterator[str]:
+        """Stream a completion; a cached response is yielded as one chunk."""
+        temperature = temperature or self.llm.temperature
+        max_tokens = max_tokens or self.llm.max_tokens
+        if temperature > self.max_temperature:
+            yield from self.llm.generate_stream(prompt, system_prompt, temperature, max_tokens)
+            return
+
+        key = self.cache.make_key(
+            self.provider, self.llm.model, system_prompt, prompt, temperature, max_tokens
+        )
+        cached = self.cache.get(key)
+        if cached is not None:
+            yield cached
+            return
+
+        # Only complete streams are cached
+        start_time = time.perf_counter()
+        chunks = []
+        for chunk in self.llm.generate_stream(prompt, system_prompt, temperature, max_tokens):
+            chunks.append(chunk)
+            yield chunk
+        self.cache.put(key, self.provider, self.llm.model, "".join(chunks), time.perf_counter() - start_time)
@@ -0,0 +1,374 @@
+"""Priority scheduling and rate limiting of LLM requests."""
+
+import asyncio
+import heapq
+import itertools
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from functools import partial
+from typing import Callable, Dict, Iterator, List, Optional
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Lower value is served first
+PRIORITIES = {
+    "critical": 0,  # Provisional SEV1 incidents
+    "interactive": 1,  # A user waiting in the UI
+    "normal": 2,
+    "batch": 3  # Evaluation runs and other bulk work
+}
+
+_priority: ContextVar[str] = ContextVar("llm_request_priority", default="normal")
+
+# Token estimate of the request being sent, set by ScheduledLLMClient
+_request_tokens: ContextVar[int] = ContextVar("llm_request_tokens", default=0)
+
+
+@contextmanager
+def request_priority(priority: str):
+    """Run LLM calls made inside the block (and tasks it starts) at ``priority``."""
+    if priority not in PRIORITIES:
+        raise ValueError(f"Unknown priority: {priority}. Use one of {list(PRIORITIES)}")
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> str:
+    """Priority of LLM calls made from the current context."""
+    return _priority.get()
+
+
+class TokenBucket:
+    """Refills ``rate_per_minute`` units per minute, holding at most ``capacity``.
+
+    Not thread-safe on its own; ``LLMScheduler`` uses it under its lock.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self._level = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._level = min(self.capacity, self._level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def time_until(self, amount: float) -> float:
+        """Seconds until ``amount`` units are available (a request never needs more than ``capacity``)."""
+        self._refill()
+        return max(0.0, (min(amount, self.capacity) - self._level) / self.rate)
+
+    def consume(self, amount: float):
+        self._refill()
+        self._level -= min(amount, self.capacity)
+
+    def refund(self, amount: float):
+        self._refill()
+        self._level = min(self.capacity, self._level + amount)
+
+
+class LLMScheduler:
+    """Admits LLM requests in priority order within concurrency and rate limits.
+
+    Each request waits in a priority queue (FIFO within a priority) until it
+    is at the head, fewer than ``max_concurrency`` requests are running and
+    the request and token buckets can cover it. Tokens are estimated from
+    prompt length (``chars_per_token``); a request reserves its prompt plus
+    ``max_tokens`` and the unused part is refunded once the response is in.
+    A running request is never interrupted: higher priorities preempt lower
+    ones in the queue, so under an alert storm batch work waits instead of
+    the provider answering 429.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 4,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        chars_per_token: float = 4.0,
+        wait_window: int = 500,
+        poll_interval: float = 0.01
+    ):
+        self.max_concurrency = max_concurrency
+        self.chars_per_token = chars_per_token
+        self.poll_interval = poll_interval
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+
+        self._cond = threading.Condition()
+        self._queue = []  # heap of (priority value, sequence number)
+        self._sequence = itertools.count()
+        self._in_flight = 0
+        self._rate_limited = 0
+        self._waits = {priority: deque(maxlen=wait_window) for priority in PRIORITIES}
+        self._requests = {priority: 0 for priority in PRIORITIES}
+
+        logger.info(
+            f"Initialized LLM scheduler (max_concurrency={max_concurrency}, "
+            f"rpm={requests_per_minute}, tpm={tokens_per_minute})"
+        )
+
+    def estimate_tokens(self, *texts: Optional[str], max_tokens: int = 0) -> int:
+        """Rough token count of ``texts`` plus ``max_tokens`` of output."""
+        chars = sum(len(text) for text in texts if text)
+        return int(chars / self.chars_per_token) + max_tokens
+
+    @contextmanager
+    def slot(self, estimated_tokens: int = 0, priority: Optional[str] = None):
+        """Block until the request may run; the slot is held inside the block."""
+        priority = priority or current_priority()
+        ticket = self._enqueue(priority)
+        start_time = time.perf_counter()
+        try:
+            with self._cond:
+                while True:
+                    wait = self._try_acquire(ticket, estimated_tokens)
+                    if wait is None:
+                        break
+                    self._cond.wait(wait)
+        except BaseException:
+            self._abandon(ticket)
+            raise
+        self._record_wait(priority, time.perf_counter() - start_time)
+        try:
+            yield
+        finally:
+            self._release()
+
+    @asynccontextmanager
+    async def slot_async(self, estimated_tokens: int = 0, priority: Optional[str] = None):
+        """``slot`` for coroutines; waits without blocking the event loop."""
+        priority = priority or current_priority()
+        ticket = self._enqueue(priority)
+        start_time = time.perf_counter()
+        try:
+            while True:
+                with self._cond:
+                    wait = self._try_acquire(ticket, estimated_tokens)
+                if wait is None:
+                    break
+                await asyncio.sleep(min(wait, self.poll_interval))
+        except BaseException:
+            self._abandon(ticket)
+            raise
+        self._record_wait(priority, time.perf_counter() - start_time)
+        try:
+            yield
+        finally:
+            self._release()
+
+    def admission(self, asynchronous: bool = False) -> Callable:
+        """Slot factory for each attempt of the current request.
+
+        Captures the caller's priority and token estimate now, so retries
+        and hedges started from other threads are admitted the same way.
+        """
+        slot = self.slot_async if asynchronous else self.slot
+        return partial(slot, _request_tokens.get(), current_priority())
+
+    def settle(self, reserved_tokens: int, used_tokens: int):
+        """Return reserved but unused tokens to the token bucket."""
+        if self.token_bucket is None or used_tokens >= reserved_tokens:
+            return
+        with self._cond:
+            self.token_bucket.refund(reserved_tokens - used_tokens)
+            self._cond.notify_all()
+
+    def stats(self) -> Dict:
+        """Get queue wait times per priority, queue depth and rate limiting counters."""
+        with self._cond:
+            waits = {priority: sorted(samples) for priority, samples in self._waits.items()}
+            stats = {
+                "queued": len(self._queue),
+                "in_flight": self._in_flight,
+                "max_concurrency": self.max_concurrency,
+                "rate_limited": self._rate_limited,
+                "priorities": {}
+            }
+            requests = dict(self._requests)
+        for priority, samples in waits.items():
+            stats["priorities"][priority] = {
+                "requests": requests[priority],
+                "avg_wait": sum(samples) / len(samples) if samples else 0.0,
+                "p95_wait": samples[max(0, -(-len(samples) * 95 // 100) - 1)] if samples else 0.0,
+                "max_wait": samples[-1] if samples else 0.0
+            }
+        return stats
+
+    def _enqueue(self, priority: str):
+        if priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority: {priority}. Use one of {list(PRIORITIES)}")
+        ticket = (PRIORITIES[priority], next(self._sequence), [False])  # [rate limited yet]
+        with self._cond:
+            heapq.heappush(self._queue, ticket)
+        return ticket
+
+    def _try_acquire(self, ticket, estimated_tokens: int) -> Optional[float]:
+        """Start the request (``None``) or return how long to wait before retrying; holds the lock."""
+        if self._queue[0] is not ticket or self._in_flight >= self.max_concurrency:
+            return 1.0  # Woken up by notify_all when the head or in-flight count changes
+        wait = max(
+            self.request_bucket.time_until(1) if self.request_bucket else 0.0,
+            self.token_bucket.time_until(estimated_tokens) if self.token_bucket else 0.0
+        )
+        if wait > 0:
+            if not ticket[2][0]:
+                ticket[2][0] = True
+                self._rate_limited += 1
+            return wait
+        if self.request_bucket:
+            self.request_bucket.consume(1)
+        if self.token_bucket:
+            self.token_bucket.consume(estimated_tokens)
+        heapq.heappop(self._queue)
+        self._in_flight += 1
+        self._cond.notify_all()
+        return None
+
+    def _abandon(self, ticket):
+        with self._cond:
+            if ticket in self._queue:
+                self._queue.remove(ticket)
+                heapq.heapify(self._queue)
+            self._cond.notify_all()
+
+    def _release(self):
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    def _record_wait(self, priority: str, wait: float):
+        with self._cond:
+            self._waits[priority].append(wait)
+            self._requests[priority] += 1
+        if wait > 5:
+            logger.warning(f"LLM request ({priority}) waited {wait:.1f}s in the scheduler queue")
+
+
+def _message_texts(messages: List[Dict[str, str]]) -> List[str]:
+    return [message["content"] for message in messages]
+
+
+class ScheduledLLMClient:
+    """Wrap an ``OllamaClient`` or ``GroqClient`` so its calls go through ``scheduler``.
+
+    The scheduler is installed on the client's transport, which admits
+    every attempt (retries and hedged duplicates included) separately; this
+    wrapper supplies each request's token estimate and refunds what the
+    response did not use. Failed and hedged attempts are charged in full.
+    Calls run at ``current_priority()``; set it with ``request_priority``.
+    Every other attribute is delegated to the wrapped client.
+    """
+
+    def __init__(self, llm_client, scheduler: LLMScheduler):
+        self.llm = llm_client
+        self.scheduler = scheduler
+        llm_client.transport.scheduler = scheduler
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
+
+    def generate(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None
+    ) -> str:
+        """Generate text completion once the scheduler admits the request."""
+        reserved = self.scheduler.estimate_tokens(prompt, system_prompt, max_tokens=max_tokens or self.llm.max_tokens)
+        token = _request_tokens.set(reserved)
+        response = ""
+        try:
+            response = self.llm.generate(prompt, system_prompt, temperature, max_tokens)
+            return response
+        finally:
+            _request_tokens.reset(token)
+            self.scheduler.settle(reserved, self.scheduler.estimate_tokens(prompt, system_prompt, response))
+
+    def generate_stream(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None
+    ) -> Iterator[str]:
+        """Stream a completion; the concurrency slot is held until the stream ends."""
+        reserved = self.scheduler.estimate_tokens(prompt, system_prompt, max_tokens=max_tokens or self.llm.max_tokens)
+        chunks = []
+        stream = self.llm.generate_stream(prompt, system_prompt, temperature, max_tokens)
+        try:
+            # The transport admits the request when the first chunk is requested;
+            # the estimate is only set around that, not while the caller iterates
+            token = _request_tokens.set(reserved)
+            try:
+                first = next(stream, None)
+            finally:
+                _request_tokens.reset(token)
+            if first is None:
+                return
+            chunks.append(first)
+            yield first
+            for chunk in stream:
+                chunks.append(chunk)
+                yield chunk
+        finally:
+            stream.close()
+            self.scheduler.settle(reserved, self.scheduler.estimate_tokens(prompt, system_prompt, *chunks))
+
+    def chat(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None
+    ) -> str:
+        """Multi-turn chat once the scheduler admits the request."""
+        texts = _message_texts(messages)
+        reserved = self.scheduler.estimate_tokens(*texts, max_tokens=max_tokens or self.llm.max_tokens)
+        token = _request_tokens.set(reserved)
+        response = ""
+        try:
+            response = self.llm.chat(messages, temperature, max_tokens)
+            return response
+        finally:
+            _request_tokens.reset(token)
+            self.scheduler.settle(reserved, self.scheduler.estimate_tokens(*texts, response))
+
+
+class AsyncScheduledLLMClient:
+    """``ScheduledLLMClient`` for ``AsyncOllamaClient`` and ``AsyncGroqClient``."""
+
+    def __init__(self, llm_client, scheduler: LLMScheduler):
+        self.llm = llm_client
+        self.scheduler = scheduler
+        llm_client.transport.scheduler = scheduler
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
+
+    async def generate(
+        self,
+        prompt: str,
+        system_prompt: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None
+    ) -> str:
+        """Generate text completion once the scheduler admits the request."""
+        reserved = self.scheduler.estimate_tokens(prompt, system_prompt, max_tokens=max_tokens or self.llm.max_tokens)
+        token = _request_tokens.set(reserved)
+        response = ""
+        try:
+            response = await self.llm.generate(prompt, system_prompt, temperature, max_tokens)
+            return response
+        finally:
+            _request_tokens.reset(token)
+            self.scheduler.settle(reserved, self.scheduler.estimate_tokens(prompt, system_prompt, response))
@@ -0,0 +1,19 @@
+"""Helpers for consuming streamed LLM output."""
+
+from typing import Callable, Optional
+
+
+def generate_with_tokens(llm_client, on_token: Optional[Callable[[str], None]] = None, **kwargs) -> str:
+    """Return the full completion, passing each chunk to ``on_token`` as it arrives.
+    
+    Without a callback (or a client lacking ``generate_stream``) this is a
+    plain ``generate`` call.
+    """
+    if on_token is None or not hasattr(llm_client, "generate_stream"):
+        return llm_client.generate(**kwargs)
+    
+    chunks = []
+    for chunk in llm_client.generate_stream(**kwargs):
+        chunks.append(chunk)
+        on_token(chunk)
+    return "".join(chunks)
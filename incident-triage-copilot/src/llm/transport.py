@@ -0,0 +1,428 @@
+"""Retries, timeouts and hedged requests for LLM calls."""
+
+import asyncio
+import math
+import random
+import threading
+import time
+from functools import partial
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Request timeout and rate limiting, plus any 5xx; other 4xx will fail again
+TRANSIENT_STATUS_CODES = frozenset({408, 429})
+
+_END = object()  # First "chunk" of an empty stream
+
+
+def is_transient(error: BaseException) -> bool:
+    """Whether a failed LLM call is worth retrying.
+
+    HTTP errors from ollama (``ResponseError``) and groq (``APIStatusError``)
+    carry a ``status_code``; connection errors are recognised anywhere in the
+    ``__cause__`` chain, since groq wraps the underlying httpx error.
+    """
+    status_code = getattr(error, "status_code", None)
+    if isinstance(status_code, int) and status_code > 0:
+        return status_code >= 500 or status_code in TRANSIENT_STATUS_CODES
+
+    import httpx
+
+    while error is not None:
+        if isinstance(error, (httpx.TransportError, ConnectionError, TimeoutError, asyncio.TimeoutError)):
+            return True
+        error = error.__cause__
+    return False
+
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    """Seconds from a ``Retry-After`` header on the error's response, if any."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def _first_chunk(fn: Callable[[], Iterator]):
+    """Start a stream and wait for its first item (``_END`` if it is empty)."""
+    iterator = iter(fn())
+    return iterator, next(iterator, _END)
+
+
+def _close_stream(started):
+    started[0].close()
+
+
+class _AdmittedStream:
+    """Stream iterator that holds its scheduler slot until exhausted or closed."""
+
+    def __init__(self, iterator: Iterator, slot):
+        self._iterator = iterator
+        self._slot = slot
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return next(self._iterator)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        if self._slot is None:
+            return
+        slot, self._slot = self._slot, None
+        try:
+            close = getattr(self._iterator, "close", None)
+            if close is not None:
+                close()
+        finally:
+            slot.__exit__(None, None, None)
+
+
+class LLMTransport:
+    """Connection, retry and hedging policy shared by the LLM clients.
+
+    - Connections: ``httpx_options()`` gives the HTTP client a per-request
+      timeout (ollama's default is none) and a keep-alive pool whose idle
+      connections outlive the gaps between triage calls.
+    - Retries: transient failures are retried up to ``max_retries`` times
+      with full-jitter exponential backoff (``Retry-After`` is honoured).
+      Streams are only retried until their first chunk arrives.
+    - Hedging: with ``hedge``, a call still running after the
+      ``hedge_quantile`` latency of earlier calls with the same key (the
+      system prompt, i.e. the agent) gets a duplicate request, and the
+      first to succeed wins. Streams hedge on time to first chunk and
+      close the losing stream. Until ``hedge_min_samples`` calls have been
+      seen there is no hedging. A losing sync call cannot be aborted and
+      finishes in the background; async losers are cancelled.
+    - Scheduling: with ``scheduler`` set (see ``ScheduledLLMClient``), every
+      attempt, retries and hedges included, waits for a scheduler slot and
+      is charged to its rate limits. Time queued there counts toward
+      neither the timeout nor the hedge delay.
+    """
+
+    def __init__(
+        self,
+        timeout: float = 300.0,
+        max_retries: int = 2,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        hedge: bool = False,
+        hedge_quantile: float = 0.95,
+        hedge_min_samples: int = 20,
+        latency_window: int = 200,
+        keepalive_seconds: float = 120.0,
+        max_connections: int = 100,
+        retry_on: Callable[[BaseException], bool] = is_transient
+    ):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self.latency_window = latency_window
+        self.keepalive_seconds = keepalive_seconds
+        self.max_connections = max_connections
+        self.retry_on = retry_on
+
+        self.scheduler = None  # LLMScheduler admitting each attempt, if any
+
+        self._lock = threading.Lock()
+        self._latencies = OrderedDict()  # (kind, key) -> deque of recent successful latencies
+        self._executor = None  # Only needed for sync hedging
+        self._stats = {
+            "calls": 0,
+            "retries": 0,
+            "failures": 0,
+            "hedged": 0,
+            "hedge_wins": 0
+        }
+
+    def httpx_options(self) -> Dict[str, Any]:
+        """Timeout and connection pool settings for an httpx client."""
+        import httpx
+
+        return {
+            "timeout": httpx.Timeout(self.timeout, connect=min(10.0, self.timeout)),
+            "limits": httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+                keepalive_expiry=self.keepalive_seconds
+            )
+        }
+
+    def call(self, fn: Callable[[], Any], key: Optional[str] = None) -> Any:
+        """Run ``fn()`` with retries and, if enabled, hedging."""
+        self._count("calls")
+        key = ("call", key)
+        start = partial(self._timed, fn, key, self._admission())
+        attempt = 0
+        while True:
+            try:
+                return self._hedged(start, key) if self.hedge else start()
+            except Exception as e:
+                attempt = self._before_retry(e, attempt)
+                time.sleep(self._backoff(attempt, e))
+
+    def stream(self, fn: Callable[[], Iterator], key: Optional[str] = None) -> Iterator:
+        """Iterate ``fn()``, retrying (and hedging) until the first item arrives.
+
+        Items already handed to the caller cannot be taken back, so a stream
+        failing midway raises instead of restarting.
+        """
+        self._count("calls")
+        key = ("stream", key)
+        start = partial(self._open_stream, fn, key, self._admission())
+        attempt = 0
+        while True:
+            try:
+                if self.hedge:
+                    iterator, first = self._hedged(start, key, discard=_close_stream)
+                else:
+                    iterator, first = start()
+                break
+            except Exception as e:
+                attempt = self._before_retry(e, attempt)
+                time.sleep(self._backoff(attempt, e))
+        try:
+            if first is _END:
+                return
+            yield first
+            yield from iterator
+        finally:
+            iterator.close()
+
+    async def call_async(self, fn: Callable[[], Awaitable], key: Optional[str] = None) -> Any:
+        """Await ``fn()`` with a hard timeout, retries and, if enabled, hedging."""
+        self._count("calls")
+        key = ("call", key)
+        start = partial(self._timed_async, fn, key, self._admission(asynchronous=True))
+        attempt = 0
+        while True:
+            try:
+                if self.hedge:
+                    return await self._hedged_async(start, key)
+                return await start()
+            except Exception as e:
+                attempt = self._before_retry(e, attempt)
+                await asyncio.sleep(self._backoff(attempt, e))
+
+    def hedge_delay(self, key: Optional[str] = None, stream: bool = False) -> Optional[float]:
+        """Latency after which a duplicate request is sent, or ``None`` (too few samples)."""
+        return self._hedge_delay(("stream" if stream else "call", key))
+
+    def stats(self) -> Dict:
+        """Get call, retry, failure and hedging counters."""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["hedge_win_rate"] = stats["hedge_wins"] / stats["hedged"] if stats["hedged"] else 0.0
+        return stats
+
+    def close(self):
+        """Stop the hedging worker threads."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def _before_retry(self, error: Exception, attempt: int) -> int:
+        """Re-raise ``error`` unless another attempt is allowed; return the attempt number."""
+        if attempt >= self.max_retries or not self.retry_on(error):
+            self._count("failures")
+            raise error
+        attempt += 1
+        self._count("retries")
+        logger.warning(f"LLM call failed ({type(error).__name__}: {error}), retry {attempt}/{self.max_retries}")
+        return attempt
+
+    def _backoff(self, attempt: int, error: BaseException) -> float:
+        """Full-jitter exponential backoff, or the server's ``Retry-After``."""
+        retry_after = _retry_after(error)
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+
+    def _hedge_delay(self, key: tuple) -> Optional[float]:
+        with self._lock:
+            latencies = self._latencies.get(key)
+            if latencies is None or len(latencies) < self.hedge_min_samples:
+                return None
+            ordered = sorted(latencies)
+        # Nearest-rank percentile
+        return ordered[max(0, math.ceil(self.hedge_quantile * len(ordered)) - 1)]
+
+    def _admission(self, asynchronous: bool = False) -> Optional[Callable]:
+        """Slot factory for the attempts of the calling request, or ``None`` without a scheduler.
+
+        Priority and token estimate are captured here, in the caller's
+        context, so attempts on hedging threads are admitted the same way.
+        """
+        if self.scheduler is None:
+            return None
+        return self.scheduler.admission(asynchronous)
+
+    def _timed(
+        self,
+        fn: Callable[[], Any],
+        key: tuple,
+        admit: Optional[Callable] = None,
+        admitted: Optional[threading.Event] = None
+    ) -> Any:
+        with admit() if admit else nullcontext():
+            if admitted is not None:
+                admitted.set()
+            start_time = time.perf_counter()
+            result = fn()
+            self._record(key, time.perf_counter() - start_time)
+        return result
+
+    def _open_stream(
+        self,
+        fn: Callable[[], Iterator],
+        key: tuple,
+        admit: Optional[Callable] = None,
+        admitted: Optional[threading.Event] = None
+    ):
+        """Start a stream once admitted; the slot is held until the stream is closed."""
+        slot = admit() if admit else nullcontext()
+        slot.__enter__()
+        try:
+            if admitted is not None:
+                admitted.set()
+            start_time = time.perf_counter()
+            iterator, first = _first_chunk(fn)
+            self._record(key, time.perf_counter() - start_time)
+        except BaseException:
+            slot.__exit__(None, None, None)
+            raise
+        return _AdmittedStream(iterator, slot), first
+
+    async def _timed_async(
+        self,
+        fn: Callable[[], Awaitable],
+        key: tuple,
+        admit: Optional[Callable] = None,
+        admitted: Optional[asyncio.Event] = None
+    ) -> Any:
+        if admit is None:
+            return await self._run_timed_async(fn, key, admitted)
+        async with admit():
+            return await self._run_timed_async(fn, key, admitted)
+
+    async def _run_timed_async(
+        self,
+        fn: Callable[[], Awaitable],
+        key: tuple,
+        admitted: Optional[asyncio.Event]
+    ) -> Any:
+        if admitted is not None:
+            admitted.set()
+        start_time = time.perf_counter()
+        result = await asyncio.wait_for(fn(), self.timeout)
+        self._record(key, time.perf_counter() - start_time)
+        return result
+
+    def _hedged(
+        self,
+        start: Callable[..., Any],
+        key: tuple,
+        discard: Optional[Callable[[Any], None]] = None
+    ) -> Any:
+        """Run ``start()``, racing a second ``start()`` if the first is slow."""
+        delay = self._hedge_delay(key)
+        if delay is None:
+            return start()
+
+        executor = self._get_executor()
+        admitted = threading.Event()
+        first = executor.submit(start, admitted=admitted)
+        first.add_done_callback(lambda _: admitted.set())
+        # Time queued in the scheduler does not count toward the hedge delay
+        admitted.wait()
+        done, _ = wait([first], timeout=delay)
+        if done:
+            return first.result()
+
+        self._count("hedged")
+        second = executor.submit(start)
+        pending = {first, second}
+        while True:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is second:
+                        self._count("hedge_wins")
+                    if discard is not None:
+                        for loser in pending:
+                            loser.add_done_callback(
+                                lambda f: f.exception() is None and discard(f.result())
+                            )
+                    return future.result()
+            if not pending:
+                raise done.pop().exception()
+
+    async def _hedged_async(self, start: Callable[..., Awaitable], key: tuple) -> Any:
+        delay = self._hedge_delay(key)
+        if delay is None:
+            return await start()
+
+        admitted = asyncio.Event()
+        first = asyncio.ensure_future(start(admitted=admitted))
+        first.add_done_callback(lambda _: admitted.set())
+        pending = {first}
+        try:
+            await admitted.wait()
+            done, pending = await asyncio.wait(pending, timeout=delay)
+            if done:
+                return first.result()
+
+            self._count("hedged")
+            second = asyncio.ensure_future(start())
+            pending = {first, second}
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            self._count("hedge_wins")
+                        return task.result()
+                if not pending:
+                    raise done.pop().exception()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_connections, thread_name_prefix="llm-hedge"
+                )
+            return self._executor
+
+    def _record(self, key: tuple, latency: float):
+        with self._lock:
+            latencies = self._latencies.get(key)
+            if latencies is None:
+                # Keys are system prompts; keep a bounded number of them
+                if len(self._latencies) >= 64:
+                    self._latencies.popitem(last=False)
+                latencies = self._latencies[key] = deque(maxlen=self.latency_window)
+            latencies.append(latency)
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
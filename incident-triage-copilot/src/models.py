@@ -42,4 +42,5 @@ class TriageResult(BaseModel):
     citations: List[str]
     reasoning: Optional[str] = None
     processing_time: float
+    stage_time_saved: float = 0.0  # Critical-path seconds saved by overlapping stages
     timestamp: str = Field(default_factory=lambda: datetime.now().isoformat())
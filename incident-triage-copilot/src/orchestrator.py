@@ -1,72 +1,434 @@
 """Orchestrator for the incident triage copilot."""
 
+import re
+import threading
 import time
-from typing import Dict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from src.llm.ollama_client import OllamaClient
+from src.llm.scheduler import current_priority, request_priority
 from src.storage.runbook_store import RunbookStore
 from src.agents.classifier import IncidentClassifier
 from src.agents.root_cause import RootCauseAnalyzer
 from src.agents.mitigation import MitigationPlanner
+from src.agents.fused import FusedTriageAgent
 from src.models import IncidentContext, TriageResult
 from src.utils.logger import get_logger
 from src.utils.metrics import MetricsTracker
 
 logger = get_logger(__name__)
 
+# progress(stage, event, data): event is "started", "token" (data = text
+# chunk) or "completed" (data = the stage's result)
+ProgressCallback = Callable[[str, str, Any], None]
+
 
 class TriageOrchestrator:
-    """Orchestrates the incident triage process."""
+    """Orchestrates the incident triage process.
+    
+    ``stage_mode`` controls how the triage steps are run:
+    
+    - "sequential": classify, then search runbooks and analyze.
+    - "concurrent": the runbook search (query embedding + vector search
+      with a provisional category guessed from the alert keywords) runs
+      while the classifier LLM call is in flight; it is reused if the
+      classifier picks the same category.
+    - "speculative": additionally runs the root-cause LLM call with the
+      provisional category, at the triage's scheduler priority; it is kept
+      if the classifier agrees and discarded (and redone) otherwise.
+    - "fused": searches runbooks first, then makes a single LLM call that
+      returns classification, root causes and mitigation plan together.
+    """
+    
+    STAGE_MODES = ("sequential", "concurrent", "speculative", "fused")
+    
+    STAGES = {
+        "classify": "Classifying incident",
+        "root_cause": "Analyzing root causes",
+        "mitigation": "Generating mitigation plan",
+        "fused": "Triaging incident in a single LLM call"
+    }
+    
+    # Alert words that mark a likely SEV1 outage before classification
+    # ("critical" is left out: alerts use it for resource thresholds)
+    SEV1_KEYWORDS = frozenset({"down", "outage", "unavailable", "refused", "sev1"})
     
     def __init__(
         self,
         llm_client: OllamaClient,
         runbook_store: RunbookStore,
-        metrics_tracker: MetricsTracker
+        metrics_tracker: MetricsTracker,
+        async_llm_client=None,
+        stage_mode: str = "sequential",
+        max_workers: int = 4
     ):
+        self._check_stage_mode(stage_mode)
         self.llm = llm_client
+        self.async_llm = async_llm_client
         self.runbook_store = runbook_store
         self.metrics = metrics_tracker
         
         # Initialize agents
-        self.classifier = IncidentClassifier(llm_client)
-        self.root_cause_analyzer = RootCauseAnalyzer(llm_client, runbook_store)
-        self.mitigation_planner = MitigationPlanner(llm_client, runbook_store)
+        self.classifier = IncidentClassifier(llm_client, async_llm_client)
+        self.root_cause_analyzer = RootCauseAnalyzer(llm_client, runbook_store, async_llm_client)
+        self.mitigation_planner = MitigationPlanner(llm_client, runbook_store, async_llm_client)
+        self.fused_agent = FusedTriageAgent(self.classifier, self.root_cause_analyzer, self.mitigation_planner)
         
-        logger.info("Initialized TriageOrchestrator")
+        # Background stage work (runbook prefetch, speculative analysis);
+        # threads are only started once a triage overlaps stages
+        self.stage_mode = stage_mode
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="triage-stage")
+        self._stats_lock = threading.Lock()
+        self._stage_stats = {
+            "triages": 0,
+            "prefetch_reused": 0,
+            "speculated": 0,
+            "speculation_accepted": 0,
+            "speculation_discarded": 0,
+            "time_saved": 0.0
+        }
+        
+        logger.info(f"Initialized TriageOrchestrator ({stage_mode} stages)")
     
-    def triage_incident(self, incident: IncidentContext) -> TriageResult:
-        """Perform end-to-end incident triage."""
+    def triage_incident(
+        self,
+        incident: IncidentContext,
+        progress: Optional[ProgressCallback] = None,
+        stage_mode: Optional[str] = None,
+        priority: Optional[str] = None
+    ) -> TriageResult:
+        """Perform end-to-end incident triage.
+        
+        With ``progress``, each stage reports when it starts and completes,
+        and LLM output is streamed to it token by token in between.
+        ``stage_mode`` overrides the orchestrator's mode for this triage
+        (e.g. to evaluate modes side by side). ``priority`` is the LLM
+        scheduler priority of its calls (see ``triage_priority``).
+        """
+        stage_mode = stage_mode or self.stage_mode
+        self._check_stage_mode(stage_mode)
+        with request_priority(self.triage_priority(incident, priority)):
+            if stage_mode == "fused":
+                return self._triage_fused(incident, progress)
+            return self._triage_staged(incident, progress, stage_mode)
+    
+    def _triage_staged(
+        self,
+        incident: IncidentContext,
+        progress: Optional[ProgressCallback],
+        stage_mode: str
+    ) -> TriageResult:
+        """Classify, analyze and plan with one LLM call per step."""
         start_time = time.time()
         
         logger.info(f"Starting triage for incident: {incident.alert.incident_id}")
         
-        # Step 1: Classify incident
-        logger.info("Step 1: Classifying incident...")
-        classification = self.classifier.classify(incident)
-        
-        # Step 2: Analyze root causes
-        logger.info("Step 2: Analyzing root causes...")
-        root_cause_analysis = self.root_cause_analyzer.analyze(
-            incident=incident,
-            severity=classification["severity"],
-            category=classification["category"]
-        )
+        # Steps 1-2: Classify incident and analyze root causes
+        if stage_mode == "sequential":
+            classification = self._classify(incident, progress)
+            root_cause_analysis = self._analyze(incident, classification, progress)
+            time_saved = 0.0
+        else:
+            classification, root_cause_analysis, time_saved = self._classify_and_analyze_overlapped(
+                incident, progress, speculative=stage_mode == "speculative"
+            )
         
         # Step 3: Generate mitigation plan
         logger.info("Step 3: Generating mitigation plan...")
+        self._notify(progress, "mitigation", "started")
         mitigation = self.mitigation_planner.generate_plan(
             incident=incident,
             severity=classification["severity"],
             category=classification["category"],
             root_causes=root_cause_analysis.get("root_causes", []),
-            relevant_runbooks=root_cause_analysis.get("relevant_runbooks", [])
+            relevant_runbooks=root_cause_analysis.get("relevant_runbooks", []),
+            on_token=self._token_callback(progress, "mitigation")
         )
+        self._notify(progress, "mitigation", "completed", mitigation)
         
         # Calculate processing time
         processing_time = time.time() - start_time
         
-        # Build triage result
-        result = TriageResult(
+        result = self._build_result(incident, classification, root_cause_analysis, mitigation, processing_time)
+        result.stage_time_saved = time_saved
+        self._record_metrics(result)
+        with self._stats_lock:
+            self._stage_stats["triages"] += 1
+            self._stage_stats["time_saved"] += time_saved
+        
+        logger.info(f"Triage completed in {processing_time:.2f}s ({time_saved:.2f}s saved by overlapping stages)")
+        return result
+    
+    def _classify(self, incident: IncidentContext, progress: Optional[ProgressCallback]) -> Dict:
+        """Step 1: Classify incident."""
+        logger.info("Step 1: Classifying incident...")
+        self._notify(progress, "classify", "started")
+        classification = self.classifier.classify(
+            incident,
+            on_token=self._token_callback(progress, "classify")
+        )
+        self._notify(progress, "classify", "completed", classification)
+        return classification
+    
+    def _analyze(
+        self,
+        incident: IncidentContext,
+        classification: Dict,
+        progress: Optional[ProgressCallback],
+        relevant_runbooks: Optional[List[Dict]] = None
+    ) -> Dict:
+        """Step 2: Analyze root causes."""
+        logger.info("Step 2: Analyzing root causes...")
+        self._notify(progress, "root_cause", "started")
+        root_cause_analysis = self.root_cause_analyzer.analyze(
+            incident=incident,
+            severity=classification["severity"],
+            category=classification["category"],
+            on_token=self._token_callback(progress, "root_cause"),
+            relevant_runbooks=relevant_runbooks
+        )
+        self._notify(progress, "root_cause", "completed", root_cause_analysis)
+        return root_cause_analysis
+    
+    def _classify_and_analyze_overlapped(
+        self,
+        incident: IncidentContext,
+        progress: Optional[ProgressCallback],
+        speculative: bool
+    ) -> Tuple[Dict, Dict, float]:
+        """Steps 1-2 with root-cause work started while the classifier runs.
+        
+        Progress callbacks stay on the calling thread (UIs such as Streamlit
+        can only draw from there); only silent work goes to the executor.
+        Returns the classification, the analysis and the critical-path time
+        saved: how long the reused background work took minus how long the
+        caller still had to wait for it.
+        """
+        provisional = self._provisional_category(incident)
+        if provisional is None:
+            # Nothing to prefetch for: the result would always be discarded
+            classification = self._classify(incident, progress)
+            return classification, self._analyze(incident, classification, progress), 0.0
+        
+        # Executor threads do not inherit the triage's priority. Speculation
+        # keeps it: at a lower one, an accepted guess would leave the triage
+        # waiting behind the whole lower-priority queue
+        future = self._executor.submit(
+            self._prefetch_root_cause, incident, provisional, speculative, current_priority()
+        )
+        if speculative:
+            with self._stats_lock:
+                self._stage_stats["speculated"] += 1
+        
+        classification = self._classify(incident, progress)
+        
+        if classification["category"] != provisional:
+            # Wrong guess: the work is discarded (the query embedding stays cached);
+            # a speculative LLM call already running cannot be cancelled
+            future.cancel()
+            if speculative:
+                logger.info(
+                    f"Discarding speculative analysis for {provisional}, "
+                    f"classifier chose {classification['category']}"
+                )
+                with self._stats_lock:
+                    self._stage_stats["speculation_discarded"] += 1
+            return classification, self._analyze(incident, classification, progress), 0.0
+        
+        wait_start = time.perf_counter()
+        try:
+            relevant_runbooks, speculative_analysis, duration = future.result()
+        except Exception as e:
+            logger.warning(f"Background root-cause work failed, redoing it: {e}")
+            return classification, self._analyze(incident, classification, progress), 0.0
+        time_saved = max(0.0, duration - (time.perf_counter() - wait_start))
+        
+        if speculative_analysis is None:
+            with self._stats_lock:
+                self._stage_stats["prefetch_reused"] += 1
+            root_cause_analysis = self._analyze(
+                incident, classification, progress, relevant_runbooks=relevant_runbooks
+            )
+            return classification, root_cause_analysis, time_saved
+        
+        logger.info(f"Speculative root-cause analysis for {provisional} accepted")
+        with self._stats_lock:
+            self._stage_stats["speculation_accepted"] += 1
+        self._notify(progress, "root_cause", "started")
+        self._notify(progress, "root_cause", "completed", speculative_analysis)
+        return classification, speculative_analysis, time_saved
+    
+    def _triage_fused(
+        self,
+        incident: IncidentContext,
+        progress: Optional[ProgressCallback]
+    ) -> TriageResult:
+        """Retrieve runbooks, then triage with one LLM call."""
+        start_time = time.time()
+        
+        logger.info(f"Starting fused triage for incident: {incident.alert.incident_id}")
+        self._notify(progress, "fused", "started")
+        classification, root_cause_analysis, mitigation = self.fused_agent.triage(
+            incident,
+            on_token=self._token_callback(progress, "fused")
+        )
+        self._notify(progress, "fused", "completed", {
+            "classification": classification,
+            "root_cause_analysis": root_cause_analysis,
+            "mitigation": mitigation
+        })
+        
+        processing_time = time.time() - start_time
+        
+        result = self._build_result(incident, classification, root_cause_analysis, mitigation, processing_time)
+        self._record_metrics(result)
+        with self._stats_lock:
+            self._stage_stats["triages"] += 1
+        
+        logger.info(f"Fused triage completed in {processing_time:.2f}s")
+        return result
+    
+    def _prefetch_root_cause(
+        self,
+        incident: IncidentContext,
+        category: Optional[str],
+        speculate: bool,
+        priority: str
+    ) -> Tuple[List[Dict], Optional[Dict], float]:
+        """Search runbooks (and optionally analyze) for a provisional category."""
+        start_time = time.perf_counter()
+        relevant_runbooks = self.root_cause_analyzer.find_runbooks(incident, category)
+        analysis = None
+        if speculate:
+            with request_priority(priority):
+                analysis = self.root_cause_analyzer.analyze(
+                    incident=incident,
+                    severity=None,
+                    category=category,
+                    relevant_runbooks=relevant_runbooks
+                )
+        return relevant_runbooks, analysis, time.perf_counter() - start_time
+    
+    def _provisional_category(self, incident: IncidentContext) -> Optional[str]:
+        """Guess the category from alert keywords, or ``None`` if unsure."""
+        # Service names ("user-service", "api-gateway") say little about the category
+        alert = incident.alert
+        category = self.runbook_store.category_matcher.match(
+            alert.alert_name,
+            " ".join([alert.description, *alert.tags])
+        )
+        return category if category in self.classifier.CATEGORIES else None
+    
+    def triage_priority(self, incident: IncidentContext, priority: Optional[str] = None) -> str:
+        """LLM scheduler priority for a triage.
+        
+        Incidents that look like SEV1 outages from their alert alone run as
+        "critical", ahead of everything else, unless the caller asked for
+        "batch" (evaluation runs are batch work whatever their incidents).
+        """
+        if priority == "batch":
+            return priority
+        alert = incident.alert
+        words = set(re.findall(r"[a-z0-9]+", " ".join([alert.alert_name, alert.description, *alert.tags]).lower()))
+        if words & self.SEV1_KEYWORDS:
+            return "critical"
+        return priority or "normal"
+    
+    def stages(self, stage_mode: Optional[str] = None) -> List[str]:
+        """Stage names reported to progress callbacks, in order."""
+        if (stage_mode or self.stage_mode) == "fused":
+            return ["fused"]
+        return ["classify", "root_cause", "mitigation"]
+    
+    def _check_stage_mode(self, stage_mode: str):
+        """Raise ``ValueError`` for an unknown stage mode."""
+        if stage_mode not in self.STAGE_MODES:
+            raise ValueError(f"Unknown stage_mode: {stage_mode}. Use one of {self.STAGE_MODES}")
+    
+    def stage_stats(self) -> Dict:
+        """Get stage-overlap counters and the total critical-path time saved."""
+        with self._stats_lock:
+            stats = dict(self._stage_stats, mode=self.stage_mode)
+        stats["avg_time_saved"] = stats["time_saved"] / stats["triages"] if stats["triages"] else 0.0
+        speculated = stats["speculation_accepted"] + stats["speculation_discarded"]
+        stats["speculation_hit_rate"] = stats["speculation_accepted"] / speculated if speculated else 0.0
+        return stats
+    
+    async def triage_incident_async(
+        self,
+        incident: IncidentContext,
+        stage_mode: Optional[str] = None,
+        priority: Optional[str] = None
+    ) -> TriageResult:
+        """Perform end-to-end incident triage as a coroutine.
+        
+        LLM calls are awaited on the async client (or run in worker threads
+        without one) and runbook lookups run in threads, so a single event
+        loop can keep many triages in flight. Only "fused" changes how the
+        steps run here; other modes run the three steps in order.
+        """
+        stage_mode = stage_mode or self.stage_mode
+        self._check_stage_mode(stage_mode)
+        start_time = time.time()
+        
+        logger.info(f"Starting async triage for incident: {incident.alert.incident_id}")
+        
+        with request_priority(self.triage_priority(incident, priority)):
+            if stage_mode == "fused":
+                classification, root_cause_analysis, mitigation = await self.fused_agent.triage_async(incident)
+            else:
+                classification = await self.classifier.classify_async(incident)
+                root_cause_analysis = await self.root_cause_analyzer.analyze_async(
+                    incident=incident,
+                    severity=classification["severity"],
+                    category=classification["category"]
+                )
+                mitigation = await self.mitigation_planner.generate_plan_async(
+                    incident=incident,
+                    severity=classification["severity"],
+                    category=classification["category"],
+                    root_causes=root_cause_analysis.get("root_causes", []),
+                    relevant_runbooks=root_cause_analysis.get("relevant_runbooks", [])
+                )
+        
+        processing_time = time.time() - start_time
+        
+        result = self._build_result(incident, classification, root_cause_analysis, mitigation, processing_time)
+        self._record_metrics(result)
+        
+        logger.info(f"Async triage completed in {processing_time:.2f}s")
+        return result
+    
+    @staticmethod
+    def _notify(progress: Optional[ProgressCallback], stage: str, event: str, data: Any = None):
+        """Report a stage event; a failing callback must not fail the triage."""
+        if progress is None:
+            return
+        try:
+            progress(stage, event, data)
+        except Exception as e:
+            logger.warning(f"Progress callback failed for {stage}/{event}: {e}")
+    
+    def _token_callback(
+        self,
+        progress: Optional[ProgressCallback],
+        stage: str
+    ) -> Optional[Callable[[str], None]]:
+        """Token hook for an agent, or ``None`` (no streaming) without ``progress``."""
+        if progress is None:
+            return None
+        return lambda chunk: self._notify(progress, stage, "token", chunk)
+    
+    def _build_result(
+        self,
+        incident: IncidentContext,
+        classification: Dict,
+        root_cause_analysis: Dict,
+        mitigation: Dict,
+        processing_time: float
+    ) -> TriageResult:
+        """Build the triage result from the three agents' outputs."""
+        return TriageResult(
             incident_id=incident.alert.incident_id,
             severity=classification["severity"],
             category=classification["category"],
@@ -78,20 +440,18 @@ class TriageOrchestrator:
             reasoning=classification.get("reasoning", ""),
             processing_time=processing_time
         )
-        
-        # Record metrics
+    
+    def _record_metrics(self, result: TriageResult):
+        """Record a completed triage with the metrics tracker."""
         self.metrics.record_triage(
-            incident_id=incident.alert.incident_id,
+            incident_id=result.incident_id,
             severity_predicted=result.severity,
             category_predicted=result.category,
             root_causes=result.root_causes,
             mitigation_plan=result.mitigation_plan,
             citations=result.citations,
-            processing_time=processing_time
+            processing_time=result.processing_time
         )
-        
-        logger.info(f"Triage completed in {processing_time:.2f}s")
-        return result
     
     def _format_mitigation_plan(self, mitigation: Dict) -> str:
         """Format mitigation plan for display."""
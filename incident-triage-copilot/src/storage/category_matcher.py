@@ -0,0 +1,100 @@
+"""Single-pass keyword scoring for runbook categories."""
+
+import re
+from collections import Counter, defaultdict
+from typing import Dict, List, Mapping, Optional, Tuple, Union
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Used when config.yaml has no runbook_categories section
+DEFAULT_CATEGORY_KEYWORDS = {
+    "Database": ["db", "database", "postgres", "mysql", "sql"],
+    "API/Service": ["api", "service", "gateway", "rest", "http"],
+    "Infrastructure": ["infra", "kubernetes", "k8s", "docker", "aws"],
+    "Network": ["network", "dns", "firewall", "load balancer"],
+    "Performance": ["performance", "latency", "slow", "timeout"],
+    "Data Pipeline": ["kafka", "pipeline", "stream", "queue", "consumer"],
+    "Security": ["security", "auth", "ssl", "certificate"]
+}
+
+Keywords = Union[List[str], Mapping[str, float]]
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_PLURALS = ("", "s", "es")
+
+
+class CategoryMatcher:
+    """Score every category by weighted keyword hits in one pass over the text.
+
+    The text is split into alphanumeric tokens once and counted; keywords
+    are then dictionary lookups on the distinct tokens, so the cost is
+    linear in the text and barely depends on the size of the keyword
+    table. Matching whole tokens means "db" no longer matches inside
+    "mongodb" but still matches "db_pool", and a plain plural ("queues")
+    counts as its keyword. Each category's keywords are a list (weight 1)
+    or a ``{keyword: weight}`` mapping; hits in the filename count
+    ``filename_weight`` times. Ties go to the category listed first.
+    """
+
+    def __init__(
+        self,
+        keywords: Optional[Mapping[str, Keywords]] = None,
+        filename_weight: float = 3.0,
+        default: str = "General"
+    ):
+        self.filename_weight = filename_weight
+        self.default = default
+        self._order = {}
+        self._words = defaultdict(list)
+        self._phrases = defaultdict(list)
+
+        for category, category_keywords in (keywords or DEFAULT_CATEGORY_KEYWORDS).items():
+            self._order[category] = len(self._order)
+            if not isinstance(category_keywords, Mapping):
+                category_keywords = dict.fromkeys(category_keywords, 1.0)
+            for keyword, weight in category_keywords.items():
+                tokens = _TOKEN.findall(keyword.lower())
+                if len(tokens) == 1:
+                    self._words[tokens[0]].append((category, float(weight)))
+                elif tokens:
+                    self._phrases[" ".join(tokens)].append((category, float(weight)))
+        self._phrase_starts = {phrase.split(" ", 1)[0] for phrase in self._phrases}
+
+    def scores(self, filename: str, content: str) -> Dict[str, float]:
+        """Weighted hit count per category (categories without hits are omitted)."""
+        scores = defaultdict(float)
+        for text, multiplier in ((filename, self.filename_weight), (content, 1.0)):
+            tokens = _TOKEN.findall(text.lower())
+            counts = Counter(tokens)
+            hits = [(self._word_entries(token), count) for token, count in counts.items()]
+
+            # Multi-word keywords are counted on the re-joined token stream
+            if not self._phrase_starts.isdisjoint(counts):
+                joined = f" {' '.join(tokens)} "
+                for phrase, entries in self._phrases.items():
+                    count = sum(joined.count(f" {phrase}{suffix} ") for suffix in _PLURALS)
+                    if count:
+                        hits.append((entries, count))
+
+            for entries, count in hits:
+                for category, weight in entries:
+                    scores[category] += weight * count * multiplier
+        return dict(scores)
+
+    def _word_entries(self, token: str) -> List[Tuple[str, float]]:
+        """Keyword entries for a token, accepting a plural form."""
+        for suffix in _PLURALS:
+            if token.endswith(suffix):
+                entries = self._words.get(token[:len(token) - len(suffix)])
+                if entries:
+                    return entries
+        return []
+
+    def match(self, filename: str, content: str) -> str:
+        """Best-scoring category, or ``default`` if no keyword matched."""
+        scores = self.scores(filename, content)
+        if not scores:
+            return self.default
+        return max(scores, key=lambda category: (scores[category], -self._order[category]))
+
@@ -0,0 +1,155 @@
+"""Shared, long-lived SQLite connections."""
+
+import atexit
+import itertools
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Tuple
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class ConnectionManager:
+    """Hand out one reusable SQLite connection per thread for a database file.
+
+    Connections are opened lazily with WAL journaling (readers no longer
+    block the writer), a ``busy_timeout`` so brief write contention waits
+    instead of failing with "database is locked", and a larger prepared
+    statement cache, which only pays off because connections live across
+    calls. Connections of threads that have exited are closed the next time
+    a connection is opened; ``close()`` closes everything (the next call
+    simply reconnects).
+
+    Every store on the same file shares one manager via
+    ``get_connection_manager``.
+
+    ``":memory:"`` would give each thread its own empty database, so it is
+    opened as a private shared-cache in-memory database instead, which all
+    of the manager's threads see and which lives as long as the manager.
+    Shared-cache connections lock per table, so concurrent writers can fail
+    with "database table is locked"; use a file for anything but tests.
+    """
+
+    _memory_databases = itertools.count()
+
+    def __init__(
+        self,
+        db_path: str,
+        busy_timeout_ms: int = 5000,
+        cached_statements: int = 256
+    ):
+        self.db_path = db_path
+        self.busy_timeout_ms = busy_timeout_ms
+        self.cached_statements = cached_statements
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections: List[Tuple[threading.Thread, sqlite3.Connection]] = []
+        self._generation = 0
+        self._target, self._uri = db_path, False
+        self._keeper = None
+        if db_path == ":memory:":
+            self._target = f"file:memdb{next(self._memory_databases)}?mode=memory&cache=shared"
+            self._uri = True
+            # An in-memory database is dropped with its last connection
+            self._keeper = self._connect()
+
+    def connection(self) -> sqlite3.Connection:
+        """Get the calling thread's connection, opening it on first use."""
+        cached = getattr(self._local, "connection", None)
+        if cached is not None and cached[0] == self._generation:
+            return cached[1]
+
+        conn = self._connect()
+        with self._lock:
+            self._prune()
+            self._connections.append((threading.current_thread(), conn))
+            self._local.connection = (self._generation, conn)
+        return conn
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self._target,
+            timeout=self.busy_timeout_ms / 1000,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+            uri=self._uri
+        )
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+        if not self._uri:
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+        return conn
+
+    def cursor(self) -> sqlite3.Cursor:
+        """Get a cursor on the calling thread's connection (for reads)."""
+        return self.connection().cursor()
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Cursor]:
+        """Yield a cursor; commit on success, roll back on error.
+
+        Rolling back matters with shared connections: a failed write must
+        not leave a transaction open for the next caller.
+        """
+        conn = self.connection()
+        try:
+            yield conn.cursor()
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+    def _prune(self):
+        """Close connections owned by threads that have exited (lock held)."""
+        alive = []
+        for thread, conn in self._connections:
+            if thread.is_alive():
+                alive.append((thread, conn))
+            else:
+                conn.close()
+        self._connections = alive
+
+    def close(self):
+        """Close every connection; threads reconnect on their next call."""
+        with self._lock:
+            for _, conn in self._connections:
+                try:
+                    conn.close()
+                except sqlite3.Error as e:
+                    logger.warning(f"Error closing connection to {self.db_path}: {e}")
+            closed = len(self._connections)
+            self._connections = []
+            self._generation += 1
+        if closed:
+            logger.info(f"Closed {closed} connection(s) to {self.db_path}")
+
+
+_managers: Dict[str, ConnectionManager] = {}
+_managers_lock = threading.Lock()
+
+
+def get_connection_manager(db_path: str) -> ConnectionManager:
+    """Get the process-wide manager for a database file.
+
+    Every ``":memory:"`` call gets a new manager (and database), as
+    ``sqlite3.connect(":memory:")`` would.
+    """
+    if db_path == ":memory:":
+        return ConnectionManager(db_path)
+    key = os.path.abspath(db_path)
+    with _managers_lock:
+        if key not in _managers:
+            _managers[key] = ConnectionManager(db_path)
+        return _managers[key]
+
+
+@atexit.register
+def close_all_connections():
+    """Close every managed connection (also runs at interpreter exit)."""
+    with _managers_lock:
+        managers = list(_managers.values())
+    for manager in managers:
+        manager.close()
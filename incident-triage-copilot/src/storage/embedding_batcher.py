@@ -0,0 +1,128 @@
+"""Micro-batching of concurrent embedding requests."""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Sequence
+import numpy as np
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class EmbeddingBatcher:
+    """Coalesce concurrent single-text encodes into one model batch.
+
+    Callers ``submit`` a text and get a ``Future``. A worker thread takes
+    the first waiting request, keeps collecting for up to ``max_wait_ms``
+    or ``max_batch_size`` texts, encodes the distinct texts in one call and
+    resolves every future. A lone request therefore pays at most
+    ``max_wait_ms`` extra, while bursts (alert storms) share model calls.
+    """
+
+    def __init__(
+        self,
+        encode: Callable[[List[str]], np.ndarray],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 2.0
+    ):
+        self.encode = encode
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._requests = 0
+        self._batches = 0
+        self._batched_texts = 0
+        self._completed = 0
+        self._largest_batch = 0
+        self._max_queue_depth = 0
+        self._total_wait = 0.0
+
+    def submit(self, text: str) -> Future:
+        """Queue a text for encoding; the future resolves to its vector."""
+        future = Future()
+        with self._lock:
+            self._ensure_worker()
+            self._requests += 1
+            self._queue.put((text, future, time.perf_counter()))
+            self._max_queue_depth = max(self._max_queue_depth, self._queue.qsize())
+        return future
+
+    def embed(self, text: str) -> np.ndarray:
+        """Encode one text, sharing a batch with concurrent callers."""
+        return self.submit(text).result()
+
+    def _ensure_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+            self._worker.start()
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = [first]
+
+            # Keep collecting until the batch is full or the wait budget is spent
+            deadline = time.perf_counter() + self.max_wait_ms / 1000
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - time.perf_counter()
+                try:
+                    item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.put(None)
+                    break
+                batch.append(item)
+
+            self._encode_batch(batch)
+
+    def _encode_batch(self, batch: Sequence):
+        started = time.perf_counter()
+        texts = list(dict.fromkeys(text for text, _, _ in batch))
+        try:
+            vectors = np.asarray(self.encode(texts), dtype=np.float32)
+        except Exception as e:
+            logger.error(f"Batched embedding of {len(texts)} texts failed: {e}")
+            for _, future, _ in batch:
+                future.set_exception(e)
+            return
+
+        # Copies, so a cached row does not keep the whole batch matrix alive
+        rows = {text: vectors[i].copy() for i, text in enumerate(texts)}
+        for text, future, _ in batch:
+            future.set_result(rows[text])
+
+        with self._lock:
+            self._batches += 1
+            self._completed += len(batch)
+            self._batched_texts += len(texts)
+            self._largest_batch = max(self._largest_batch, len(texts))
+            self._total_wait += sum(started - queued_at for _, _, queued_at in batch)
+
+    def stats(self) -> Dict:
+        """Get request, batch-size and queue-depth counters."""
+        with self._lock:
+            return {
+                "requests": self._requests,
+                "batches": self._batches,
+                "avg_batch_size": self._batched_texts / self._batches if self._batches else 0.0,
+                "largest_batch": self._largest_batch,
+                "queue_depth": self._queue.qsize(),
+                "max_queue_depth": self._max_queue_depth,
+                "avg_queue_wait_ms": (
+                    self._total_wait * 1000 / self._completed if self._completed else 0.0
+                )
+            }
+
+    def close(self):
+        """Stop the worker after it drains queued requests."""
+        with self._lock:
+            if self._worker is not None and self._worker.is_alive():
+                self._queue.put(None)
+                self._worker = None
@@ -0,0 +1,50 @@
+"""Binary encoding for embeddings stored in SQLite."""
+
+import json
+import struct
+from typing import Sequence
+import numpy as np
+
+# Blob layout: magic, format version, dtype code, dimension, then raw vector
+_HEADER = struct.Struct("<2sBBI")
+MAGIC = b"EV"
+FORMAT_VERSION = 1
+
+DTYPE_FLOAT32 = 0
+_DTYPES = {
+    DTYPE_FLOAT32: np.dtype("<f4")
+}
+
+
+def encode_embedding(embedding: Sequence[float]) -> bytes:
+    """Encode an embedding as a versioned little-endian float32 blob."""
+    vector = np.asarray(embedding, dtype=_DTYPES[DTYPE_FLOAT32]).ravel()
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, DTYPE_FLOAT32, vector.size)
+    return header + vector.tobytes()
+
+
+def is_legacy_blob(blob: bytes) -> bool:
+    """Whether a blob uses the old JSON-encoded format."""
+    return bytes(blob[:len(MAGIC)]) != MAGIC
+
+
+def decode_embedding(blob: bytes) -> np.ndarray:
+    """Decode an embedding blob without copying the vector data.
+
+    Legacy JSON blobs are still accepted so unmigrated rows keep working.
+    """
+    if is_legacy_blob(blob):
+        return np.asarray(json.loads(bytes(blob).decode('utf-8')), dtype=np.float32)
+
+    _, version, dtype_code, dimension = _HEADER.unpack_from(blob)
+    if version != FORMAT_VERSION or dtype_code not in _DTYPES:
+        raise ValueError(
+            f"Unsupported embedding format (version={version}, dtype={dtype_code})"
+        )
+
+    return np.frombuffer(
+        blob,
+        dtype=_DTYPES[dtype_code],
+        count=dimension,
+        offset=_HEADER.size
+    )
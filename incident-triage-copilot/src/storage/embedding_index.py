@@ -0,0 +1,333 @@
+"""In-memory embedding index for fast similarity search."""
+
+import json
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Rows scored per block when a compact matrix is widened to float32;
+# small blocks stay in CPU cache
+_SCORE_BLOCK_ROWS = 1024
+
+
+def _object_array(values: Sequence) -> np.ndarray:
+    """Build a 1-D object array without NumPy guessing at nested shapes."""
+    array = np.empty(len(values), dtype=object)
+    array[:] = list(values)
+    return array
+
+
+class EmbeddingIndex:
+    """Pre-normalized embedding matrix with parallel id/label arrays.
+
+    Each row carries an id, a category and an optional section label that
+    searches can filter on. A search is a single matrix-vector product
+    followed by an ``argpartition`` top-k, instead of a Python loop over
+    every row. Readers take an immutable snapshot, so searches never block
+    on writers.
+
+    With ``quantization`` set to "float16" or "int8" (per-vector scale) the
+    matrix takes 2x or ~4x less memory. Compact scores then only select
+    ``rescore_factor * top_k`` candidates, which are rescored exactly with
+    full-precision vectors from ``rescorer`` (id list -> {id: vector}).
+    """
+
+    QUANTIZATIONS = {
+        "none": np.float32,
+        "float16": np.float16,
+        "int8": np.int8
+    }
+
+    def __init__(
+        self,
+        dimension: int = 384,
+        quantization: str = "none",
+        rescorer: Optional[Callable[[List[int]], Dict[int, np.ndarray]]] = None,
+        rescore_factor: int = 4
+    ):
+        if quantization not in self.QUANTIZATIONS:
+            raise ValueError(
+                f"Unknown quantization: {quantization}. Use one of {tuple(self.QUANTIZATIONS)}"
+            )
+        self.dimension = dimension
+        self.quantization = quantization
+        self.rescorer = rescorer
+        self.rescore_factor = rescore_factor
+        self._lock = threading.Lock()
+        self._data = self._empty()
+
+    def _empty(self) -> Tuple[np.ndarray, ...]:
+        # ids, categories, sections, matrix, per-row scales, extra columns
+        return (
+            np.empty(0, dtype=np.int64),
+            np.empty(0, dtype=object),
+            np.empty(0, dtype=object),
+            np.empty((0, self.dimension), dtype=self.QUANTIZATIONS[self.quantization]),
+            np.empty(0, dtype=np.float32)
+        ) + self._extra_columns(np.empty((0, self.dimension), dtype=np.float32))
+
+    def __len__(self) -> int:
+        return len(self._data[0])
+
+    @staticmethod
+    def normalize(vectors) -> np.ndarray:
+        """L2-normalize a vector or a matrix of row vectors as float32."""
+        matrix = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def _quantize(self, dense: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Convert normalized float32 rows to the compact matrix and row scales."""
+        if self.quantization == "int8":
+            scales = np.abs(dense).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            matrix = np.round(dense / scales[:, None]).astype(np.int8)
+            return matrix, scales.astype(np.float32)
+        matrix = dense.astype(self.QUANTIZATIONS[self.quantization], copy=False)
+        return matrix, np.ones(len(dense), dtype=np.float32)
+
+    def _dense(self, matrix: np.ndarray, scales: np.ndarray) -> np.ndarray:
+        """Widen a (possibly compact) matrix back to float32 rows."""
+        dense = matrix.astype(np.float32)
+        if self.quantization == "int8":
+            dense *= scales[:, None]
+        return dense
+
+    def _extra_columns(self, dense: np.ndarray) -> Tuple[np.ndarray, ...]:
+        """Hook for subclasses to keep extra per-row arrays."""
+        return ()
+
+    def _rows(
+        self,
+        ids: Sequence[int],
+        categories: Sequence[Optional[str]],
+        embeddings: Sequence,
+        sections: Optional[Sequence[Optional[str]]]
+    ) -> Tuple[np.ndarray, ...]:
+        if sections is None:
+            sections = [None] * len(ids)
+        dense = self.normalize(np.vstack(embeddings)).reshape(len(ids), self.dimension)
+        matrix, scales = self._quantize(dense)
+        return (
+            np.asarray(ids, dtype=np.int64),
+            _object_array(categories),
+            _object_array(sections),
+            matrix,
+            scales
+        ) + self._extra_columns(dense)
+
+    def build(
+        self,
+        ids: Sequence[int],
+        categories: Sequence[Optional[str]],
+        embeddings: Sequence,
+        sections: Optional[Sequence[Optional[str]]] = None
+    ):
+        """Replace the whole index."""
+        if len(ids) == 0:
+            self.clear()
+            return
+
+        data = self._rows(ids, categories, embeddings, sections)
+        with self._lock:
+            self._data = data
+        logger.info(f"Built embedding index with {len(ids)} vectors ({self.quantization})")
+
+    def upsert(
+        self,
+        ids: Sequence[int],
+        categories: Sequence[Optional[str]],
+        embeddings: Sequence,
+        sections: Optional[Sequence[Optional[str]]] = None,
+        remove: Sequence[int] = ()
+    ):
+        """Add vectors, replacing any existing rows with the same ids.
+
+        Rows in ``remove`` are dropped in the same swap, so searches never
+        see a state with the old rows gone and the new ones missing.
+        """
+        if len(ids) == 0:
+            self.remove(remove)
+            return
+
+        new = self._rows(ids, categories, embeddings, sections)
+        with self._lock:
+            replaced = np.concatenate([new[0], np.asarray(remove, dtype=np.int64)])
+            keep = ~np.isin(self._data[0], replaced)
+            self._data = tuple(
+                np.concatenate([current[keep], added])
+                for current, added in zip(self._data, new)
+            )
+
+    def remove(self, ids: Sequence[int]):
+        """Remove vectors by id."""
+        if len(ids) == 0:
+            return
+
+        with self._lock:
+            keep = ~np.isin(self._data[0], np.asarray(ids, dtype=np.int64))
+            self._data = tuple(array[keep] for array in self._data)
+
+    def clear(self):
+        """Remove all vectors."""
+        with self._lock:
+            self._data = self._empty()
+
+    def export(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Return ``(ids, categories, embeddings, sections)`` in ``build`` order."""
+        ids, categories, sections, matrix, scales = self._data[:5]
+        return ids, categories, self._dense(matrix, scales), sections
+
+    def save(self, directory: str):
+        """Write the index arrays to ``directory`` for memory-mapped loading.
+
+        Numeric columns become ``.npy`` files; row labels go to JSON.
+        """
+        data = self._data
+        path = Path(directory)
+        path.mkdir(parents=True, exist_ok=True)
+
+        labels = {}
+        for i, column in enumerate(data):
+            if column.dtype == object:
+                labels[str(i)] = column.tolist()
+            else:
+                np.save(path / f"column_{i}.npy", np.ascontiguousarray(column))
+
+        with open(path / "index.json", "w") as f:
+            json.dump({
+                "dimension": self.dimension,
+                "quantization": self.quantization,
+                "columns": len(data),
+                "labels": labels
+            }, f)
+
+    def load(self, directory: str, mmap: bool = True) -> bool:
+        """Replace the index with arrays written by ``save``.
+
+        Numeric columns are memory-mapped read-only, so processes loading
+        the same files share their physical pages. Returns False (index
+        unchanged) if the files were written with other settings.
+        """
+        path = Path(directory)
+        with open(path / "index.json") as f:
+            meta = json.load(f)
+        if (
+            meta["dimension"] != self.dimension
+            or meta["quantization"] != self.quantization
+            or meta["columns"] != len(self._data)
+        ):
+            return False
+
+        columns = []
+        for i in range(meta["columns"]):
+            if str(i) in meta["labels"]:
+                columns.append(_object_array(meta["labels"][str(i)]))
+                continue
+            try:
+                columns.append(np.load(path / f"column_{i}.npy", mmap_mode="r" if mmap else None))
+            except ValueError:
+                # Empty arrays cannot be mapped
+                columns.append(np.load(path / f"column_{i}.npy"))
+
+        with self._lock:
+            self._data = tuple(columns)
+        return True
+
+    def memory_usage(self) -> int:
+        """Bytes held by the numeric arrays (vectors, scales, ids)."""
+        return sum(array.nbytes for array in self._data if array.dtype != object)
+
+    def search(
+        self,
+        query_embedding: Sequence[float],
+        top_k: int = 5,
+        category: Optional[str] = None,
+        section: Optional[str] = None,
+        candidates: Optional[Sequence[int]] = None
+    ) -> List[Tuple[int, float]]:
+        """Return ``(id, cosine similarity)`` pairs, best first.
+
+        ``candidates`` restricts scoring to those ids (e.g. lexical matches).
+        """
+        data = self._data
+        ids, categories, sections = data[:3]
+        if top_k <= 0 or len(ids) == 0:
+            return []
+
+        mask = self._filter_mask(categories, sections, category, section)
+        if candidates is not None:
+            candidate_mask = np.isin(ids, np.asarray(candidates, dtype=np.int64))
+            mask = candidate_mask if mask is None else mask & candidate_mask
+        rows = None if mask is None else np.flatnonzero(mask)
+        return self._top_k(data, rows, self.normalize(query_embedding), top_k)
+
+    @staticmethod
+    def _filter_mask(
+        categories: np.ndarray,
+        sections: np.ndarray,
+        category: Optional[str],
+        section: Optional[str]
+    ) -> Optional[np.ndarray]:
+        """Boolean mask of rows matching the filters, or ``None`` for all rows."""
+        if not category and not section:
+            return None
+        mask = np.ones(len(categories), dtype=bool)
+        if category:
+            mask &= categories == category
+        if section:
+            mask &= sections == section
+        return mask
+
+    def _scores(self, matrix: np.ndarray, scales: np.ndarray, query: np.ndarray) -> np.ndarray:
+        """Cosine scores of ``query`` against every row of ``matrix``."""
+        if matrix.dtype == np.float32:
+            return matrix @ query
+
+        # Widen compact rows block by block to keep temporary memory bounded
+        scores = np.empty(len(matrix), dtype=np.float32)
+        for start in range(0, len(matrix), _SCORE_BLOCK_ROWS):
+            block = matrix[start:start + _SCORE_BLOCK_ROWS]
+            scores[start:start + _SCORE_BLOCK_ROWS] = block.astype(np.float32) @ query
+        return scores * scales
+
+    def _top_k(
+        self,
+        data: Tuple[np.ndarray, ...],
+        rows: Optional[np.ndarray],
+        query: np.ndarray,
+        top_k: int
+    ) -> List[Tuple[int, float]]:
+        """Score ``rows`` (or every row) of a snapshot against a normalized query."""
+        ids, matrix, scales = data[0], data[3], data[4]
+        if rows is not None:
+            if rows.size == 0:
+                return []
+            ids = ids[rows]
+            matrix = matrix[rows]
+            scales = scales[rows]
+
+        scores = self._scores(matrix, scales, query)
+
+        # Compact scores only pick candidates; rescore them at full precision
+        rescore = self.quantization != "none" and self.rescorer is not None
+        k = min(top_k * self.rescore_factor if rescore else top_k, scores.size)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        results = [(int(ids[i]), float(scores[i])) for i in top]
+
+        if rescore:
+            vectors = self.rescorer([match_id for match_id, _ in results])
+            results = [
+                (match_id, float(self.normalize(vectors[match_id]) @ query))
+                if match_id in vectors else (match_id, score)
+                for match_id, score in results
+            ]
+            results.sort(key=lambda match: match[1], reverse=True)
+
+        return results[:top_k]
@@ -1,11 +1,11 @@
 """Incident history storage and retrieval."""
 
-import sqlite3
 import json
 from typing import List, Dict, Optional
 from datetime import datetime
 from pathlib import Path
 from src.models import TriageResult
+from src.storage.connection import get_connection_manager
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -16,42 +16,39 @@ class IncidentStore:
     
     def __init__(self, db_path: str = "data/vector_store.db"):
         self.db_path = db_path
+        self._db = get_connection_manager(db_path)
         self._init_db()
         logger.info(f"Initialized IncidentStore at: {db_path}")
     
     def _init_db(self):
         """Initialize incident history table."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS incident_history (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                incident_id TEXT NOT NULL UNIQUE,
-                timestamp TEXT NOT NULL,
-                alert_name TEXT NOT NULL,
-                severity TEXT NOT NULL,
-                category TEXT NOT NULL,
-                root_causes TEXT,
-                mitigation_plan TEXT,
-                relevant_runbooks TEXT,
-                processing_time REAL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_incident_id 
-            ON incident_history(incident_id)
-        """)
-        
-        cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_timestamp 
-            ON incident_history(timestamp DESC)
-        """)
+        with self._db.transaction() as cursor:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS incident_history (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    incident_id TEXT NOT NULL UNIQUE,
+                    timestamp TEXT NOT NULL,
+                    alert_name TEXT NOT NULL,
+                    severity TEXT NOT NULL,
+                    category TEXT NOT NULL,
+                    root_causes TEXT,
+                    mitigation_plan TEXT,
+                    relevant_runbooks TEXT,
+                    processing_time REAL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_incident_id 
+                ON incident_history(incident_id)
+            """)
+            
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_timestamp 
+                ON incident_history(timestamp DESC)
+            """)
         
-        conn.commit()
-        conn.close()
         logger.info("Incident history table initialized")
     
     def save_incident(
@@ -61,9 +58,6 @@ class IncidentStore:
     ):
         """Save a triaged incident to history."""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
             # Convert lists/dicts to JSON strings
             root_causes_json = json.dumps(result.root_causes)
             mitigation_plan_json = json.dumps(result.mitigation_plan)
@@ -76,25 +70,24 @@ class IncidentStore:
                 for rb in result.relevant_runbooks
             ])
             
-            cursor.execute("""
-                INSERT OR REPLACE INTO incident_history 
-                (incident_id, timestamp, alert_name, severity, category, 
-                 root_causes, mitigation_plan, relevant_runbooks, processing_time)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                result.incident_id,
-                result.timestamp,
-                alert_name,
-                result.severity,
-                result.category,
-                root_causes_json,
-                mitigation_plan_json,
-                runbooks_json,
-                result.processing_time
-            ))
+            with self._db.transaction() as cursor:
+                cursor.execute("""
+                    INSERT OR REPLACE INTO incident_history 
+                    (incident_id, timestamp, alert_name, severity, category, 
+                     root_causes, mitigation_plan, relevant_runbooks, processing_time)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, (
+                    result.incident_id,
+                    result.timestamp,
+                    alert_name,
+                    result.severity,
+                    result.category,
+                    root_causes_json,
+                    mitigation_plan_json,
+                    runbooks_json,
+                    result.processing_time
+                ))
             
-            conn.commit()
-            conn.close()
             logger.info(f"Saved incident to history: {result.incident_id}")
             
         except Exception as e:
@@ -104,8 +97,7 @@ class IncidentStore:
     def get_all_incidents(self, limit: int = 50) -> List[Dict]:
         """Get all incidents from history, most recent first."""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            cursor = self._db.cursor()
             
             cursor.execute("""
                 SELECT incident_id, timestamp, alert_name, severity, category,
@@ -130,8 +122,6 @@ class IncidentStore:
                     "processing_time": row[8],
                     "created_at": row[9]
                 })
-            
-            conn.close()
             return incidents
             
         except Exception as e:
@@ -141,8 +131,7 @@ class IncidentStore:
     def get_incident_by_id(self, incident_id: str) -> Optional[Dict]:
         """Get a specific incident by ID."""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            cursor = self._db.cursor()
             
             cursor.execute("""
                 SELECT incident_id, timestamp, alert_name, severity, category,
@@ -153,7 +142,6 @@ class IncidentStore:
             """, (incident_id,))
             
             row = cursor.fetchone()
-            conn.close()
             
             if row:
                 return {
@@ -182,8 +170,7 @@ class IncidentStore:
     ) -> List[Dict]:
         """Search incidents by severity and/or category."""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            cursor = self._db.cursor()
             
             query = """
                 SELECT incident_id, timestamp, alert_name, severity, category,
@@ -221,8 +208,6 @@ class IncidentStore:
                     "processing_time": row[8],
                     "created_at": row[9]
                 })
-            
-            conn.close()
             return incidents
             
         except Exception as e:
@@ -232,8 +217,7 @@ class IncidentStore:
     def get_stats(self) -> Dict:
         """Get statistics about stored incidents."""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            cursor = self._db.cursor()
             
             # Total incidents
             cursor.execute("SELECT COUNT(*) FROM incident_history")
@@ -259,8 +243,6 @@ class IncidentStore:
             cursor.execute("SELECT AVG(processing_time) FROM incident_history")
             avg_time = cursor.fetchone()[0] or 0
             
-            conn.close()
-            
             return {
                 "total_incidents": total,
                 "by_severity": by_severity,
@@ -271,3 +253,7 @@ class IncidentStore:
         except Exception as e:
             logger.error(f"Error getting stats: {e}")
             return {}
+    
+    def close(self):
+        """Close the database connections shared by stores on this file."""
+        self._db.close()
@@ -0,0 +1,267 @@
+"""Inverted-file (IVF-flat) approximate nearest-neighbour index."""
+
+import math
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from src.storage.embedding_index import EmbeddingIndex
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class IVFIndex(EmbeddingIndex):
+    """Approximate index that only scores the lists closest to the query.
+
+    Vectors are clustered into ``nlist`` lists with spherical k-means. A
+    search scores the centroids first, then runs the exact matrix-vector
+    product over rows in the ``nprobe`` closest lists only. New vectors are
+    assigned to their nearest existing centroid, so the index updates
+    incrementally; centroids are persisted to ``persist_path`` so restarts
+    skip training.
+
+    With ``nlist=None`` the list count is sqrt(number of vectors) at
+    training time, and ``build`` retrains once the index has grown so that
+    sqrt(N) is ``RETRAIN_GROWTH`` times the current list count. Incremental
+    upserts never retrain; call ``train()`` to do it between rebuilds.
+    """
+
+    RETRAIN_GROWTH = 2
+
+    def __init__(
+        self,
+        dimension: int = 384,
+        nlist: Optional[int] = None,
+        nprobe: int = 8,
+        persist_path: Optional[str] = None,
+        kmeans_iterations: int = 10,
+        **kwargs
+    ):
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.persist_path = Path(persist_path) if persist_path else None
+        self.kmeans_iterations = kmeans_iterations
+        self._centroids = None
+        self._trained_on = 0  # Number of vectors the centroids were trained on
+        super().__init__(dimension, **kwargs)
+        self._load_centroids()
+
+    def _extra_columns(self, dense: np.ndarray) -> Tuple[np.ndarray, ...]:
+        return (self._assign(dense),)
+
+    def _assign(self, matrix: np.ndarray) -> np.ndarray:
+        """Nearest-centroid list for each (normalized) row."""
+        if self._centroids is None or len(matrix) == 0:
+            return np.zeros(len(matrix), dtype=np.int32)
+        return np.argmax(matrix @ self._centroids.T, axis=1).astype(np.int32)
+
+    def build(
+        self,
+        ids: Sequence[int],
+        categories: Sequence[Optional[str]],
+        embeddings: Sequence,
+        sections: Optional[Sequence[Optional[str]]] = None
+    ):
+        """Replace the whole index, training centroids first if needed."""
+        if len(ids) and self._needs_training(len(ids)):
+            self.train(np.vstack(embeddings))
+        super().build(ids, categories, embeddings, sections)
+
+    def _needs_training(self, count: int) -> bool:
+        """No centroids yet, or auto-sized ones the corpus has outgrown."""
+        if self._centroids is None:
+            return True
+        if self.nlist or math.sqrt(count) < self.RETRAIN_GROWTH * len(self._centroids):
+            return False
+        logger.info(
+            f"IVF index grew from {self._trained_on} to {count} vectors, "
+            f"retraining its {len(self._centroids)} lists"
+        )
+        return True
+
+    def train(self, embeddings: Optional[np.ndarray] = None):
+        """(Re)train centroids and reassign every row to its nearest list.
+
+        Trains on the indexed vectors when ``embeddings`` is not given.
+        """
+        if embeddings is None:
+            embeddings = self._dense(self._data[3], self._data[4])
+        vectors = self.normalize(embeddings)
+        if len(vectors) == 0:
+            return
+
+        nlist = min(self.nlist or max(1, int(math.sqrt(len(vectors)))), len(vectors))
+        start_time = time.time()
+        self._centroids = _spherical_kmeans(vectors, nlist, self.kmeans_iterations)
+        self._trained_on = len(vectors)
+        logger.info(
+            f"Trained IVF index with {nlist} lists on {len(vectors)} vectors "
+            f"in {time.time() - start_time:.2f}s"
+        )
+
+        with self._lock:
+            data = self._data
+            self._data = data[:5] + (self._assign(self._dense(data[3], data[4])),)
+        self._save_centroids()
+
+    def _load_centroids(self):
+        if not self.persist_path or not self.persist_path.exists():
+            return
+        try:
+            with np.load(self.persist_path) as saved:
+                centroids = saved["centroids"]
+                trained_on = int(saved["trained_on"]) if "trained_on" in saved.files else len(centroids) ** 2
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable IVF centroids {self.persist_path}: {e}")
+            return
+
+        if centroids.ndim != 2 or centroids.shape[1] != self.dimension:
+            logger.warning(f"Ignoring IVF centroids with shape {centroids.shape}")
+            return
+        if self.nlist and centroids.shape[0] != self.nlist:
+            logger.info(f"IVF nlist changed to {self.nlist}, centroids will be retrained")
+            return
+
+        self._centroids = centroids.astype(np.float32)
+        self._trained_on = trained_on
+        logger.info(f"Loaded {len(centroids)} IVF centroids from {self.persist_path}")
+
+    def _save_centroids(self):
+        if not self.persist_path:
+            return
+        # Write then rename so readers never see a partial file
+        tmp_path = self.persist_path.with_name(self.persist_path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(f, centroids=self._centroids, trained_on=self._trained_on)
+        os.replace(tmp_path, self.persist_path)
+
+    def save(self, directory: str):
+        """Write the index arrays plus the centroids its lists refer to."""
+        super().save(directory)
+        if self._centroids is not None:
+            np.save(Path(directory) / "centroids.npy", self._centroids)
+
+    def load(self, directory: str, mmap: bool = True) -> bool:
+        """Load arrays written by ``save``, with the centroids they were assigned to."""
+        centroids_path = Path(directory) / "centroids.npy"
+        if not centroids_path.exists():
+            return False
+        centroids = np.load(centroids_path)
+        if not super().load(directory, mmap):
+            return False
+        self._centroids = centroids
+        self._trained_on = len(self)
+        return True
+
+    def search(
+        self,
+        query_embedding: Sequence[float],
+        top_k: int = 5,
+        category: Optional[str] = None,
+        section: Optional[str] = None,
+        candidates: Optional[Sequence[int]] = None,
+        nprobe: Optional[int] = None
+    ) -> List[Tuple[int, float]]:
+        """Return approximate ``(id, cosine similarity)`` pairs, best first.
+
+        Searches restricted to ``candidates`` are already narrow and are
+        scored exactly.
+        """
+        data = self._data
+        ids, categories, sections, assignments = data[0], data[1], data[2], data[5]
+        centroids = self._centroids
+        nprobe = nprobe or self.nprobe
+        if centroids is None or nprobe >= len(centroids) or candidates is not None:
+            return super().search(query_embedding, top_k, category, section, candidates)
+        if top_k <= 0 or len(ids) == 0:
+            return []
+
+        query = self.normalize(query_embedding)
+        probes = np.argpartition(-(centroids @ query), nprobe - 1)[:nprobe]
+
+        filter_mask = self._filter_mask(categories, sections, category, section)
+        mask = np.isin(assignments, probes)
+        if filter_mask is not None:
+            mask &= filter_mask
+        rows = np.flatnonzero(mask)
+
+        # Selective filters can leave the probed lists short; fall back to exact
+        if rows.size < top_k:
+            rows = None if filter_mask is None else np.flatnonzero(filter_mask)
+
+        return self._top_k(data, rows, query, top_k)
+
+    def recall_at_k(
+        self,
+        queries: Sequence,
+        top_k: int = 5,
+        nprobe_values: Optional[Sequence[int]] = None
+    ) -> Dict[int, Dict[str, float]]:
+        """Measure recall@k and latency of approximate vs. exact search.
+
+        Returns ``{nprobe: {"recall": ..., "avg_latency_ms": ...}}`` plus an
+        ``"exact"`` entry with the latency of the full scan.
+        """
+        queries = self.normalize(np.atleast_2d(np.asarray(queries, dtype=np.float32)))
+        nlist = len(self._centroids) if self._centroids is not None else 1
+        if nprobe_values is None:
+            nprobe_values = sorted({min(n, nlist) for n in (1, 2, 4, 8, 16, 32, 64)})
+
+        start_time = time.perf_counter()
+        exact = [
+            {i for i, _ in EmbeddingIndex.search(self, query, top_k)}
+            for query in queries
+        ]
+        report = {
+            "exact": {
+                "recall": 1.0,
+                "avg_latency_ms": (time.perf_counter() - start_time) * 1000 / max(len(queries), 1)
+            }
+        }
+
+        expected = sum(len(truth) for truth in exact)
+        for nprobe in nprobe_values:
+            start_time = time.perf_counter()
+            hits = 0
+            for query, truth in zip(queries, exact):
+                found = {i for i, _ in self.search(query, top_k, nprobe=nprobe)}
+                hits += len(found & truth)
+            report[nprobe] = {
+                "recall": hits / expected if expected else 1.0,
+                "avg_latency_ms": (time.perf_counter() - start_time) * 1000 / max(len(queries), 1)
+            }
+
+        return report
+
+
+def _spherical_kmeans(
+    vectors: np.ndarray,
+    nlist: int,
+    iterations: int,
+    max_points_per_list: int = 256,
+    seed: int = 0
+) -> np.ndarray:
+    """Cluster normalized vectors by cosine similarity; returns unit centroids."""
+    rng = np.random.default_rng(seed)
+
+    # Train on a sample; assignment quality saturates well before the full set
+    sample_size = nlist * max_points_per_list
+    if len(vectors) > sample_size:
+        vectors = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+
+    centroids = vectors[rng.choice(len(vectors), nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+
+        # Re-seed empty lists from random points
+        empty = np.bincount(assignments, minlength=nlist) == 0
+        if empty.any():
+            sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()))]
+
+        centroids = EmbeddingIndex.normalize(sums)
+
+    return centroids
@@ -0,0 +1,150 @@
+"""ONNX Runtime CPU backend for sentence-transformer embedding models."""
+
+import os
+from pathlib import Path
+from typing import List, Optional, Union
+import numpy as np
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class OnnxEmbedder:
+    """Run an exported sentence-transformer with onnxruntime instead of torch.
+
+    Reproduces the all-MiniLM-L6-v2 pipeline (tokenize, transformer, mean
+    pooling over the attention mask, L2 normalize), so its vectors agree
+    with the torch model's and the stored index stays valid. Only
+    ``onnxruntime`` and ``tokenizers`` are imported, which starts much
+    faster than torch.
+
+    ``model_file`` is either a local ``.onnx`` path or a file in the
+    model's Hugging Face repository; the sentence-transformers repos ship
+    ``onnx/model.onnx`` plus int8 variants such as
+    ``onnx/model_quint8_avx2.onnx``.
+    """
+
+    def __init__(
+        self,
+        model_name: str = "all-MiniLM-L6-v2",
+        model_file: str = "onnx/model.onnx",
+        max_seq_length: int = 256,
+        num_threads: Optional[int] = None
+    ):
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        self.model_name = model_name
+        self.max_seq_length = max_seq_length
+        model_path, tokenizer_path = self._resolve_files(model_name, model_file)
+
+        self.tokenizer = Tokenizer.from_file(str(tokenizer_path))
+        self.tokenizer.enable_truncation(max_length=max_seq_length)
+        self.tokenizer.enable_padding(pad_id=self.tokenizer.token_to_id("[PAD]") or 0)
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = onnxruntime.InferenceSession(
+            str(model_path),
+            sess_options=options,
+            providers=["CPUExecutionProvider"]
+        )
+        self._input_names = {model_input.name for model_input in self.session.get_inputs()}
+        logger.info(f"Loaded ONNX embedding model: {model_path}")
+
+    @staticmethod
+    def _resolve_files(model_name: str, model_file: str):
+        """Find the ONNX graph and ``tokenizer.json``, downloading if needed."""
+        model_path = Path(model_file)
+        if model_path.exists():
+            tokenizer_path = model_path.parent / "tokenizer.json"
+            if tokenizer_path.exists():
+                return model_path, tokenizer_path
+        else:
+            model_path = None
+
+        from huggingface_hub import hf_hub_download
+
+        repo_id = model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+        if model_path is None:
+            model_path = Path(hf_hub_download(repo_id=repo_id, filename=model_file))
+        tokenizer_path = Path(hf_hub_download(repo_id=repo_id, filename="tokenizer.json"))
+        return model_path, tokenizer_path
+
+    def encode(
+        self,
+        sentences: Union[str, List[str]],
+        batch_size: int = 32,
+        convert_to_numpy: bool = True,
+        convert_to_tensor: bool = False,
+        show_progress_bar: bool = False,
+        normalize_embeddings: bool = True
+    ) -> np.ndarray:
+        """Embed one text (1-D result) or a list of texts (2-D result).
+
+        Mirrors ``SentenceTransformer.encode`` for the arguments VectorStore
+        uses; the tensor/progress flags are accepted and ignored.
+        """
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+
+        # Batch similar lengths together so little compute goes to padding
+        order = np.argsort([-len(text) for text in texts], kind="stable")
+        embeddings = None
+        for start in range(0, len(texts), batch_size):
+            batch = order[start:start + batch_size]
+            vectors = self._embed_batch([texts[i] for i in batch])
+            if embeddings is None:
+                embeddings = np.empty((len(texts), vectors.shape[1]), dtype=np.float32)
+            embeddings[batch] = vectors
+
+        if normalize_embeddings:
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            embeddings /= norms
+        return embeddings[0] if single else embeddings
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([encoding.ids for encoding in encodings], dtype=np.int64)
+        attention_mask = np.array([encoding.attention_mask for encoding in encodings], dtype=np.int64)
+        inputs = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self._input_names:
+            inputs["token_type_ids"] = np.array(
+                [encoding.type_ids for encoding in encodings],
+                dtype=np.int64
+            )
+
+        token_embeddings = self.session.run(None, inputs)[0]
+
+        # Mean pooling over real (non-padding) tokens
+        mask = attention_mask[:, :, None].astype(np.float32)
+        summed = (token_embeddings * mask).sum(axis=1)
+        return summed / np.clip(mask.sum(axis=1), 1e-9, None)
+
+
+def quantize_onnx_model(input_path: str, output_path: str) -> str:
+    """Write a dynamically int8-quantized copy of an ONNX model.
+
+    ``tokenizer.json`` is copied alongside so the result can be used as a
+    local ``model_file``.
+    """
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    quantize_dynamic(input_path, output_path, weight_type=QuantType.QInt8)
+
+    tokenizer_path = Path(input_path).parent / "tokenizer.json"
+    target = Path(output_path).parent / "tokenizer.json"
+    if tokenizer_path.exists() and not target.exists():
+        target.write_bytes(tokenizer_path.read_bytes())
+
+    logger.info(
+        f"Quantized {input_path} ({os.path.getsize(input_path) / 1e6:.1f} MB) -> "
+        f"{output_path} ({os.path.getsize(output_path) / 1e6:.1f} MB)"
+    )
+    return output_path
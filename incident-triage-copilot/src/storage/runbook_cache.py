@@ -0,0 +1,117 @@
+"""Byte-bounded cache of parsed runbook files."""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Optional
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class RunbookCache:
+    """LRU cache of parsed runbooks keyed by file path.
+
+    Entries are validated with a ``stat`` on every lookup: an unchanged
+    mtime and size is a hit; otherwise the file is re-read and only
+    re-parsed if its sha256 changed. Total cached text is kept under
+    ``max_bytes`` by evicting the least recently used runbooks.
+    """
+
+    def __init__(self, parse: Callable[[Path, str], Dict], max_bytes: int = 32 * 1024 * 1024):
+        self.parse = parse
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, file_path: str) -> Optional[Dict]:
+        """Get the parsed runbook, re-reading the file only if it changed."""
+        path = Path(file_path)
+        try:
+            stat = path.stat()
+        except OSError:
+            self.invalidate(file_path)
+            return None
+
+        with self._lock:
+            entry = self._entries.get(file_path)
+            if entry and entry["mtime"] == stat.st_mtime and entry["file_size"] == stat.st_size:
+                self._entries.move_to_end(file_path)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        with open(path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        return self.put(file_path, content, stat.st_mtime, stat.st_size, previous=entry)
+
+    def put(
+        self,
+        file_path: str,
+        content: str,
+        mtime: float,
+        file_size: int,
+        previous: Optional[Dict] = None
+    ) -> Dict:
+        """Cache freshly read file content, reusing the parse if the hash matches."""
+        content_hash = hashlib.sha256(content.encode('utf-8')).hexdigest()
+        if previous and previous["content_hash"] == content_hash:
+            entry = dict(previous, mtime=mtime, file_size=file_size)
+        else:
+            entry = dict(
+                self.parse(Path(file_path), content),
+                content=content,
+                content_hash=content_hash,
+                mtime=mtime,
+                file_size=file_size
+            )
+            entry["cached_bytes"] = _text_bytes(entry)
+
+        with self._lock:
+            old = self._entries.pop(file_path, None)
+            if old:
+                self._bytes -= old["cached_bytes"]
+            if entry["cached_bytes"] <= self.max_bytes:
+                self._entries[file_path] = entry
+                self._bytes += entry["cached_bytes"]
+                while self._bytes > self.max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self._bytes -= evicted["cached_bytes"]
+        return entry
+
+    def invalidate(self, file_path: str):
+        """Drop one runbook from the cache."""
+        with self._lock:
+            entry = self._entries.pop(file_path, None)
+            if entry:
+                self._bytes -= entry["cached_bytes"]
+
+    def clear(self):
+        """Drop all entries (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict:
+        """Get hit/miss counters and current size."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "runbooks": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes
+        }
+
+
+def _text_bytes(entry: Dict) -> int:
+    """Approximate memory held by a parsed runbook's text."""
+    return len(entry["content"].encode('utf-8')) + sum(
+        len(heading) + len(body.encode('utf-8'))
+        for heading, body in entry["sections"].items()
+    )
@@ -1,106 +1,302 @@
 """Runbook storage and retrieval."""
 
 import os
+import threading
+from itertools import islice
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Dict, Iterable, Iterator, List, Optional
+from src.storage.category_matcher import CategoryMatcher
+from src.storage.runbook_cache import RunbookCache
+from src.storage.runbook_watcher import RunbookWatcher
 from src.storage.vector_store import VectorStore
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
 
+def split_sections(content: str) -> Dict[str, str]:
+    """Split markdown into ``## `` sections keyed by heading.
+    
+    Each section runs to the next ``## `` heading, so ``###`` subsections
+    stay with their parent. Headings inside fenced code blocks are ignored.
+    """
+    sections = {}
+    heading = None
+    lines = []
+    in_code_block = False
+    
+    def flush():
+        if heading is not None:
+            body = "\n".join(lines).strip()
+            sections[heading] = f"{sections[heading]}\n\n{body}" if heading in sections else body
+    
+    for line in content.split('\n'):
+        if line.strip().startswith("```"):
+            in_code_block = not in_code_block
+        elif not in_code_block and line.startswith("## "):
+            flush()
+            heading = line[3:].strip()
+            lines = []
+            continue
+        lines.append(line)
+    
+    flush()
+    return sections
+
+
 class RunbookStore:
     """Manages runbook storage and retrieval."""
     
     def __init__(
         self,
         runbooks_dir: str = "data/runbooks",
-        vector_store: Optional[VectorStore] = None
+        vector_store: Optional[VectorStore] = None,
+        cache_max_bytes: int = 32 * 1024 * 1024,
+        category_matcher: Optional[CategoryMatcher] = None
     ):
         self.runbooks_dir = Path(runbooks_dir)
         self.vector_store = vector_store or VectorStore()
+        self.category_matcher = category_matcher or CategoryMatcher()
+        self.cache = RunbookCache(self._parse_runbook, max_bytes=cache_max_bytes)
+        self.watcher = None
+        self._index_lock = threading.Lock()
         logger.info(f"Initialized RunbookStore from: {runbooks_dir}")
     
-    def index_runbooks(self):
-        """Index all runbooks from the runbooks directory."""
-        if not self.runbooks_dir.exists():
-            logger.warning(f"Runbooks directory not found: {self.runbooks_dir}")
-            return
-        
-        # Clear existing runbooks
-        self.vector_store.clear_all()
+    def index_runbooks(
+        self,
+        batch_size: Optional[int] = None,
+        paths: Optional[Iterable[str]] = None
+    ) -> Dict[str, int]:
+        """Incrementally index runbooks from the runbooks directory.
         
-        # Index all markdown files
-        runbook_files = list(self.runbooks_dir.glob("*.md"))
-        logger.info(f"Found {len(runbook_files)} runbooks to index")
+        Only new or changed files are embedded, in batches with one
+        transaction each; a file that fails to index is logged and skipped
+        without losing the rest of its batch. Rows for removed files are
+        deleted. ``paths``
+        limits the scan to those files (e.g. ones a watcher saw change).
+        Returns counts of added, updated, skipped and deleted files.
+        """
+        with self._index_lock:
+            stats = {"added": 0, "updated": 0, "skipped": 0, "deleted": 0}
+            
+            if not self.runbooks_dir.exists():
+                logger.warning(f"Runbooks directory not found: {self.runbooks_dir}")
+                return stats
+            
+            indexed = self.vector_store.get_index_state()
+            
+            if paths is None:
+                # Index all markdown files
+                runbook_files = sorted(self.runbooks_dir.glob("*.md"))
+                candidates = indexed.keys()
+            else:
+                paths = {str(path) for path in paths}
+                runbook_files = sorted(
+                    Path(path) for path in paths
+                    if path.endswith(".md") and Path(path).is_file()
+                )
+                candidates = indexed.keys() & paths
+            logger.info(f"Found {len(runbook_files)} runbooks to check")
+            
+            touched = {}
+            self._add_runbooks(
+                self._iter_changed_runbooks(runbook_files, indexed, stats, touched),
+                batch_size or self.vector_store.batch_size,
+                indexed,
+                stats
+            )
+            self.vector_store.touch_runbooks(touched)
+            
+            # Drop runbooks whose files were removed from this directory
+            seen = {str(file_path) for file_path in runbook_files}
+            for path_key in candidates - seen:
+                if Path(path_key).parent == self.runbooks_dir:
+                    self.vector_store.delete_runbook(path_key)
+                    self.cache.invalidate(path_key)
+                    stats["deleted"] += 1
+            
+            logger.info(
+                f"Runbook indexing complete: {stats['added']} added, {stats['updated']} updated, "
+                f"{stats['skipped']} skipped, {stats['deleted']} deleted"
+            )
+            return stats
+    
+    def _add_runbooks(
+        self,
+        runbooks: Iterator[Dict],
+        batch_size: int,
+        indexed: Dict[str, Dict],
+        stats: Dict[str, int]
+    ):
+        """Add runbooks batch by batch, retrying a failed batch one file at a time."""
+        while True:
+            batch = list(islice(runbooks, batch_size))
+            if not batch:
+                return
+            
+            if len(batch) > 1:
+                try:
+                    self.vector_store.add_runbooks(batch, batch_size=batch_size)
+                    continue
+                except Exception as e:
+                    logger.warning(f"Batch of {len(batch)} runbooks failed, indexing them one by one: {e}")
+            
+            for rb in batch:
+                try:
+                    self.vector_store.add_runbooks([rb])
+                except Exception as e:
+                    logger.error(f"Error indexing {rb['file_path']}: {e}")
+                    stats["updated" if rb["file_path"] in indexed else "added"] -= 1
+    
+    def _iter_changed_runbooks(
+        self,
+        runbook_files: List[Path],
+        indexed: Dict[str, Dict],
+        stats: Dict[str, int],
+        touched: Dict[str, float]
+    ) -> Iterator[Dict]:
+        """Lazily read new or changed runbooks.
         
+        Updates ``stats`` as it goes and collects the new mtime of files that
+        were touched but not modified into ``touched``.
+        """
         for file_path in runbook_files:
+            path_key = str(file_path)
+            previous = indexed.get(path_key)
+            
             try:
+                stat = file_path.stat()
+                mtime = stat.st_mtime
+                if previous and previous["mtime"] == mtime:
+                    stats["skipped"] += 1
+                    continue
+                
                 with open(file_path, 'r', encoding='utf-8') as f:
                     content = f.read()
                 
-                # Extract title from first line (assuming # Title format)
-                lines = content.split('\n')
-                title = lines[0].replace('#', '').strip() if lines else file_path.stem
-                
-                # Infer category from filename or content
-                category = self._infer_category(file_path.stem, content)
+                # Parse once; the cache then serves lookups without re-reading
+                parsed = self.cache.put(path_key, content, mtime, stat.st_size)
+                content_hash = parsed["content_hash"]
+                if previous and previous["content_hash"] == content_hash:
+                    # Touched but not modified
+                    touched[path_key] = mtime
+                    stats["skipped"] += 1
+                    continue
                 
-                # Add to vector store
-                self.vector_store.add_runbook(
-                    title=title,
-                    file_path=str(file_path),
-                    content=content,
-                    category=category
-                )
-                
-                logger.info(f"Indexed: {title}")
+                title = parsed["title"]
+                category = parsed["category"]
             
             except Exception as e:
-                logger.error(f"Error indexing {file_path}: {e}")
+                logger.error(f"Error reading {file_path}: {e}")
+                continue
+            
+            stats["updated" if previous else "added"] += 1
+            logger.info(f"Indexing: {title}")
+            
+            yield {
+                "title": title,
+                "file_path": path_key,
+                "content": content,
+                "category": category,
+                "content_hash": content_hash,
+                "mtime": mtime,
+                "sections": parsed["sections"]
+            }
+    
+    def _parse_runbook(self, file_path: Path, content: str) -> Dict:
+        """Extract the title, category and ``## `` sections of a runbook."""
+        # Extract title from first line (assuming # Title format)
+        lines = content.split('\n')
+        title = lines[0].replace('#', '').strip() if lines else file_path.stem
         
-        logger.info(f"Successfully indexed {len(runbook_files)} runbooks")
+        return {
+            "title": title,
+            # Infer category from filename or content
+            "category": self._infer_category(file_path.stem, content),
+            "sections": split_sections(content)
+        }
     
     def _infer_category(self, filename: str, content: str) -> str:
         """Infer category from filename or content."""
-        filename_lower = filename.lower()
-        content_lower = content.lower()
-        
-        # Category mappings
-        categories = {
-            "Database": ["db", "database", "postgres", "mysql", "sql"],
-            "API/Service": ["api", "service", "gateway", "rest", "http"],
-            "Infrastructure": ["infra", "kubernetes", "k8s", "docker", "aws"],
-            "Network": ["network", "dns", "firewall", "load balancer"],
-            "Performance": ["performance", "latency", "slow", "timeout"],
-            "Data Pipeline": ["kafka", "pipeline", "stream", "queue", "consumer"],
-            "Security": ["security", "auth", "ssl", "certificate"]
-        }
-        
-        for category, keywords in categories.items():
-            if any(kw in filename_lower or kw in content_lower for kw in keywords):
-                return category
-        
-        return "General"
+        return self.category_matcher.match(filename, content)
     
     def search_runbooks(
         self,
         query: str,
         top_k: int = 5,
-        category: Optional[str] = None
+        category: Optional[str] = None,
+        section: Optional[str] = None,
+        mode: Optional[str] = None,
+        include_content: bool = True
     ) -> List[Dict]:
-        """Search for relevant runbooks."""
-        return self.vector_store.search(query, top_k=top_k, category=category)
+        """Search for relevant runbooks, optionally matching only one section type.
+        
+        ``mode`` is "vector" or "hybrid" (BM25 + vector); defaults to the
+        vector store's configured mode.
+        """
+        return self.vector_store.search(
+            query,
+            top_k=top_k,
+            category=category,
+            section=section,
+            mode=mode,
+            include_content=include_content
+        )
     
-    def get_runbook_by_path(self, file_path: str) -> Optional[str]:
-        """Get runbook content by file path."""
+    def get_parsed_runbook(self, file_path: str) -> Optional[Dict]:
+        """Get a runbook's title, category, content and sections from the cache.
+        
+        The file is re-read only when its mtime or size changed.
+        """
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return f.read()
+            return self.cache.get(file_path)
         except Exception as e:
             logger.error(f"Error reading runbook {file_path}: {e}")
             return None
     
+    def get_runbook_section(self, file_path: str, section: str) -> Optional[str]:
+        """Get one ``## `` section of a runbook by heading.
+        
+        Served from the parsed-runbook cache; falls back to the indexed copy
+        when the file is no longer on disk.
+        """
+        parsed = self.get_parsed_runbook(file_path)
+        if parsed is not None:
+            return parsed["sections"].get(section)
+        return self.vector_store.get_section(file_path, section)
+    
+    def get_runbook_by_path(self, file_path: str) -> Optional[str]:
+        """Get runbook content by file path."""
+        parsed = self.get_parsed_runbook(file_path)
+        return parsed["content"] if parsed else None
+    
+    def start_watching(self, debounce_seconds: float = 2.0, poll_interval: float = 2.0):
+        """Re-index changed runbook files in the background as they are edited."""
+        if self.watcher is None:
+            self.watcher = RunbookWatcher(
+                self,
+                debounce_seconds=debounce_seconds,
+                poll_interval=poll_interval
+            )
+        self.watcher.start()
+    
+    def stop_watching(self):
+        """Stop the background runbook watcher."""
+        if self.watcher is not None:
+            self.watcher.stop()
+    
+    def runbook_cache_stats(self) -> Dict:
+        """Get hit/miss counters and size of the parsed-runbook cache."""
+        return self.cache.stats()
+    
     def list_all_runbooks(self) -> List[Dict]:
         """List all indexed runbooks."""
         return self.vector_store.get_all_runbooks()
+    
+    def list_runbook_metadata(self) -> List[Dict]:
+        """List indexed runbooks (title, path, category) without their content."""
+        return self.vector_store.list_runbook_metadata()
+    
+    def count_runbooks(self) -> int:
+        """Count indexed runbooks."""
+        return self.vector_store.count_runbooks()
@@ -0,0 +1,209 @@
+"""Background re-indexing of runbooks when their files change."""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Set, Tuple
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# inotify event masks (<sys/inotify.h>)
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+
+_WATCH_MASK = (
+    IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+    | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+)
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class _Inotify:
+    """Minimal ctypes binding for one directory watch (Linux only)."""
+
+    def __init__(self, directory: Path):
+        libc_name = ctypes.util.find_library("c")
+        if not libc_name:
+            raise OSError("libc not found")
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError("inotify is not available")
+
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, os.fsencode(str(directory)), _WATCH_MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch failed for {directory}")
+
+    def read(self, timeout: float) -> Optional[Set[str]]:
+        """Names changed within ``timeout`` seconds; ``None`` means rescan everything."""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+        try:
+            buffer = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        names = set()
+        offset = 0
+        while offset < len(buffer):
+            _, mask, _, length = _EVENT_HEADER.unpack_from(buffer, offset)
+            offset += _EVENT_HEADER.size
+            name = buffer[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if mask & (IN_Q_OVERFLOW | IN_DELETE_SELF | IN_MOVE_SELF):
+                return None
+            if name:
+                names.add(os.fsdecode(name))
+        return names
+
+    def close(self):
+        os.close(self.fd)
+
+
+class RunbookWatcher:
+    """Watch the runbooks directory and re-index only the files that change.
+
+    Uses inotify where available and falls back to polling ``mtime``/size
+    every ``poll_interval`` seconds. Changes are debounced: re-indexing runs
+    once no event has arrived for ``debounce_seconds``, so an editor's
+    burst of writes costs one re-embed. Re-indexing happens on the watcher
+    thread; searches keep using the current index until the new rows are
+    committed and swapped in.
+    """
+
+    def __init__(
+        self,
+        runbook_store,
+        debounce_seconds: float = 2.0,
+        poll_interval: float = 2.0,
+        use_inotify: bool = True
+    ):
+        self.runbook_store = runbook_store
+        self.runbooks_dir = Path(runbook_store.runbooks_dir)
+        self.debounce_seconds = debounce_seconds
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        self.mode = None
+        self.reindex_count = 0
+        self.last_stats = None
+        self.last_reindex_at = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start watching on a daemon thread (no-op if already running)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        inotify = None
+        if self.use_inotify:
+            try:
+                inotify = _Inotify(self.runbooks_dir)
+            except (OSError, AttributeError) as e:
+                logger.info(f"inotify unavailable ({e}), polling {self.runbooks_dir} instead")
+        self.mode = "inotify" if inotify else "polling"
+
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(inotify,), name="runbook-watcher", daemon=True
+        )
+        self._thread.start()
+        logger.info(f"Watching {self.runbooks_dir} for runbook changes ({self.mode})")
+
+    def stop(self, timeout: Optional[float] = 5.0):
+        """Stop watching; pending changes that were not yet re-indexed are dropped."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self, inotify: Optional[_Inotify]):
+        pending = set()
+        last_event = 0.0
+        snapshot = None if inotify else self._scan()
+
+        try:
+            while not self._stop.is_set():
+                timeout = self.debounce_seconds if pending else self.poll_interval
+                if inotify:
+                    names = inotify.read(timeout)
+                    changed = (
+                        set(self._scan()) | self._indexed_paths() if names is None
+                        else {str(self.runbooks_dir / name) for name in names if name.endswith(".md")}
+                    )
+                else:
+                    if self._stop.wait(timeout):
+                        break
+                    current = self._scan()
+                    changed = {
+                        path for path in current.keys() | snapshot.keys()
+                        if current.get(path) != snapshot.get(path)
+                    }
+                    snapshot = current
+
+                now = time.monotonic()
+                if changed:
+                    pending |= changed
+                    last_event = now
+                elif pending and now - last_event >= self.debounce_seconds:
+                    self._reindex(pending)
+                    pending = set()
+        finally:
+            if inotify:
+                inotify.close()
+
+    def _scan(self) -> Dict[str, Tuple[float, int]]:
+        """Current ``{path: (mtime, size)}`` of the markdown files."""
+        files = {}
+        for file_path in self.runbooks_dir.glob("*.md"):
+            try:
+                stat = file_path.stat()
+            except OSError:
+                continue
+            files[str(file_path)] = (stat.st_mtime, stat.st_size)
+        return files
+
+    def _indexed_paths(self) -> Set[str]:
+        return set(self.runbook_store.vector_store.get_index_state())
+
+    def _reindex(self, paths: Set[str]):
+        logger.info(f"Re-indexing {len(paths)} changed runbook file(s)")
+        try:
+            self.last_stats = self.runbook_store.index_runbooks(paths=paths)
+        except Exception as e:
+            logger.error(f"Runbook re-indexing failed: {e}")
+            return
+        self.reindex_count += 1
+        self.last_reindex_at = time.time()
+
+    def stats(self) -> Dict:
+        """Get watcher mode and re-index counters."""
+        return {
+            "mode": self.mode,
+            "running": self.is_running(),
+            "reindex_count": self.reindex_count,
+            "last_stats": self.last_stats,
+            "last_reindex_at": self.last_reindex_at
+        }
@@ -1,10 +1,29 @@
-"""Vector store using SQLite with sqlite-vec extension."""
+"""Vector store using SQLite with exact or approximate in-memory search."""
 
-import sqlite3
 import json
-from typing import List, Dict, Tuple, Optional
-from sentence_transformers import SentenceTransformer
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+from src.storage.connection import get_connection_manager
+from src.storage.embedding_batcher import EmbeddingBatcher
+from src.storage.embedding_codec import encode_embedding, decode_embedding, is_legacy_blob
+from src.storage.embedding_index import EmbeddingIndex
+from src.storage.ivf_index import IVFIndex
 from src.utils.logger import get_logger
+from src.utils.lru_cache import LRUCache
+
+try:
+    import fcntl
+except ImportError:  # Windows: snapshot publishing is only serialized within a process
+    fcntl = None
 
 logger = get_logger(__name__)
 
@@ -12,159 +31,982 @@ logger = get_logger(__name__)
 class VectorStore:
     """SQLite-based vector store for runbook embeddings."""
     
+    INDEX_TYPES = ("exact", "ivf")
+    EMBEDDING_BACKENDS = ("torch", "onnx")
+    SEARCH_MODES = ("vector", "hybrid")
+    
+    # Reciprocal-rank fusion constant; damps the weight of top ranks
+    RRF_K = 60
+    
+    # Bumped whenever stored data needs a one-time migration (PRAGMA user_version)
+    SCHEMA_VERSION = 4
+    
+    # Seconds between checks for a newer shared index snapshot
+    SNAPSHOT_CHECK_INTERVAL = 1.0
+    
     def __init__(
         self,
         db_path: str = "data/vector_store.db",
         embedding_model: str = "all-MiniLM-L6-v2",
-        dimension: int = 384
+        dimension: int = 384,
+        batch_size: int = 32,
+        index_type: str = "exact",
+        ivf_nlist: Optional[int] = None,
+        ivf_nprobe: int = 8,
+        query_cache_size: int = 1024,
+        search_mode: str = "vector",
+        lexical_prefilter_min_rows: int = 10000,
+        quantization: str = "none",
+        rescore_factor: int = 4,
+        embedding_backend: str = "torch",
+        onnx_model_file: str = "onnx/model.onnx",
+        query_batch_size: int = 32,
+        query_batch_wait_ms: float = 2.0,
+        mmap_index: bool = False
     ):
+        if index_type not in self.INDEX_TYPES:
+            raise ValueError(f"Unknown index type: {index_type}. Use one of {self.INDEX_TYPES}")
+        if search_mode not in self.SEARCH_MODES:
+            raise ValueError(f"Unknown search mode: {search_mode}. Use one of {self.SEARCH_MODES}")
+        if embedding_backend not in self.EMBEDDING_BACKENDS:
+            raise ValueError(
+                f"Unknown embedding backend: {embedding_backend}. Use one of {self.EMBEDDING_BACKENDS}"
+            )
+        if quantization not in EmbeddingIndex.QUANTIZATIONS:
+            raise ValueError(
+                f"Unknown quantization: {quantization}. "
+                f"Use one of {tuple(EmbeddingIndex.QUANTIZATIONS)}"
+            )
+        
         self.db_path = db_path
         self.dimension = dimension
+        self.batch_size = batch_size
+        self.index_type = index_type
+        self.ivf_nlist = ivf_nlist
+        self.ivf_nprobe = ivf_nprobe
+        self.search_mode = search_mode
+        self.lexical_prefilter_min_rows = lexical_prefilter_min_rows
+        self.quantization = quantization
+        self.rescore_factor = rescore_factor
+        self.fts_available = False
         self.embedding_model_name = embedding_model
+        self.embedding_backend = embedding_backend
+        self.onnx_model_file = onnx_model_file
         self._embedding_model = None  # Lazy load
+        self._model_lock = threading.Lock()
+        self._index = None  # Lazy load
+        self._section_index = None  # Lazy load
+        self._index_stale = False  # Set when a write could not be applied to the loaded index
+        # Serializes index (re)loads with post-commit patches so no write is lost
+        self._index_lock = threading.RLock()
+        self.mmap_index = mmap_index
+        self.snapshot_dir = Path(db_path).with_suffix(".index")
+        self._snapshot_version = None
+        self._snapshot_checked_at = 0.0
+        self._snapshot_lock_depth = 0
+        self._query_cache = LRUCache(maxsize=query_cache_size)
+        # Coalesces concurrent query encodes; a wait of 0 encodes inline
+        self._query_batcher = EmbeddingBatcher(
+            self._encode_query_batch,
+            max_batch_size=query_batch_size,
+            max_wait_ms=query_batch_wait_ms
+        ) if query_batch_wait_ms > 0 else None
+        self._db = get_connection_manager(db_path)
         self._init_db()
         logger.info(f"Initialized VectorStore with model: {embedding_model}")
     
     @property
     def embedding_model(self):
-        """Lazy load embedding model to speed up startup."""
+        """Lazy load embedding model to speed up startup.
+        
+        The backend (torch via sentence-transformers, or onnxruntime) is
+        imported here rather than at module load; the lock keeps a
+        background warm-up and the first search from loading it twice.
+        """
         if self._embedding_model is None:
-            logger.info(f"Loading embedding model: {self.embedding_model_name}")
-            self._embedding_model = SentenceTransformer(self.embedding_model_name)
+            with self._model_lock:
+                if self._embedding_model is None:
+                    logger.info(
+                        f"Loading embedding model: {self.embedding_model_name} "
+                        f"({self.embedding_backend})"
+                    )
+                    self._embedding_model = self._load_embedding_model()
         return self._embedding_model
     
-    def _init_db(self):
-        """Initialize SQLite database with vector extension."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    def _load_embedding_model(self):
+        """Instantiate the configured embedding backend."""
+        if self.embedding_backend == "onnx":
+            from src.storage.onnx_embedder import OnnxEmbedder
+            
+            return OnnxEmbedder(self.embedding_model_name, model_file=self.onnx_model_file)
         
-        # Create runbooks table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS runbooks (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT NOT NULL,
-                file_path TEXT NOT NULL UNIQUE,
-                content TEXT NOT NULL,
-                category TEXT,
-                embedding BLOB,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        from sentence_transformers import SentenceTransformer
+        
+        return SentenceTransformer(self.embedding_model_name)
+    
+    @property
+    def index(self) -> EmbeddingIndex:
+        """Lazy load the in-memory whole-runbook embedding index."""
+        self._refresh_snapshot()
+        if self._index is None:
+            with self._index_lock:
+                if self._index is None:
+                    self.reload_index()
+        return self._index
+    
+    @property
+    def section_index(self) -> EmbeddingIndex:
+        """Lazy load the in-memory runbook section embedding index."""
+        self._refresh_snapshot()
+        if self._section_index is None:
+            with self._index_lock:
+                if self._section_index is None:
+                    self.reload_index()
+        return self._section_index
+    
+    def reload_index(self):
+        """Rebuild the in-memory embedding indexes from the database.
+        
+        With ``mmap_index``, the current shared snapshot is mapped instead
+        when one exists; otherwise the rebuilt indexes are published as one.
+        """
+        with self._index_lock:
+            if not self.mmap_index:
+                self._build_from_db()
+                self._index_stale = False
+                return
+            
+            with self._snapshot_lock():
+                # A stale index may also be missing from the current snapshot
+                if not self._index_stale and self._load_snapshot(self._read_snapshot_version()):
+                    return
+                
+                self._build_from_db()
+                self._index_stale = False
+                self.publish_snapshot()
+    
+    def _build_from_db(self):
+        cursor = self._db.cursor()
+        
+        index = self._new_index("runbooks")
+        index.build(*self._fetch_runbook_vectors(cursor))
+        
+        section_index = self._new_index("sections")
+        section_index.build(*self._fetch_section_vectors(cursor))
+        
+        self._index = index
+        self._section_index = section_index
+    
+    def publish_snapshot(self):
+        """Export the loaded indexes as a new memory-mappable snapshot.
+        
+        Each snapshot is written to its own versioned directory, then the
+        ``CURRENT`` stamp is atomically replaced to point at it. Other
+        processes notice the new stamp and swap to the new files; this
+        process remaps them too, so its private copy of the arrays is freed.
+        """
+        with self._index_lock, self._snapshot_lock():
+            previous = self._read_snapshot_version()
+            version = f"{time.time_ns()}-{os.getpid()}"
+            tmp_dir = self.snapshot_dir / f".tmp-{version}"
+            self._index.save(str(tmp_dir / "runbooks"))
+            self._section_index.save(str(tmp_dir / "sections"))
+            os.rename(tmp_dir, self.snapshot_dir / version)
+            
+            stamp_path = self.snapshot_dir / "CURRENT"
+            tmp_stamp = self.snapshot_dir / f".CURRENT-{version}"
+            with open(tmp_stamp, "w") as f:
+                json.dump({"version": version, "runbooks": len(self._index)}, f)
+            os.replace(tmp_stamp, stamp_path)
+            logger.info(f"Published index snapshot {version}")
+            
+            self._load_snapshot(version)
+            self._prune_snapshots(older_than=previous)
+    
+    @contextmanager
+    def _snapshot_lock(self):
+        """Hold an exclusive lock on the snapshot directory across processes.
+        
+        Callers hold ``_index_lock``; nested calls reuse the outer lock,
+        since a second ``flock`` on a new file handle would block on it.
+        """
+        self._snapshot_lock_depth += 1
+        try:
+            if self._snapshot_lock_depth > 1 or fcntl is None:
+                yield
+                return
+            self.snapshot_dir.mkdir(parents=True, exist_ok=True)
+            with open(self.snapshot_dir / ".lock", "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+        finally:
+            self._snapshot_lock_depth -= 1
+    
+    def _read_snapshot_version(self) -> Optional[str]:
+        try:
+            with open(self.snapshot_dir / "CURRENT") as f:
+                return json.load(f)["version"]
+        except (OSError, ValueError, KeyError):
+            return None
+    
+    def _load_snapshot(self, version: Optional[str]) -> bool:
+        """Map the snapshot ``version``; False if missing or incompatible."""
+        if not version:
+            return False
+        
+        index = self._new_index("runbooks")
+        section_index = self._new_index("sections")
+        try:
+            loaded = (
+                index.load(str(self.snapshot_dir / version / "runbooks"))
+                and section_index.load(str(self.snapshot_dir / version / "sections"))
             )
-        """)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring unreadable index snapshot {version}: {e}")
+            return False
+        if not loaded:
+            logger.info(f"Index snapshot {version} was built with other settings, rebuilding")
+            return False
         
-        # Create index for faster searches
-        cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_category ON runbooks(category)
-        """)
+        self._index = index
+        self._section_index = section_index
+        self._snapshot_version = version
+        logger.info(f"Mapped index snapshot {version} ({len(index)} runbooks)")
+        return True
+    
+    def _refresh_snapshot(self):
+        """Swap to a snapshot published by another process, if there is one."""
+        if not self.mmap_index or self._index is None:
+            return
+        now = time.monotonic()
+        if now - self._snapshot_checked_at < self.SNAPSHOT_CHECK_INTERVAL:
+            return
+        self._snapshot_checked_at = now
+        
+        version = self._read_snapshot_version()
+        if version and version != self._snapshot_version:
+            with self._index_lock:
+                if version != self._snapshot_version:
+                    self._load_snapshot(version)
+    
+    def _prune_snapshots(self, older_than: Optional[str]):
+        """Delete snapshots published before ``older_than`` (snapshot lock held).
         
-        conn.commit()
-        conn.close()
+        The previous snapshot stays for processes that have not swapped
+        yet; those still mapping a deleted one keep its pages until they do.
+        """
+        cutoff = _snapshot_time(older_than) if older_than else None
+        if cutoff is None:
+            return
+        for path in self.snapshot_dir.iterdir():
+            published = _snapshot_time(path.name)
+            if path.is_dir() and published is not None and published < cutoff:
+                shutil.rmtree(path, ignore_errors=True)
+    
+    def _patch_index(self, patch: Callable[[], None]):
+        """Apply a committed write to the loaded indexes, if any, and share it.
+        
+        The database is already committed, so a failed patch cannot be
+        rolled back; the indexes are dropped instead and rebuilt from the
+        database by the next search.
+        """
+        with self._index_lock:
+            if self._index is None:
+                return
+            try:
+                patch()
+                self._publish_changes()
+            except Exception as e:
+                logger.error(f"Failed to update the in-memory index, it will be rebuilt: {e}")
+                self._index = None
+                self._section_index = None
+                self._index_stale = True
+    
+    def _publish_changes(self):
+        """Share index patches made by a write with other processes (lock held).
+        
+        If another process published in the meantime, the patched index
+        lacks its changes, so rebuild from the database instead. The
+        snapshot lock keeps anyone from publishing between the check and
+        our publish.
+        """
+        if not self.mmap_index or self._index is None:
+            return
+        with self._snapshot_lock():
+            if self._read_snapshot_version() != self._snapshot_version:
+                self._build_from_db()
+            self.publish_snapshot()
+    
+    def _new_index(self, name: str) -> EmbeddingIndex:
+        """Create an empty index of the configured type."""
+        options = {
+            "dimension": self.dimension,
+            "quantization": self.quantization,
+            "rescore_factor": self.rescore_factor,
+            "rescorer": self._rescorer(name) if self.quantization != "none" else None
+        }
+        if self.index_type == "ivf":
+            return IVFIndex(
+                nlist=self.ivf_nlist,
+                nprobe=self.ivf_nprobe,
+                persist_path=str(Path(self.db_path).with_suffix(f".{name}.ivf.npz")),
+                **options
+            )
+        return EmbeddingIndex(**options)
+    
+    def _rescorer(self, name: str):
+        """Fetch full-precision embeddings by id for rescoring quantized matches."""
+        table = "runbook_sections" if name == "sections" else "runbooks"
+        
+        def fetch(ids: List[int]) -> Dict[int, np.ndarray]:
+            if not ids:
+                return {}
+            cursor = self._db.cursor()
+            placeholders = ",".join("?" * len(ids))
+            cursor.execute(f"""
+                SELECT id, embedding FROM {table}
+                WHERE id IN ({placeholders}) AND embedding IS NOT NULL
+            """, list(ids))
+            vectors = {row_id: decode_embedding(blob) for row_id, blob in cursor.fetchall()}
+            return vectors
+        
+        return fetch
+    
+    def evaluate_ann_recall(
+        self,
+        queries: List[str],
+        top_k: int = 5,
+        sections: bool = False,
+        nprobe_values: Optional[List[int]] = None
+    ) -> Dict:
+        """Report recall@k and latency of IVF search against exact search.
+        
+        Uses the live index when ``index_type`` is "ivf"; otherwise builds a
+        throwaway IVF index over the same vectors, so parameters can be
+        tried before switching.
+        """
+        index = self.section_index if sections else self.index
+        if not isinstance(index, IVFIndex):
+            ivf = IVFIndex(dimension=self.dimension, nlist=self.ivf_nlist, nprobe=self.ivf_nprobe)
+            ivf.build(*index.export())
+            index = ivf
+        
+        report = index.recall_at_k(self.embed_texts(queries), top_k, nprobe_values)
+        for nprobe, stats in report.items():
+            logger.info(
+                f"nprobe={nprobe}: recall@{top_k}={stats['recall']:.3f}, "
+                f"{stats['avg_latency_ms']:.2f}ms/query"
+            )
+        return report
+    
+    def evaluate_quantization(
+        self,
+        queries: List[str],
+        top_k: int = 5,
+        sections: bool = False
+    ) -> Dict:
+        """Report memory and recall@k of each quantization against float32.
+        
+        Builds throwaway exact indexes over the stored vectors, so modes can
+        be compared before changing ``quantization``. Recall is measured with
+        and without full-precision rescoring.
+        """
+        # Read the stored float32 vectors; the live index may already be lossy
+        cursor = self._db.cursor()
+        if sections:
+            ids, categories, embeddings, section_labels = self._fetch_section_vectors(cursor)
+        else:
+            ids, categories, embeddings = self._fetch_runbook_vectors(cursor)
+            section_labels = None
+        
+        reference = EmbeddingIndex(dimension=self.dimension)
+        reference.build(ids, categories, embeddings, section_labels)
+        vectors = dict(zip(ids, embeddings))
+        
+        query_vectors = self.embed_texts(queries)
+        truth = [{i for i, _ in reference.search(query, top_k)} for query in query_vectors]
+        expected = sum(len(matches) for matches in truth)
+        
+        def recall(index: EmbeddingIndex) -> float:
+            hits = sum(
+                len({i for i, _ in index.search(query, top_k)} & matches)
+                for query, matches in zip(query_vectors, truth)
+            )
+            return hits / expected if expected else 1.0
+        
+        report = {}
+        for quantization in EmbeddingIndex.QUANTIZATIONS:
+            index = EmbeddingIndex(
+                dimension=self.dimension,
+                quantization=quantization,
+                rescore_factor=self.rescore_factor
+            )
+            index.build(ids, categories, embeddings, section_labels)
+            stats = {
+                "memory_mb": index.memory_usage() / (1024 * 1024),
+                "recall": recall(index)
+            }
+            if quantization != "none":
+                index.rescorer = lambda match_ids: {i: vectors[i] for i in match_ids}
+                stats["recall_rescored"] = recall(index)
+            report[quantization] = stats
+            logger.info(f"quantization={quantization}: {stats}")
+        return report
+    
+    def _fetch_runbook_vectors(
+        self,
+        cursor: sqlite3.Cursor,
+        file_paths: Optional[List[str]] = None
+    ) -> Tuple[List[int], List[Optional[str]], List[np.ndarray]]:
+        """Load ids, categories and embeddings of runbooks (optionally a subset)."""
+        ids, categories, embeddings = [], [], []
+        for where, params in _file_path_filters("file_path", file_paths):
+            cursor.execute(f"""
+                SELECT id, category, embedding
+                FROM runbooks
+                WHERE embedding IS NOT NULL{where}
+            """, params)
+            for runbook_id, category, embedding_blob in cursor.fetchall():
+                ids.append(runbook_id)
+                categories.append(category)
+                embeddings.append(decode_embedding(embedding_blob))
+        return ids, categories, embeddings
+    
+    def _fetch_section_vectors(
+        self,
+        cursor: sqlite3.Cursor,
+        file_paths: Optional[List[str]] = None
+    ) -> Tuple[List[int], List[Optional[str]], List[np.ndarray], List[str]]:
+        """Load ids, categories, embeddings and headings of runbook sections."""
+        ids, categories, embeddings, sections = [], [], [], []
+        for where, params in _file_path_filters("s.file_path", file_paths):
+            cursor.execute(f"""
+                SELECT s.id, r.category, s.embedding, s.section
+                FROM runbook_sections s
+                JOIN runbooks r ON r.file_path = s.file_path
+                WHERE s.embedding IS NOT NULL{where}
+            """, params)
+            for section_id, category, embedding_blob, section in cursor.fetchall():
+                ids.append(section_id)
+                categories.append(category)
+                embeddings.append(decode_embedding(embedding_blob))
+                sections.append(section)
+        return ids, categories, embeddings, sections
+    
+    def _init_db(self):
+        """Initialize SQLite database with vector extension."""
+        with self._db.transaction() as cursor:
+            # Create runbooks table
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS runbooks (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    title TEXT NOT NULL,
+                    file_path TEXT NOT NULL UNIQUE,
+                    content TEXT NOT NULL,
+                    category TEXT,
+                    embedding BLOB,
+                    content_hash TEXT,
+                    mtime REAL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            
+            # Create index for faster searches
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_category ON runbooks(category)
+            """)
+            
+            # Create runbook sections table (one chunk per "## " heading)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS runbook_sections (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    file_path TEXT NOT NULL,
+                    section TEXT NOT NULL,
+                    content TEXT NOT NULL,
+                    embedding BLOB
+                )
+            """)
+            
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_section_file_path ON runbook_sections(file_path)
+            """)
+            
+            # Migrations rewrite old rows, so they run before the full-text
+            # sync triggers exist: an update trigger firing for a row the FTS
+            # index never contained corrupts the index
+            previous_version = self._migrate(cursor)
+            
+            self.fts_available = self._init_fts(cursor, rebuild=previous_version < 4)
         logger.info("Database initialized")
     
+    def _init_fts(self, cursor: sqlite3.Cursor, rebuild: bool = False) -> bool:
+        """Create FTS5 tables mirroring runbooks and sections via triggers.
+        
+        ``rebuild`` populates them from rows written before they existed.
+        Returns False (hybrid search falls back to vector-only) when the
+        SQLite build lacks FTS5.
+        """
+        try:
+            for table, fts_table, columns in (
+                ("runbooks", "runbooks_fts", ("title", "content")),
+                ("runbook_sections", "runbook_sections_fts", ("section", "content"))
+            ):
+                column_list = ", ".join(columns)
+                new_values = ", ".join(f"new.{column}" for column in columns)
+                old_values = ", ".join(f"old.{column}" for column in columns)
+                
+                cursor.execute(f"""
+                    CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5(
+                        {column_list},
+                        content='{table}',
+                        content_rowid='id',
+                        tokenize='porter unicode61'
+                    )
+                """)
+                cursor.execute(f"""
+                    CREATE TRIGGER IF NOT EXISTS {table}_fts_insert AFTER INSERT ON {table} BEGIN
+                        INSERT INTO {fts_table}(rowid, {column_list}) VALUES (new.id, {new_values});
+                    END
+                """)
+                cursor.execute(f"""
+                    CREATE TRIGGER IF NOT EXISTS {table}_fts_delete AFTER DELETE ON {table} BEGIN
+                        INSERT INTO {fts_table}({fts_table}, rowid, {column_list})
+                        VALUES ('delete', old.id, {old_values});
+                    END
+                """)
+                cursor.execute(f"""
+                    CREATE TRIGGER IF NOT EXISTS {table}_fts_update AFTER UPDATE ON {table} BEGIN
+                        INSERT INTO {fts_table}({fts_table}, rowid, {column_list})
+                        VALUES ('delete', old.id, {old_values});
+                        INSERT INTO {fts_table}(rowid, {column_list}) VALUES (new.id, {new_values});
+                    END
+                """)
+                if rebuild:
+                    cursor.execute(f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')")
+            return True
+        
+        except sqlite3.OperationalError as e:
+            logger.warning(f"SQLite FTS5 unavailable, hybrid search disabled: {e}")
+            return False
+    
+    def _migrate(self, cursor: sqlite3.Cursor) -> int:
+        """Run one-time migrations for databases created by older versions.
+        
+        Returns the schema version the database had before.
+        """
+        cursor.execute("PRAGMA user_version")
+        version = cursor.fetchone()[0]
+        
+        if version < 1:
+            # v1: JSON-encoded embeddings -> binary float32 blobs
+            cursor.execute("SELECT id, embedding FROM runbooks WHERE embedding IS NOT NULL")
+            updates = [
+                (encode_embedding(decode_embedding(blob)), runbook_id)
+                for runbook_id, blob in cursor.fetchall()
+                if is_legacy_blob(blob)
+            ]
+            cursor.executemany("UPDATE runbooks SET embedding = ? WHERE id = ?", updates)
+            if updates:
+                logger.info(f"Migrated {len(updates)} embeddings to binary float32 format")
+        
+        if version < 2:
+            # v2: content hash and mtime for incremental indexing
+            cursor.execute("PRAGMA table_info(runbooks)")
+            columns = {row[1] for row in cursor.fetchall()}
+            if "content_hash" not in columns:
+                cursor.execute("ALTER TABLE runbooks ADD COLUMN content_hash TEXT")
+            if "mtime" not in columns:
+                cursor.execute("ALTER TABLE runbooks ADD COLUMN mtime REAL")
+        
+        if version < 3:
+            # v3: section chunks; force existing runbooks to be re-indexed
+            cursor.execute("UPDATE runbooks SET content_hash = NULL, mtime = NULL")
+        
+        # v4: full-text indexes, created and populated by _init_fts
+        
+        if version < self.SCHEMA_VERSION:
+            cursor.execute(f"PRAGMA user_version = {self.SCHEMA_VERSION}")
+        return version
+    
     def embed_text(self, text: str) -> List[float]:
         """Generate embedding for text."""
-        embedding = self.embedding_model.encode(text, convert_to_tensor=False)
-        return embedding.tolist()
+        return self.embed_query(text).tolist()
+    
+    def embed_query(self, text: str) -> np.ndarray:
+        """Generate a (read-only) query embedding, served from the LRU cache on repeats."""
+        key = (self.embedding_model_name, " ".join(text.split()))
+        embedding = self._query_cache.get(key)
+        if embedding is None:
+            if self._query_batcher is not None:
+                embedding = self._query_batcher.embed(text)
+            else:
+                embedding = np.asarray(
+                    self.embedding_model.encode(text, convert_to_tensor=False),
+                    dtype=np.float32
+                )
+            embedding.flags.writeable = False
+            self._query_cache.put(key, embedding)
+        return embedding
+    
+    def query_cache_stats(self) -> Dict:
+        """Get hit/miss counters of the query embedding cache."""
+        return self._query_cache.stats()
+    
+    def _encode_query_batch(self, texts: List[str]) -> np.ndarray:
+        return self.embedding_model.encode(
+            texts,
+            batch_size=len(texts),
+            convert_to_numpy=True,
+            show_progress_bar=False
+        )
+    
+    def query_batch_stats(self) -> Dict:
+        """Get batch-size and queue-depth counters of query micro-batching."""
+        if self._query_batcher is None:
+            return {}
+        return self._query_batcher.stats()
+    
+    def embed_texts(self, texts: List[str], batch_size: Optional[int] = None) -> np.ndarray:
+        """Generate embeddings for many texts in batched model calls."""
+        return self.embedding_model.encode(
+            texts,
+            batch_size=batch_size or self.batch_size,
+            convert_to_numpy=True,
+            show_progress_bar=False
+        )
     
     def add_runbook(
         self,
         title: str,
         file_path: str,
         content: str,
-        category: Optional[str] = None
+        category: Optional[str] = None,
+        content_hash: Optional[str] = None,
+        mtime: Optional[float] = None,
+        sections: Optional[Dict[str, str]] = None
     ):
-        """Add a runbook to the vector store."""
+        """Add a runbook (and its sections) to the vector store."""
+        try:
+            self.add_runbooks([{
+                "title": title,
+                "file_path": file_path,
+                "content": content,
+                "category": category,
+                "content_hash": content_hash,
+                "mtime": mtime,
+                "sections": sections or {}
+            }])
+            logger.info(f"Added runbook: {title}")
+        
+        except Exception as e:
+            logger.error(f"Error adding runbook {title}: {e}")
+            raise
+    
+    def add_runbooks(
+        self,
+        runbooks: Iterable[Dict],
+        batch_size: Optional[int] = None
+    ) -> int:
+        """Bulk-add runbooks, embedding them in batches within one transaction.
+        
+        ``runbooks`` may be a lazy iterable of dicts with ``title``,
+        ``file_path``, ``content`` and optional ``category``,
+        ``content_hash``, ``mtime`` and ``sections`` (heading -> text) keys.
+        Each section is stored and embedded as its own chunk. Returns the
+        number of runbooks added.
+        """
+        batch_size = batch_size or self.batch_size
+        start_time = time.time()
+        file_paths = []
+        stale_section_ids = []
+        
+        conn = self._db.connection()
         try:
-            # Generate embedding
-            embedding = self.embed_text(content)
-            embedding_blob = json.dumps(embedding).encode('utf-8')
-            
-            conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
             
-            cursor.execute("""
-                INSERT OR REPLACE INTO runbooks (title, file_path, content, category, embedding)
-                VALUES (?, ?, ?, ?, ?)
-            """, (title, file_path, content, category, embedding_blob))
+            for batch in _batched(runbooks, batch_size):
+                # One encode pass covers whole documents and their sections
+                texts = []
+                for rb in batch:
+                    texts.append(rb["content"])
+                    texts.extend(
+                        f"{rb['title']} - {heading}\n{body}"
+                        for heading, body in rb.get("sections", {}).items()
+                    )
+                embeddings = iter(self.embed_texts(texts, batch_size))
+                
+                runbook_rows, section_rows = [], []
+                for rb in batch:
+                    runbook_rows.append((
+                        rb["title"],
+                        rb["file_path"],
+                        rb["content"],
+                        rb.get("category"),
+                        encode_embedding(next(embeddings)),
+                        rb.get("content_hash"),
+                        rb.get("mtime")
+                    ))
+                    for heading, body in rb.get("sections", {}).items():
+                        section_rows.append((
+                            rb["file_path"],
+                            heading,
+                            body,
+                            encode_embedding(next(embeddings))
+                        ))
+                
+                paths = [rb["file_path"] for rb in batch]
+                stale_section_ids.extend(self._fetch_section_vectors(cursor, paths)[0])
+                cursor.executemany(
+                    "DELETE FROM runbook_sections WHERE file_path = ?",
+                    [(path,) for path in paths]
+                )
+                
+                # Upsert keeps runbook ids stable across re-indexing
+                cursor.executemany("""
+                    INSERT INTO runbooks
+                    (title, file_path, content, category, embedding, content_hash, mtime)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(file_path) DO UPDATE SET
+                        title = excluded.title,
+                        content = excluded.content,
+                        category = excluded.category,
+                        embedding = excluded.embedding,
+                        content_hash = excluded.content_hash,
+                        mtime = excluded.mtime
+                """, runbook_rows)
+                cursor.executemany("""
+                    INSERT INTO runbook_sections (file_path, section, content, embedding)
+                    VALUES (?, ?, ?, ?)
+                """, section_rows)
+                
+                file_paths.extend(paths)
             
             conn.commit()
-            conn.close()
-            logger.info(f"Added runbook: {title}")
         
         except Exception as e:
-            logger.error(f"Error adding runbook {title}: {e}")
+            conn.rollback()
+            logger.error(f"Error bulk adding runbooks: {e}")
             raise
+        
+        if file_paths:
+            def patch():
+                self._index.upsert(*self._fetch_runbook_vectors(cursor, file_paths))
+                self._section_index.upsert(
+                    *self._fetch_section_vectors(cursor, file_paths),
+                    remove=stale_section_ids
+                )
+            self._patch_index(patch)
+        
+        total = len(file_paths)
+        elapsed = time.time() - start_time
+        if total:
+            logger.info(
+                f"Bulk added {total} runbooks in {elapsed:.2f}s "
+                f"({total / max(elapsed, 1e-9):.1f} docs/sec)"
+            )
+        return total
     
     def search(
         self,
         query: str,
         top_k: int = 5,
-        category: Optional[str] = None
+        category: Optional[str] = None,
+        section: Optional[str] = None,
+        mode: Optional[str] = None,
+        include_content: bool = True
     ) -> List[Dict]:
-        """Search for relevant runbooks using cosine similarity."""
+        """Search for relevant runbooks using cosine similarity.
+        
+        Scoring only touches ids and embeddings; row details are fetched for
+        the winners afterwards, and ``include_content=False`` skips loading
+        their bodies too (``content`` is then ``None``).
+        
+        With ``section`` (e.g. "Root Causes") only chunks for that section
+        are scored, and each result's ``content`` is the section text.
+        
+        ``mode="hybrid"`` fuses BM25 full-text ranks with vector ranks using
+        reciprocal-rank fusion, so exact tokens like ``HikariPool`` or
+        ``OOMKilled`` are not lost. ``similarity`` is always the cosine
+        similarity; ``score`` is what results are ranked by.
+        """
+        mode = mode or self.search_mode
         try:
             # Generate query embedding
-            query_embedding = self.embed_text(query)
+            query_embedding = self.embed_query(query)
+            index = self.section_index if section else self.index
             
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            if mode == "hybrid" and self.fts_available:
+                matches = self._hybrid_search(query, query_embedding, index, top_k, category, section)
+            else:
+                # Score all candidates in one matrix-vector product
+                matches = [
+                    (match_id, similarity, similarity)
+                    for match_id, similarity in index.search(
+                        query_embedding,
+                        top_k=top_k,
+                        category=category,
+                        section=section
+                    )
+                ]
+            if not matches:
+                return []
             
-            # Fetch all runbooks (with optional category filter)
-            if category:
-                cursor.execute("""
-                    SELECT id, title, file_path, content, category, embedding
-                    FROM runbooks
-                    WHERE category = ?
-                """, (category,))
+            # Fetch details for the winners only
+            ids = [match_id for match_id, _, _ in matches]
+            placeholders = ",".join("?" * len(ids))
+            
+            cursor = self._db.cursor()
+            
+            if section:
+                content_column = "s.content" if include_content else "NULL"
+                cursor.execute(f"""
+                    SELECT s.id, r.title, s.file_path, {content_column}, r.category, s.section
+                    FROM runbook_sections s
+                    JOIN runbooks r ON r.file_path = s.file_path
+                    WHERE s.id IN ({placeholders})
+                """, ids)
             else:
-                cursor.execute("""
-                    SELECT id, title, file_path, content, category, embedding
+                content_column = "content" if include_content else "NULL"
+                cursor.execute(f"""
+                    SELECT id, title, file_path, {content_column}, category, NULL
                     FROM runbooks
-                """)
+                    WHERE id IN ({placeholders})
+                """, ids)
+            rows = {row[0]: row for row in cursor.fetchall()}
             
             results = []
-            for row in cursor.fetchall():
-                runbook_id, title, file_path, content, cat, embedding_blob = row
-                
-                # Deserialize embedding
-                stored_embedding = json.loads(embedding_blob.decode('utf-8'))
-                
-                # Calculate cosine similarity
-                similarity = self._cosine_similarity(query_embedding, stored_embedding)
-                
+            for match_id, similarity, score in matches:
+                if match_id not in rows:
+                    continue
+                _, title, file_path, content, cat, sec = rows[match_id]
                 results.append({
-                    "id": runbook_id,
+                    "id": match_id,
                     "title": title,
                     "file_path": file_path,
                     "content": content,
                     "category": cat,
-                    "similarity": similarity
+                    "section": sec,
+                    "similarity": similarity,
+                    "score": score
                 })
             
-            conn.close()
-            
-            # Sort by similarity and return top_k
-            results.sort(key=lambda x: x["similarity"], reverse=True)
-            return results[:top_k]
+            return results
         
         except Exception as e:
             logger.error(f"Error searching vector store: {e}")
             raise
     
-    def _cosine_similarity(self, vec1: List[float], vec2: List[float]) -> float:
-        """Calculate cosine similarity between two vectors."""
-        dot_product = sum(a * b for a, b in zip(vec1, vec2))
-        magnitude1 = sum(a * a for a in vec1) ** 0.5
-        magnitude2 = sum(b * b for b in vec2) ** 0.5
+    def _hybrid_search(
+        self,
+        query: str,
+        query_embedding: np.ndarray,
+        index: EmbeddingIndex,
+        top_k: int,
+        category: Optional[str],
+        section: Optional[str]
+    ) -> List[Tuple[int, float, float]]:
+        """Fuse lexical and vector ranks; returns ``(id, cosine, rrf score)``."""
+        candidate_k = max(top_k * 4, 20)
+        lexical = self.lexical_search(query, candidate_k, category, section)
+        
+        # On large corpora, only score the rows the lexical stage found
+        candidates = None
+        if lexical and len(index) >= self.lexical_prefilter_min_rows:
+            candidates = [match_id for match_id, _ in lexical]
         
-        if magnitude1 == 0 or magnitude2 == 0:
-            return 0.0
+        vector = index.search(
+            query_embedding,
+            top_k=candidate_k,
+            category=category,
+            section=section,
+            candidates=candidates
+        )
         
-        return dot_product / (magnitude1 * magnitude2)
+        scores = {}
+        for ranking in (vector, lexical):
+            for rank, (match_id, _) in enumerate(ranking, 1):
+                scores[match_id] = scores.get(match_id, 0.0) + 1.0 / (self.RRF_K + rank)
+        
+        winners = sorted(scores, key=scores.get, reverse=True)[:top_k]
+        
+        # Lexical-only winners still report their cosine similarity
+        similarities = dict(vector)
+        missing = [match_id for match_id in winners if match_id not in similarities]
+        if missing:
+            similarities.update(index.search(query_embedding, top_k=len(missing), candidates=missing))
+        
+        return [
+            (match_id, similarities.get(match_id, 0.0), scores[match_id])
+            for match_id in winners
+        ]
+    
+    def lexical_search(
+        self,
+        query: str,
+        top_k: int = 5,
+        category: Optional[str] = None,
+        section: Optional[str] = None
+    ) -> List[Tuple[int, float]]:
+        """Full-text search with BM25; returns ``(id, bm25 rank)`` pairs, best first.
+        
+        Ids are runbook ids, or section ids when ``section`` is given.
+        """
+        if not self.fts_available:
+            return []
+        
+        # Quote every token so user text can never be parsed as FTS5 syntax
+        tokens = list(dict.fromkeys(re.findall(r"\w+", query.lower())))
+        if not tokens:
+            return []
+        match_query = " OR ".join(f'"{token}"' for token in tokens[:32])
+        
+        if section:
+            sql = """
+                SELECT s.id, runbook_sections_fts.rank
+                FROM runbook_sections_fts
+                JOIN runbook_sections s ON s.id = runbook_sections_fts.rowid
+                JOIN runbooks r ON r.file_path = s.file_path
+                WHERE runbook_sections_fts MATCH ? AND s.section = ?
+            """
+            params = [match_query, section]
+        else:
+            sql = """
+                SELECT r.id, runbooks_fts.rank
+                FROM runbooks_fts
+                JOIN runbooks r ON r.id = runbooks_fts.rowid
+                WHERE runbooks_fts MATCH ?
+            """
+            params = [match_query]
+        
+        if category:
+            sql += " AND r.category = ?"
+            params.append(category)
+        sql += " ORDER BY rank LIMIT ?"
+        params.append(top_k)
+        
+        cursor = self._db.cursor()
+        
+        cursor.execute(sql, params)
+        results = cursor.fetchall()
+        return results
+    
+    def get_section(self, file_path: str, section: str) -> Optional[str]:
+        """Get the text of one ``## `` section of an indexed runbook."""
+        cursor = self._db.cursor()
+        
+        cursor.execute("""
+            SELECT content FROM runbook_sections
+            WHERE file_path = ? AND section = ?
+        """, (file_path, section))
+        row = cursor.fetchone()
+        return row[0] if row else None
     
     def get_all_runbooks(self) -> List[Dict]:
         """Get all runbooks from the store."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = self._db.cursor()
         
         cursor.execute("""
             SELECT id, title, file_path, content, category
@@ -180,28 +1022,125 @@ class VectorStore:
                 "content": row[3],
                 "category": row[4]
             })
+        return results
+    
+    def list_runbook_metadata(self) -> List[Dict]:
+        """List runbooks without loading their content or embeddings."""
+        cursor = self._db.cursor()
+        
+        cursor.execute("""
+            SELECT id, title, file_path, category, length(content)
+            FROM runbooks
+            ORDER BY title
+        """)
         
-        conn.close()
+        results = []
+        for row in cursor.fetchall():
+            results.append({
+                "id": row[0],
+                "title": row[1],
+                "file_path": row[2],
+                "category": row[3],
+                "content_length": row[4]
+            })
         return results
     
+    def count_runbooks(self) -> int:
+        """Count indexed runbooks."""
+        cursor = self._db.cursor()
+        
+        cursor.execute("SELECT COUNT(*) FROM runbooks")
+        count = cursor.fetchone()[0]
+        return count
+    
+    def get_index_state(self) -> Dict[str, Dict]:
+        """Get the stored content hash and mtime for every indexed file."""
+        cursor = self._db.cursor()
+        
+        cursor.execute("SELECT file_path, content_hash, mtime FROM runbooks")
+        state = {
+            row[0]: {"content_hash": row[1], "mtime": row[2]}
+            for row in cursor.fetchall()
+        }
+        return state
+    
+    def touch_runbooks(self, mtimes: Dict[str, float]):
+        """Record new mtimes for runbooks whose content did not change."""
+        if not mtimes:
+            return
+        
+        with self._db.transaction() as cursor:
+            cursor.executemany(
+                "UPDATE runbooks SET mtime = ? WHERE file_path = ?",
+                [(mtime, file_path) for file_path, mtime in mtimes.items()]
+            )
+    
     def delete_runbook(self, file_path: str):
         """Delete a runbook by file path."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("DELETE FROM runbooks WHERE file_path = ?", (file_path,))
+        with self._db.transaction() as cursor:
+            cursor.execute("SELECT id FROM runbooks WHERE file_path = ?", (file_path,))
+            ids = [row[0] for row in cursor.fetchall()]
+            cursor.execute("SELECT id FROM runbook_sections WHERE file_path = ?", (file_path,))
+            section_ids = [row[0] for row in cursor.fetchall()]
+            
+            cursor.execute("DELETE FROM runbooks WHERE file_path = ?", (file_path,))
+            cursor.execute("DELETE FROM runbook_sections WHERE file_path = ?", (file_path,))
         
-        conn.commit()
-        conn.close()
+        def patch():
+            self._index.remove(ids)
+            self._section_index.remove(section_ids)
+        self._patch_index(patch)
         logger.info(f"Deleted runbook: {file_path}")
     
     def clear_all(self):
         """Clear all runbooks from the store."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        with self._db.transaction() as cursor:
+            cursor.execute("DELETE FROM runbooks")
+            cursor.execute("DELETE FROM runbook_sections")
         
-        cursor.execute("DELETE FROM runbooks")
-        
-        conn.commit()
-        conn.close()
+        def patch():
+            self._index.clear()
+            self._section_index.clear()
+        self._patch_index(patch)
         logger.info("Cleared all runbooks")
+    
+    def close(self):
+        """Stop query batching and close the shared database connections."""
+        if self._query_batcher is not None:
+            self._query_batcher.close()
+        self._db.close()
+
+
+def _batched(items: Iterable, size: int) -> Iterator[List]:
+    """Yield successive lists of up to ``size`` items from an iterable."""
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _snapshot_time(version: str) -> Optional[int]:
+    """Publish time (ns) encoded in a snapshot version name, or ``None``."""
+    try:
+        return int(version.split("-", 1)[0])
+    except ValueError:
+        return None
+
+
+def _file_path_filters(
+    column: str,
+    file_paths: Optional[List[str]],
+    chunk_size: int = 500
+) -> Iterator[Tuple[str, List[str]]]:
+    """Yield ``(where clause suffix, params)`` pairs covering ``file_paths``.
+    
+    ``None`` means no filter; long lists are split to stay under SQLite's
+    bound-parameter limit.
+    """
+    if file_paths is None:
+        yield "", []
+        return
+    for chunk in _batched(file_paths, chunk_size):
+        yield f" AND {column} IN ({','.join('?' * len(chunk))})", chunk
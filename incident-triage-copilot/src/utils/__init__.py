@@ -2,5 +2,6 @@
 
 from .logger import get_logger
 from .metrics import MetricsTracker
+from .lru_cache import LRUCache
 
-__all__ = ["get_logger", "MetricsTracker"]
+__all__ = ["get_logger", "MetricsTracker", "LRUCache"]
@@ -0,0 +1,93 @@
+"""Startup timing breakdown and background warm-up."""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class StartupProfiler:
+    """Record how long each startup phase takes.
+
+    Phases are recorded once per process: Streamlit re-runs the script on
+    every interaction, and those warm re-runs must not overwrite the
+    cold-start numbers.
+    """
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self._phases = {}
+        self._marks = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name: str):
+        """Time the enclosed block as phase ``name``."""
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start_time)
+
+    def record(self, name: str, seconds: float):
+        """Record a phase duration unless it was already recorded."""
+        with self._lock:
+            if name in self._phases:
+                return
+            self._phases[name] = seconds
+        logger.info(f"Startup phase '{name}' took {seconds:.2f}s")
+
+    def mark(self, name: str) -> Optional[float]:
+        """Record seconds since process start for a milestone (first time only)."""
+        elapsed = time.perf_counter() - self.started_at
+        with self._lock:
+            if name in self._marks:
+                return None
+            self._marks[name] = elapsed
+        logger.info(f"Startup milestone '{name}' reached after {elapsed:.2f}s")
+        return elapsed
+
+    def breakdown(self) -> Dict[str, Dict[str, float]]:
+        """Get recorded phase durations and milestones, in seconds."""
+        with self._lock:
+            return {
+                "phases": dict(self._phases),
+                "milestones": dict(self._marks)
+            }
+
+    def warm_up(self, tasks: Dict[str, Callable[[], object]]) -> threading.Thread:
+        """Run warm-up tasks concurrently on daemon threads, timing each.
+
+        Failures are logged and skipped; the component then simply loads on
+        first use as it would without warm-up. Returns a thread that
+        finishes (and marks "warm") once every task is done.
+        """
+        def run(name: str, task: Callable[[], object]):
+            try:
+                with self.phase(f"warmup:{name}"):
+                    task()
+            except Exception as e:
+                logger.warning(f"Warm-up of {name} failed: {e}")
+
+        workers = [
+            threading.Thread(target=run, args=(name, task), name=f"warmup-{name}", daemon=True)
+            for name, task in tasks.items()
+        ]
+
+        def wait():
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            self.mark("warm")
+
+        thread = threading.Thread(target=wait, name="startup-warmup", daemon=True)
+        thread.start()
+        return thread
+
+
+# Process-wide profiler; survives Streamlit script re-runs
+startup_profiler = StartupProfiler()